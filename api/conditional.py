@@ -0,0 +1,45 @@
+"""Conditional GET for the read API.
+
+Views compute a strong ETag from a cheap version stamp (a cache generation
+or a content hash) before running any queryset or serializer, and answer
+``If-None-Match`` with 304 straight away. Only JSON responses are tagged:
+the browsable API's HTML carries per-request bits (CSRF token, user menu).
+"""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Optional
+
+from django.utils.cache import get_conditional_response
+
+
+def make_etag(*parts) -> str:
+    return '"%s"' % hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def wants_etag(request) -> bool:
+    return request.method in ("GET", "HEAD") and request.accepted_renderer.format == "json"
+
+
+def request_etag(request, *parts) -> Optional[str]:
+    """ETag over ``parts`` and the query string, or ``None`` when the response isn't tagged."""
+    if not wants_etag(request):
+        return None
+    return make_etag(*parts, request.META.get("QUERY_STRING", ""))
+
+
+def not_modified(request, etag: Optional[str]):
+    """A 304 for ``etag`` when the client already has it, else ``None``."""
+    if etag is None:
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+    return response
+
+
+def tag(response, etag: Optional[str]):
+    if etag is not None:
+        response["ETag"] = etag
+    return response
@@ -0,0 +1,56 @@
+"""Sparse fieldsets: ``?fields=id,title`` limits a response to those fields.
+
+The serializer drops the other fields (:class:`~api.serializers.SparseFieldsMixin`)
+and the queryset loads only the model columns behind the kept ones, plus the
+pagination ordering so cursors don't trigger deferred loads.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsetMixin:
+    """Viewset mixin; applies to the actions in ``sparse_actions``."""
+
+    sparse_actions = ("list",)
+
+    def requested_fields(self) -> Optional[list]:
+        if self.action not in self.sparse_actions:
+            return None
+        raw = self.request.query_params.get("fields")
+        if not raw:
+            return None
+        fields = [name for name in (part.strip() for part in raw.split(",")) if name]
+        if not fields:
+            raise ValidationError({"fields": "No fields given."})
+        available = self.get_serializer_class()().fields
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            raise ValidationError({"fields": f"Unknown field(s): {', '.join(unknown)}."})
+        return fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"] = self.requested_fields()
+        return context
+
+    def sparse_queryset(self, queryset):
+        fields = self.requested_fields()
+        if fields is None:
+            return queryset
+        serializer_fields = self.get_serializer_class()().fields
+        columns = set()
+        for name in fields:
+            source = serializer_fields[name].source.split(".")[0]
+            try:
+                queryset.model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            columns.add(source)
+        ordering = getattr(self.pagination_class, "ordering", ())
+        columns.update(field.lstrip("-") for field in ordering)
+        return queryset.select_related(None).only(*columns)
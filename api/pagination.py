@@ -0,0 +1,21 @@
+"""Cursor pagination for the list endpoints.
+
+Cursors seek along indexed orderings, so every page costs the same however
+deep the client has paged; ``limit`` picks the page size.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class ApiCursorPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = "limit"
+    max_page_size = 200
+
+
+class QuizCursorPagination(ApiCursorPagination):
+    ordering = ("-created_at", "id")
+
+
+class SubmissionCursorPagination(ApiCursorPagination):
+    ordering = ("-submitted_at", "id")
@@ -1,7 +1,18 @@
 from rest_framework import serializers
 
 from quizzes.models import Quiz, Question, Answer, Invitation
-from submissions.models import Submission
+from submissions.models import Submission, QueuedSubmission
+
+
+class SparseFieldsMixin:
+    """Keeps only the fields listed in ``context["fields"]`` (all of them when unset)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.context.get("fields")
+        if requested:
+            for name in set(self.fields) - set(requested):
+                self.fields.pop(name)
 
 
 class AnswerSerializer(serializers.ModelSerializer):
@@ -18,7 +29,7 @@ class QuestionSerializer(serializers.ModelSerializer):
         fields = ["id", "text", "answers"]
 
 
-class QuizListSerializer(serializers.ModelSerializer):
+class QuizListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Quiz
         fields = [
@@ -45,7 +56,7 @@ class InvitationSerializer(serializers.ModelSerializer):
         fields = ["id", "email", "accepted", "created_at"]
 
 
-class SubmissionSerializer(serializers.ModelSerializer):
+class SubmissionSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Submission
         fields = [
@@ -63,3 +74,17 @@ class SubmissionSerializer(serializers.ModelSerializer):
 class SubmitPayloadSerializer(serializers.Serializer):
     # Mapping of question_id -> answer_id (or None)
     answers = serializers.DictField(child=serializers.IntegerField(allow_null=True), allow_empty=False)
+
+
+class QueuedSubmissionSerializer(serializers.ModelSerializer):
+    score = serializers.SerializerMethodField()
+
+    class Meta:
+        model = QueuedSubmission
+        fields = ["token", "quiz", "status", "submission", "score", "error", "created_at", "processed_at"]
+        read_only_fields = fields
+
+    def get_score(self, obj):
+        if obj.status != QueuedSubmission.DONE or obj.submission is None:
+            return None
+        return obj.submission.score
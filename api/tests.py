@@ -1,9 +1,15 @@
 from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase, APIClient
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+
+from api.serializers import QuizDetailSerializer
 
 from quizzes.models import Quiz, Question, Answer, Invitation
+from submissions.coalesce import mark_scored
 from submissions.models import Submission
 
 
@@ -32,7 +38,7 @@ class QuizApiTests(APITestCase):
 		url = reverse("api:quiz-list")
 		resp = self.client.get(url)
 		self.assertEqual(resp.status_code, status.HTTP_200_OK)
-		ids = [q["id"] for q in resp.data]
+		ids = [q["id"] for q in resp.data["results"]]
 		self.assertIn(self.public_quiz.id, ids)
 		self.assertNotIn(self.private_quiz.id, ids)
 
@@ -52,6 +58,21 @@ class QuizApiTests(APITestCase):
 		resp = self.client.get(url)
 		self.assertEqual(resp.status_code, status.HTTP_200_OK)
 
+	def test_detail_serves_the_compiled_payload(self):
+		url = reverse("api:quiz-detail", args=[self.public_quiz.id])
+		resp = self.client.get(url)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		expected = JSONRenderer().render(QuizDetailSerializer(self.public_quiz).data)
+		self.assertEqual(resp.content, expected)
+		self.assertNotIn("is_correct", resp.json()["questions"][0]["answers"][0])
+		with self.assertNumQueries(1):  # the quiz lookup; the payload comes from the cache
+			self.client.get(url)
+		# Content edits show up straight away
+		wrong = Answer.objects.get(question__quiz=self.public_quiz, text="A2")
+		wrong.text = "A2 (edited)"
+		wrong.save()
+		self.assertEqual(self.client.get(url).json()["questions"][0]["answers"][1]["text"], "A2 (edited)")
+
 	def test_submit_creates_submission(self):
 		# Invite the user to private quiz and accept
 		Invitation.objects.create(quiz=self.private_quiz, email=self.invited.email, invited_by=self.creator, accepted=True)
@@ -67,6 +88,49 @@ class QuizApiTests(APITestCase):
 		self.assertEqual(sub.user, self.invited)
 		self.assertFalse(sub.in_progress)
 
+	def test_leaderboard_pages_and_my_rank(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			for i, score in enumerate([3, 1, 2]):
+				user = User.objects.create_user(username=f"p{i}", password="pass")
+				Submission.objects.create(quiz=self.public_quiz, user=user, score=score, in_progress=False)
+		url = reverse("api:quiz-leaderboard", args=[self.public_quiz.id])
+		resp = self.client.get(url, {"limit": 2})
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual([e["user"] for e in resp.data["results"]], ["p0", "p2"])
+		resp = self.client.get(url, {"limit": 2, "after": resp.data["next"]})
+		self.assertEqual([(e["user"], e["rank"]) for e in resp.data["results"]], [("p1", 3)])
+		self.assertIsNone(resp.data["next"])
+		self.assertEqual(self.client.get(url, {"after": "bogus"}).status_code, status.HTTP_400_BAD_REQUEST)
+		resp = self.client.get(url, {"window": "day", "limit": 1})
+		self.assertEqual([e["user"] for e in resp.data["results"]], ["p0"])
+		resp = self.client.get(url, {"as_of": "2000-01-01T00:00:00Z"})
+		self.assertEqual(resp.data["results"], [])
+		self.assertEqual(self.client.get(url, {"window": "year"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+		me_url = reverse("api:quiz-my-rank", args=[self.public_quiz.id])
+		self.assertEqual(self.client.get(me_url).status_code, status.HTTP_403_FORBIDDEN)
+		self.client.login(username="p2", password="pass")
+		self.assertEqual(self.client.get(me_url).data["rank"], 2)
+		self.client.login(username="other", password="pass")
+		self.assertEqual(self.client.get(me_url).status_code, status.HTTP_404_NOT_FOUND)
+
+	def test_score_distribution(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			for i, score in enumerate([0, 1, 1, 3]):
+				user = User.objects.create_user(username=f"d{i}", password="pass")
+				Submission.objects.create(quiz=self.public_quiz, user=user, score=score, in_progress=False)
+		url = reverse("api:quiz-score-distribution", args=[self.public_quiz.id])
+		resp = self.client.get(url, {"buckets": 2})
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual(resp.data["count"], 4)
+		self.assertEqual(resp.data["participants"], 4)
+		self.assertEqual(resp.data["quantiles"]["p50"], 1)
+		self.assertEqual(resp.data["histogram"], [{"from": 0, "to": 2, "count": 3}, {"from": 2, "to": 4, "count": 1}])
+
+	def test_private_leaderboard_requires_invite(self):
+		url = reverse("api:quiz-leaderboard", args=[self.private_quiz.id])
+		self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
 
 class SubmissionApiTests(APITestCase):
 	def setUp(self):
@@ -83,8 +147,8 @@ class SubmissionApiTests(APITestCase):
 		url = reverse("api:submission-list")
 		resp = self.client.get(url)
 		self.assertEqual(resp.status_code, status.HTTP_200_OK)
-		self.assertEqual(len(resp.data), 2)
-		self.assertTrue(all(s["user"] == self.u1.id for s in resp.data))
+		self.assertEqual(len(resp.data["results"]), 2)
+		self.assertTrue(all(s["user"] == self.u1.id for s in resp.data["results"]))
 
 	def test_cannot_view_others_submission(self):
 		self.client.login(username="u1", password="pass")
@@ -92,3 +156,123 @@ class SubmissionApiTests(APITestCase):
 		url = reverse("api:submission-detail", args=[other_sub.id])
 		resp = self.client.get(url)
 		self.assertEqual(resp.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class ConditionalGetTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="u", password="pass", email="u@example.com")
+		self.creator = User.objects.create_user(username="c", password="pass", email="c@example.com")
+		self.quiz = Quiz.objects.create(title="Pub", description="", creator=self.creator, is_published=True)
+		question = Question.objects.create(quiz=self.quiz, text="Q1")
+		self.answer = Answer.objects.create(question=question, text="A1", is_correct=True)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.submission = Submission.objects.create(quiz=self.quiz, user=self.user, in_progress=False)
+
+	def _revalidate(self, url, etag):
+		return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+	def test_quiz_detail_revalidates_on_content_hash(self):
+		url = reverse("api:quiz-detail", args=[self.quiz.id])
+		etag = self.client.get(url)["ETag"]
+		with self.assertNumQueries(1):  # the quiz lookup only
+			resp = self._revalidate(url, etag)
+		self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+		self.assertEqual(resp["ETag"], etag)
+		self.answer.text = "A1!"
+		self.answer.save()
+		resp = self._revalidate(url, etag)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertNotEqual(resp["ETag"], etag)
+
+	def test_quiz_list_revalidates_without_querying(self):
+		url = reverse("api:quiz-list")
+		etag = self.client.get(url)["ETag"]
+		with self.assertNumQueries(0):
+			self.assertEqual(self._revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+		with self.captureOnCommitCallbacks(execute=True):
+			Quiz.objects.create(title="New", creator=self.creator, is_published=True)
+		self.assertEqual(self._revalidate(url, etag).status_code, status.HTTP_200_OK)
+
+	def test_submissions_revalidate_until_they_change(self):
+		self.client.login(username="u", password="pass")
+		url = reverse("api:submission-list")
+		detail = reverse("api:submission-detail", args=[self.submission.id])
+		etag, detail_etag = self.client.get(url)["ETag"], self.client.get(detail)["ETag"]
+		self.assertNotEqual(etag, detail_etag)
+		with self.assertNumQueries(2):  # session and user; no submission query
+			self.assertEqual(self._revalidate(url, etag).status_code, status.HTTP_304_NOT_MODIFIED)
+		self.assertEqual(self._revalidate(detail, detail_etag).status_code, status.HTTP_304_NOT_MODIFIED)
+		# A score moved by the coalesced flush changes the stamp
+		with self.captureOnCommitCallbacks(execute=True):
+			Submission.objects.filter(pk=self.submission.pk).update(score=3)
+			mark_scored(self.submission)
+		resp = self._revalidate(url, etag)
+		self.assertEqual(resp.status_code, status.HTTP_200_OK)
+		self.assertEqual(resp.data["results"][0]["score"], 3)
+		self.assertEqual(self._revalidate(detail, detail_etag).status_code, status.HTTP_200_OK)
+		# Another user's tags never match
+		self.client.login(username="c", password="pass")
+		self.assertEqual(self._revalidate(url, resp["ETag"]).status_code, status.HTTP_200_OK)
+
+
+class PaginationAndFieldsetTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username="u", password="pass")
+		self.creator = User.objects.create_user(username="c", password="pass")
+
+	def _quizzes(self, n):
+		with self.captureOnCommitCallbacks(execute=True):
+			return [
+				Quiz.objects.create(title=f"Quiz {i}", description="x" * 200, creator=self.creator, is_published=True)
+				for i in range(n)
+			]
+
+	def _walk(self, url, params):
+		"""All pages of ``url``; returns (items, queries per page)."""
+		items, counts, next_url = [], [], url
+		while next_url:
+			with CaptureQueriesContext(connection) as queries:
+				resp = self.client.get(next_url, params if next_url == url else None)
+			self.assertEqual(resp.status_code, status.HTTP_200_OK)
+			items.extend(resp.data["results"])
+			counts.append(len(queries))
+			next_url = resp.data["next"]
+		return items, counts
+
+	def test_quiz_pages_cost_the_same_and_stay_bounded(self):
+		quizzes = self._quizzes(7)
+		url = reverse("api:quiz-list")
+		items, counts = self._walk(url, {"limit": 3})
+		self.assertEqual([q["id"] for q in items], [q.id for q in reversed(quizzes)])  # newest first
+		self.assertEqual(len(counts), 3)
+		self.assertEqual(len(set(counts)), 1)
+		resp = self.client.get(url, {"limit": 1000})
+		self.assertEqual(len(resp.data["results"]), 7)
+		self._quizzes(200)
+		self.assertEqual(len(self.client.get(url, {"limit": 1000}).data["results"]), 200)  # max_page_size
+
+	def test_sparse_quiz_fields(self):
+		self._quizzes(3)
+		url = reverse("api:quiz-list")
+		full = len(self.client.get(url).content)
+		with CaptureQueriesContext(connection) as queries:
+			resp = self.client.get(url, {"fields": "id,title"})
+		self.assertEqual([set(q) for q in resp.data["results"]], [{"id", "title"}] * 3)
+		self.assertLess(len(resp.content), full / 3)
+		select = next(q["sql"] for q in queries if '"quizzes_quiz"' in q["sql"])
+		self.assertNotIn('"description"', select)
+		self.assertEqual(self.client.get(url, {"fields": "id,nope"}).status_code, status.HTTP_400_BAD_REQUEST)
+
+	def test_submission_pages_and_fields(self):
+		quizzes = self._quizzes(5)
+		with self.captureOnCommitCallbacks(execute=True):
+			for quiz in quizzes:
+				Submission.objects.create(quiz=quiz, user=self.user, score=quiz.id, in_progress=False)
+		self.client.login(username="u", password="pass")
+		url = reverse("api:submission-list")
+		items, counts = self._walk(url, {"limit": 2, "fields": "id,score"})
+		self.assertEqual([s["score"] for s in items], [q.id for q in reversed(quizzes)])
+		self.assertEqual([set(s) for s in items], [{"id", "score"}] * 5)
+		self.assertEqual(len(set(counts)), 1)
+		detail = self.client.get(reverse("api:submission-detail", args=[items[0]["id"]]), {"fields": "score"})
+		self.assertEqual(detail.data, {"score": quizzes[-1].id})
@@ -1,9 +1,10 @@
 from rest_framework.routers import DefaultRouter
-from .views import QuizViewSet, SubmissionViewSet
+from .views import QuizViewSet, SubmissionViewSet, QueuedSubmissionViewSet
 
 
 router = DefaultRouter()
 router.register(r"quizzes", QuizViewSet, basename="quiz")
 router.register(r"submissions", SubmissionViewSet, basename="submission")
+router.register(r"receipts", QueuedSubmissionViewSet, basename="receipt")
 
 urlpatterns = router.urls
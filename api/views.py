@@ -1,26 +1,44 @@
-from django.db import transaction
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets, mixins, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 
-from quizzes.models import Quiz, Question, Answer
-from quizzes.services import invite_email, accept_invite
-from submissions.models import Submission, QuestionAttempt
+from core import generations
+from quizzes.compiled import get_compiled_quiz
+from quizzes.models import Quiz
+from quizzes.services import QUIZ_LIST_GENERATION, invite_email, accept_invite
+from submissions.models import Submission, QueuedSubmission, LeaderboardRollup
+from submissions.grading import submit_answers
+from submissions.ingest import enqueue, queue_mode_enabled
+from submissions.participants import unique_participants
+from submissions.percentiles import get_score_sketch
+from submissions.services import USER_SUBMISSIONS_GENERATION
+from realtime.leaderboard import MAX_PAGE_SIZE, PAGE_SIZE
+from realtime.rollups import leaderboard_as_of, window_leaderboard
+from realtime.utils import get_leaderboard_page, get_user_standing
 from .serializers import (
 	QuizListSerializer,
 	QuizDetailSerializer,
 	SubmissionSerializer,
 	SubmitPayloadSerializer,
 	InvitationSerializer,
+	QueuedSubmissionSerializer,
 )
+from .conditional import not_modified, request_etag, tag
+from .fieldsets import SparseFieldsetMixin
+from .pagination import QuizCursorPagination, SubmissionCursorPagination
 from .permissions import CanViewQuiz, IsCreatorOrReadOnly
 
 
-class QuizViewSet(viewsets.ReadOnlyModelViewSet):
+class QuizViewSet(SparseFieldsetMixin, viewsets.ReadOnlyModelViewSet):
 	queryset = Quiz.objects.all().select_related("creator")
 	permission_classes = [AllowAny]
+	pagination_class = QuizCursorPagination
 
 	def get_serializer_class(self):
 		if self.action == "retrieve":
@@ -31,15 +49,31 @@ class QuizViewSet(viewsets.ReadOnlyModelViewSet):
 		qs = super().get_queryset()
 		# Only list public, published quizzes
 		if self.action == "list":
-			return qs.filter(is_published=True, visibility=Quiz.PUBLIC).order_by("-created_at")
+			# Ordered by the pagination cursor (-created_at, id)
+			return self.sparse_queryset(qs.filter(is_published=True, visibility=Quiz.PUBLIC))
 		return qs
 
 	def retrieve(self, request, *args, **kwargs):
 		obj = self.get_object()
 		# Enforce visibility rules using permission
 		self.check_object_permissions(request, obj)
-		serializer = self.get_serializer(obj)
-		return Response(serializer.data)
+		compiled = get_compiled_quiz(obj.pk)
+		if compiled is None:
+			raise NotFound()
+		# The payload's content hash is the version stamp
+		etag = request_etag(request, "quiz", compiled.version)
+		unchanged = not_modified(request, etag)
+		if unchanged is not None:
+			return unchanged
+		if request.accepted_renderer.format == "json":
+			# Precompiled bytes, same document as QuizDetailSerializer
+			return tag(HttpResponse(compiled.body, content_type="application/json"), etag)
+		return Response(compiled.data)
+
+	def list(self, request, *args, **kwargs):
+		# Any quiz save or delete bumps the list generation; check it before querying
+		etag = request_etag(request, "quizzes", generations.current(QUIZ_LIST_GENERATION))
+		return not_modified(request, etag) or tag(super().list(request, *args, **kwargs), etag)
 
 	def get_permissions(self):
 		if self.action in {"retrieve"}:
@@ -56,29 +90,80 @@ class QuizViewSet(viewsets.ReadOnlyModelViewSet):
 		payload.is_valid(raise_exception=True)
 		answers_map = payload.validated_data["answers"]
 
-		with transaction.atomic():
-			submission, _ = Submission.objects.get_or_create(
-				quiz=quiz, user=request.user, attempt_number=1, defaults={"in_progress": True}
-			)
-
-			questions = Question.objects.filter(quiz=quiz).prefetch_related("answers")
-			for q in questions:
-				selected_id = answers_map.get(str(q.id)) or answers_map.get(q.id)
-				is_correct = False
-				if selected_id:
-					is_correct = Answer.objects.filter(pk=selected_id, question=q, is_correct=True).exists()
-				QuestionAttempt.objects.create(
-					submission=submission,
-					question=q,
-					selected_answer_id=selected_id,
-					is_correct=is_correct,
-					attempt_number=1,
-				)
-
-			Submission.objects.filter(pk=submission.pk).update(in_progress=False)
+		if queue_mode_enabled():
+			entry = enqueue(quiz, request.user, answers_map, include_unanswered=True)
+			return Response(QueuedSubmissionSerializer(entry).data, status=status.HTTP_202_ACCEPTED)
+
+		submission = submit_answers(quiz, request.user, answers_map, include_unanswered=True)
 
 		return Response(SubmissionSerializer(submission).data, status=status.HTTP_201_CREATED)
 
+	@action(detail=True, methods=["get"], permission_classes=[CanViewQuiz])
+	def leaderboard(self, request, pk=None):
+		"""Full leaderboard in keyset pages: ``?after=<next cursor>&limit=<n>``.
+
+		``?window=day|week|all`` returns the top ``limit`` of the current
+		period instead, and ``?as_of=<ISO timestamp>`` the top ``limit`` at
+		that moment; both are served from rollups and aren't paginated.
+		"""
+		quiz = self.get_object()
+		try:
+			limit = int(request.query_params.get("limit", PAGE_SIZE))
+		except ValueError:
+			raise ValidationError({"limit": "Must be an integer."})
+		if not 1 <= limit <= MAX_PAGE_SIZE:
+			raise ValidationError({"limit": f"Must be between 1 and {MAX_PAGE_SIZE}."})
+		window = request.query_params.get("window")
+		if window:
+			if window not in dict(LeaderboardRollup.WINDOW_CHOICES):
+				raise ValidationError({"window": "Must be one of day, week, all."})
+			return Response({"window": window, "results": window_leaderboard(quiz, window, limit)})
+		as_of = request.query_params.get("as_of")
+		if as_of:
+			at = parse_datetime(as_of)
+			if at is None:
+				raise ValidationError({"as_of": "Must be an ISO 8601 timestamp."})
+			if timezone.is_naive(at):
+				at = timezone.make_aware(at)
+			return Response({"as_of": at.isoformat(), "results": leaderboard_as_of(quiz, at, limit)})
+		try:
+			page = get_leaderboard_page(quiz.pk, request.query_params.get("after") or None, limit)
+		except ValueError:
+			raise ValidationError({"after": "Invalid cursor."})
+		return Response({"results": page["entries"], "next": page["next"]})
+
+	@action(detail=True, methods=["get"], url_path="leaderboard/me", permission_classes=[IsAuthenticated, CanViewQuiz])
+	def my_rank(self, request, pk=None):
+		quiz = self.get_object()
+		standing = get_user_standing(quiz.pk, request.user.id)
+		if standing is None:
+			raise NotFound("No completed submission on this quiz.")
+		return Response(standing)
+
+	@action(detail=True, methods=["get"], url_path="score-distribution", permission_classes=[CanViewQuiz])
+	def score_distribution(self, request, pk=None):
+		"""Approximate score quantiles, histogram and unique participants (``?buckets=<n>``)."""
+		quiz = self.get_object()
+		try:
+			buckets = int(request.query_params.get("buckets", 10))
+		except ValueError:
+			raise ValidationError({"buckets": "Must be an integer."})
+		if not 1 <= buckets <= 100:
+			raise ValidationError({"buckets": "Must be between 1 and 100."})
+		sketch = get_score_sketch(quiz.pk)
+		participants = unique_participants(quiz.pk)
+		if not sketch.n:
+			return Response({"count": 0, "participants": participants, "quantiles": {}, "histogram": []})
+		low, high = sketch.quantile(0), sketch.quantile(1)
+		width = max(1, -(-(high - low + 1) // buckets))  # ceil division over the integer score range
+		edges = [low + i * width for i in range(-(-(high - low + 1) // width) + 1)]
+		histogram = [
+			{"from": start, "to": end, "count": count}
+			for start, end, count in zip(edges, edges[1:], sketch.histogram(edges))
+		]
+		quantiles = {f"p{p}": sketch.quantile(p / 100) for p in (25, 50, 75, 90, 99)}
+		return Response({"count": sketch.n, "participants": participants, "quantiles": quantiles, "histogram": histogram})
+
 	@action(detail=True, methods=["post"], permission_classes=[IsAuthenticated])
 	def invite(self, request, pk=None):
 		quiz = self.get_object()
@@ -93,10 +178,33 @@ class QuizViewSet(viewsets.ReadOnlyModelViewSet):
 		return Response({"accepted": True})
 
 
-class SubmissionViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+class SubmissionViewSet(SparseFieldsetMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
 	serializer_class = SubmissionSerializer
 	permission_classes = [IsAuthenticated]
+	pagination_class = SubmissionCursorPagination
+	sparse_actions = ("list", "retrieve")
 
 	def get_queryset(self):
-		return Submission.objects.filter(user=self.request.user).select_related("quiz")
+		return self.sparse_queryset(Submission.objects.filter(user=self.request.user).select_related("quiz"))
+
+	def _etag(self, request, *parts):
+		generation = generations.current(USER_SUBMISSIONS_GENERATION % request.user.pk)
+		return request_etag(request, "submissions", request.user.pk, generation, *parts)
 
+	def list(self, request, *args, **kwargs):
+		etag = self._etag(request)
+		return not_modified(request, etag) or tag(super().list(request, *args, **kwargs), etag)
+
+	def retrieve(self, request, *args, **kwargs):
+		etag = self._etag(request, kwargs.get(self.lookup_field))
+		return not_modified(request, etag) or tag(super().retrieve(request, *args, **kwargs), etag)
+
+
+class QueuedSubmissionViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+	"""Receipts for submissions accepted in queue ingestion mode."""
+	serializer_class = QueuedSubmissionSerializer
+	permission_classes = [IsAuthenticated]
+	lookup_field = "token"
+
+	def get_queryset(self):
+		return QueuedSubmission.objects.filter(user=self.request.user).select_related("submission")
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        # Business gauges are sampled when /metrics is scraped
+        from quiz_project import collectors
+
+        collectors.register()
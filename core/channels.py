@@ -1,19 +1,150 @@
+import logging
+import threading
+import time
+
 from asgiref.sync import async_to_sync
 from channels.layers import get_channel_layer
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from quiz_project import metrics
+
+logger = logging.getLogger(__name__)
 
 
 def broadcast_leaderboard(quiz_id: int, payload=None):
     """Broadcast a leaderboard update to the quiz group.
 
-    payload can be a dict; if None, send a minimal ping.
+    payload can be a dict; if None, send a minimal ping. The update (a delta
+    against the last published snapshot, or a snapshot) is built and encoded
+    once per wire codec here (callers are synchronous, off the event loop)
+    and carried in the message as ``frames``, so consumers only forward the
+    one their socket negotiated. Nothing is sent when the leaderboard didn't
+    change.
     """
     channel_layer = get_channel_layer()
     if not channel_layer:
         return
+    from realtime.codecs import encode_all
+    from realtime.protocol import publish_message  # local import to avoid early model import
+
+    update = publish_message(quiz_id)
+    if update is None:
+        return
     group = f"quiz_{quiz_id}_leaderboard"
-    message = {"type": "leaderboard.update", "payload": payload or {"quiz_id": quiz_id}}
+    message = {
+        "type": "leaderboard.update",
+        "payload": payload or {"quiz_id": quiz_id},
+        "frames": encode_all(update),
+    }
     try:
         async_to_sync(channel_layer.group_send)(group, message)
         print(f"[WS][broadcast] quiz={quiz_id} group={group} payload_keys={list((payload or {}).keys())}")  # debug
     except Exception as e:  # pragma: no cover
         print(f"[WS][broadcast][error] quiz={quiz_id} {e}")
+
+
+class BroadcastScheduler:
+    """Rate-limit leaderboard pushes to one per ``window`` seconds per quiz.
+
+    The first update after a quiet period is pushed immediately. Updates
+    inside the window are merged into a single trailing push at the end of
+    the window, which builds its snapshot then, so the final state is always
+    delivered. Timers are process-local and the push itself goes through the
+    channel layer, so it behaves the same with the Redis and in-memory layers.
+
+    Timer threads are daemons: a process that exits (a management command)
+    must :meth:`flush` first or its last trailing pushes are lost.
+    """
+
+    def __init__(self, window: float, send=None):
+        self.window = window
+        self.send = send or broadcast_leaderboard
+        self._lock = threading.Lock()
+        self._last_sent = {}
+        self._pending = {}
+
+    def schedule(self, quiz_id: int) -> None:
+        if self.window <= 0:
+            self._push(quiz_id, "immediate")
+            return
+        now = time.monotonic()
+        with self._lock:
+            if quiz_id in self._pending:
+                metrics.leaderboard_broadcasts_merged_total.inc()
+                return
+            wait = self._last_sent.get(quiz_id, float("-inf")) + self.window - now
+            if wait <= 0:
+                self._last_sent[quiz_id] = now
+            else:
+                timer = threading.Timer(wait, self._fire_from_timer, args=(quiz_id,))
+                timer.daemon = True
+                self._pending[quiz_id] = timer
+                timer.start()
+                return
+        self._push(quiz_id, "leading")
+
+    def _fire_from_timer(self, quiz_id: int) -> None:
+        # Runs on its own thread: don't reuse or leak a database connection
+        close_old_connections()
+        try:
+            self._fire(quiz_id)
+        finally:
+            connections.close_all()
+
+    def _fire(self, quiz_id: int) -> None:
+        with self._lock:
+            self._pending.pop(quiz_id, None)
+            self._last_sent[quiz_id] = time.monotonic()
+        self._push(quiz_id, "trailing")
+
+    def _push(self, quiz_id: int, edge: str) -> None:
+        metrics.leaderboard_broadcasts_total.labels(edge).inc()
+        try:
+            self.send(quiz_id)
+        except Exception:  # pragma: no cover - the next update retries
+            logger.warning("leaderboard broadcast failed for quiz %s", quiz_id, exc_info=True)
+
+    def flush(self) -> None:
+        """Fire pending trailing pushes now (shutdown, tests)."""
+        with self._lock:
+            pending = list(self._pending.items())
+        for quiz_id, timer in pending:
+            timer.cancel()
+            self._fire(quiz_id)
+
+    def cancel(self) -> None:
+        """Drop pending trailing pushes without sending them."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for timer in pending.values():
+            timer.cancel()
+
+
+_scheduler = None
+
+
+def get_scheduler() -> BroadcastScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = BroadcastScheduler(getattr(settings, "LEADERBOARD_BROADCAST_WINDOW", 0.5))
+    return _scheduler
+
+
+def flush_leaderboard_broadcasts() -> None:
+    """Send pending trailing pushes now; call before a process exits."""
+    if _scheduler is not None:
+        _scheduler.flush()
+
+
+def reset_scheduler() -> None:
+    """Forget the process scheduler, cancelling its pending pushes (tests)."""
+    global _scheduler
+    scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.cancel()
+
+
+def schedule_leaderboard_broadcast(quiz_id: int) -> None:
+    """Debounced :func:`broadcast_leaderboard`; use this for score-driven updates."""
+    get_scheduler().schedule(quiz_id)
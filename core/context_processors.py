@@ -8,6 +8,8 @@ from __future__ import annotations
 from django.conf import settings
 from django.utils import timezone
 
+from .navcounters import lazy_counters
+
 
 def global_ui(request):
     """Provide global UI constants & lightweight per-user aggregates.
@@ -18,15 +20,10 @@ def global_ui(request):
     pending_invites = 0
     active_attempts = 0
     if user and user.is_authenticated:
-        try:
-            from quizzes.models import Invitation
-            from submissions.models import Submission
-            pending_invites = Invitation.objects.filter(
-                email=user.email, accepted__isnull=True
-            ).count()
-            active_attempts = Submission.objects.filter(user=user).count()
-        except Exception:  # pragma: no cover - defensive, avoid total failure
-            pass
+        # Cached per user and evaluated only if a template reads them
+        counters = lazy_counters(user)
+        pending_invites = counters["invites"]
+        active_attempts = counters["submissions"]
 
     feature_flags = getattr(settings, "FEATURE_FLAGS", {})
 
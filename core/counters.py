@@ -0,0 +1,164 @@
+"""Approximate distinct counters shared across workers (HyperLogLog).
+
+A counter is a named :class:`~core.sketches.HyperLogLog`; counting the
+union of several counters merges their sketches. Two backends, picked by
+``settings.DISTINCT_COUNTER_BACKEND``:
+
+* ``redis`` – Redis' own HyperLogLogs (``PFADD`` / ``PFCOUNT``), updated
+  atomically on every add;
+* ``cache`` – each worker buffers adds in in-process sketches and merges
+  them into the shared Django cache every ``DISTINCT_COUNTER_FLUSH_INTERVAL``
+  seconds (and before every count), under the key's single-flight lock so
+  concurrent merges can't drop each other's registers.
+
+Adds with ``create=False`` only update counters that already exist, for
+counters that are (re)built from the database when missing.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import swr
+from .sketches import HyperLogLog
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "hll:"
+
+
+class CacheCounters:
+    name = "cache"
+
+    def __init__(self, flush_interval: float = 10):
+        self.flush_interval = flush_interval
+        self._pending = {}  # key -> (sketch, timeout, create)
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def add(self, key: str, items: Iterable, timeout: Optional[int] = None, create: bool = True) -> None:
+        with self._lock:
+            sketch, _, _ = self._pending.setdefault(key, (HyperLogLog(), timeout, create))
+            sketch.update(items)
+            due = time.monotonic() - self._flushed_at >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Merge this worker's buffered adds into the shared cache."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._flushed_at = time.monotonic()
+        retry = {}
+        for key, (sketch, timeout, create) in pending.items():
+            with swr.single_flight(KEY_PREFIX + key) as acquired:
+                if not acquired:
+                    retry[key] = (sketch, timeout, create)  # another worker is merging; next flush
+                    continue
+                stored = cache.get(KEY_PREFIX + key)
+                if stored is None and not create:
+                    continue
+                if stored is not None:
+                    sketch.merge(HyperLogLog.from_dict(stored))
+                cache.set(KEY_PREFIX + key, sketch.to_dict(), timeout)
+        if retry:
+            with self._lock:
+                for key, (sketch, timeout, create) in retry.items():
+                    buffered = self._pending.get(key)
+                    if buffered is not None:
+                        sketch.merge(buffered[0])
+                    self._pending[key] = (sketch, timeout, create)
+
+    def exists(self, key: str) -> bool:
+        return KEY_PREFIX + key in cache
+
+    def store(self, key: str, items: Iterable, timeout: Optional[int] = None) -> None:
+        sketch = HyperLogLog()
+        sketch.update(items)
+        cache.set(KEY_PREFIX + key, sketch.to_dict(), timeout)
+
+    def count(self, *keys: str) -> int:
+        self.flush()
+        union = HyperLogLog()
+        for stored in cache.get_many([KEY_PREFIX + key for key in keys]).values():
+            union.merge(HyperLogLog.from_dict(stored))
+        return union.count()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._pending.pop(key, None)
+        cache.delete(KEY_PREFIX + key)
+
+
+class RedisCounters:
+    name = "redis"
+    prefix = "quizzy:" + KEY_PREFIX
+
+    def __init__(self, url: str):
+        import redis  # type: ignore
+
+        self.client = redis.Redis.from_url(url, socket_connect_timeout=0.2)
+
+    def add(self, key: str, items: Iterable, timeout: Optional[int] = None, create: bool = True) -> None:
+        items = list(items)
+        if not items or (not create and not self.exists(key)):
+            return
+        pipe = self.client.pipeline(transaction=True)
+        pipe.pfadd(self.prefix + key, *items)
+        if timeout is not None:
+            pipe.expire(self.prefix + key, timeout)
+        pipe.execute()
+
+    def flush(self) -> None:
+        pass
+
+    def exists(self, key: str) -> bool:
+        return bool(self.client.exists(self.prefix + key))
+
+    def store(self, key: str, items: Iterable, timeout: Optional[int] = None) -> None:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self.prefix + key)
+        pipe.pfadd(self.prefix + key, *items)  # with no items this still creates the (empty) counter
+        if timeout is not None:
+            pipe.expire(self.prefix + key, timeout)
+        pipe.execute()
+
+    def count(self, *keys: str) -> int:
+        return self.client.pfcount(*[self.prefix + key for key in keys]) if keys else 0
+
+    def delete(self, key: str) -> None:
+        self.client.delete(self.prefix + key)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = getattr(settings, "DISTINCT_COUNTER_BACKEND", "cache")
+        if name == "redis":
+            try:
+                _backend = RedisCounters(settings.REDIS_URL)
+                _backend.client.ping()
+            except Exception:
+                logger.warning("Redis distinct counters unavailable; using the cache backend")
+                _backend = None
+        if _backend is None:
+            _backend = CacheCounters(getattr(settings, "DISTINCT_COUNTER_FLUSH_INTERVAL", 10))
+    return _backend
+
+
+def add(key: str, *items, timeout: Optional[int] = None, create: bool = True) -> None:
+    get_backend().add(key, items, timeout=timeout, create=create)
+
+
+def count(*keys: str) -> int:
+    """Approximate number of distinct items added to any of ``keys``."""
+    return get_backend().count(*keys)
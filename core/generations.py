@@ -0,0 +1,52 @@
+"""Generation counters for whole cached resources.
+
+A resource (say, the public quiz list) has a generation number in the
+cache. Cache keys of anything derived from it embed the generation, and
+writes bump it: every older entry is orphaned at once, without tracking
+which keys exist, and expires on its own. Bumps happen immediately and
+again on commit, so a reader that cached data from before the commit is
+orphaned too.
+"""
+
+from __future__ import annotations
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+GENERATION_KEY = "generation:%s"
+
+
+def current(name: str) -> int:
+    return current_many(name)[0]
+
+
+def current_many(*names: str) -> tuple:
+    """Generations of ``names``, in order, read in one cache round trip."""
+    keys = [GENERATION_KEY % name for name in names]
+    found = cache.get_many(keys)
+    generations = []
+    for key in keys:
+        if key not in found:
+            # Start from the clock, not zero, so an evicted counter can't
+            # resurrect entries cached under an earlier incarnation.
+            cache.add(key, time.time_ns(), None)
+            found[key] = cache.get(key)
+        generations.append(found[key])
+    return tuple(generations)
+
+
+def _bump(key: str) -> None:
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def bump(name: str, on_commit: bool = True) -> None:
+    """Bump now and, unless the caller already runs after commit, again on commit."""
+    key = GENERATION_KEY % name
+    _bump(key)
+    if on_commit:
+        transaction.on_commit(lambda: _bump(key))
@@ -16,20 +16,18 @@ class AttemptGuardMiddleware:
             quiz_id = view_kwargs.get("pk")
             if not quiz_id:
                 return None
-            # Owner cannot attempt their own quiz
-            from quizzes.models import Quiz
+            # Creator and attempt counts come from the cached entitlement record
+            from submissions.entitlements import get_entitlement
 
-            try:
-                quiz = Quiz.objects.only("id", "creator_id").get(pk=quiz_id)
-            except Quiz.DoesNotExist:
+            entitlement = get_entitlement(request.user.id, quiz_id)
+            if entitlement is None:
                 return None
 
-            if quiz.creator_id == request.user.id:
+            # Owner cannot attempt their own quiz
+            if entitlement.creator_id == request.user.id:
                 return HttpResponseForbidden("Owners cannot attempt their own quizzes")
 
-            # Enforce remaining attempts
-            from submissions.services import remaining_attempts
-
-            if remaining_attempts(request.user, quiz_id) <= 0:
+            # Enforce remaining attempts (resuming the open one is always allowed)
+            if not entitlement.can_start:
                 return HttpResponseForbidden("No attempts left")
         return None
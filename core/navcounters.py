@@ -0,0 +1,84 @@
+"""Per-user navbar counters kept in the cache.
+
+The navbar counts a user's pending invitations and submissions. Each count
+is cached on its own (invitations per email, which is what they address;
+submissions per user) and dropped by the invitation and submission signals,
+immediately and again on commit, so the next read recounts. Bulk updates
+that bypass signals drop them explicitly (see ``quizzes.services``).
+
+:func:`lazy_counters` hands templates lazy values: a page that never shows
+a count never reads the cache or the database for it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.functional import SimpleLazyObject, new_method_proxy
+
+INVITES_KEY = "nav:invites:%s"
+SUBMISSIONS_KEY = "nav:submissions:%s"
+
+
+def _timeout() -> int:
+    return getattr(settings, "NAV_COUNTERS_CACHE_TIMEOUT", 60 * 60)
+
+
+def _invites_key(email: str) -> str:
+    # Emails may hold characters some cache backends reject in keys
+    return INVITES_KEY % hashlib.sha1(email.encode()).hexdigest()
+
+
+def _cached(key: str, count) -> int:
+    value = cache.get(key)
+    if value is None:
+        value = count()
+        cache.set(key, value, _timeout())
+    return value
+
+
+def pending_invitations(email: str) -> int:
+    from quizzes.models import Invitation  # local import to avoid circulars
+
+    if not email:
+        return 0
+    return _cached(
+        _invites_key(email),
+        lambda: Invitation.objects.filter(email=email, accepted=False, declined=False).count(),
+    )
+
+
+def submission_count(user_id: int) -> int:
+    from submissions.models import Submission
+
+    return _cached(SUBMISSIONS_KEY % user_id, lambda: Submission.objects.filter(user_id=user_id).count())
+
+
+def _drop_now_and_on_commit(key: str) -> None:
+    cache.delete(key)
+    transaction.on_commit(lambda: cache.delete(key))
+
+
+def invalidate_invitations(email: str) -> None:
+    if email:
+        _drop_now_and_on_commit(_invites_key(email))
+
+
+def invalidate_submissions(user_id: int) -> None:
+    _drop_now_and_on_commit(SUBMISSIONS_KEY % user_id)
+
+
+class LazyCount(SimpleLazyObject):
+    __int__ = new_method_proxy(int)
+
+
+def lazy_counters(user) -> dict:
+    """Lazy ``invites`` and ``submissions`` counts of ``user``, computed on first use."""
+    email, user_id = user.email, user.pk
+    return {
+        "invites": LazyCount(lambda: pending_invitations(email)),
+        "submissions": LazyCount(lambda: submission_count(user_id)),
+    }
@@ -0,0 +1,199 @@
+"""Mergeable streaming sketches.
+
+:class:`KLLSketch` is the quantile sketch of Karnin, Lang & Liberty
+("Optimal Quantile Approximation in Streams", 2016), after Liberty's
+reference implementation: a stack of compactors where level ``h`` holds
+items of weight ``2**h``. A full compactor sorts itself and promotes every
+other item (random offset) to the next level. With ``k`` = 200 the rank
+error is about 1.7% of ``n`` with high probability, in O(k) memory however
+many items were seen. Sketches of the same ``k`` merge level by level, so
+per-worker sketches can be combined.
+
+Sketches serialize to plain dicts (:meth:`to_dict`) for the cache.
+
+:class:`HyperLogLog` counts distinct items (Flajolet et al., 2007, with
+linear counting for small cardinalities as in Heule, Nunkesser & Hall,
+"HyperLogLog in Practice", 2013). ``2**p`` one-byte registers keep the
+longest run of leading zeros seen among the 64-bit hashes routed to them;
+with ``p`` = 12 (4 KiB) the standard error is about 1.6%. Merging takes
+the register-wise maximum, so sketches of the same ``p`` built by different
+workers combine into the sketch of the union.
+"""
+
+from __future__ import annotations
+
+import bisect
+import hashlib
+import math
+import random
+from typing import Iterable, Optional
+
+
+class KLLSketch:
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: Optional[int] = None):
+        self.k = k
+        self.c = c
+        self.n = 0
+        self.levels = [[]]
+        self._size = 0
+        self._max_size = self._capacity(0)
+        self._rng = random.Random(seed)
+        self._cdf = None
+
+    # Building ------------------------------------------------------------
+
+    def _capacity(self, height: int) -> int:
+        depth = len(self.levels) - height - 1
+        return max(2, math.ceil(self.k * self.c ** depth))
+
+    def _grow(self) -> None:
+        self.levels.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.levels)))
+
+    def update(self, value) -> None:
+        self.levels[0].append(value)
+        self.n += 1
+        self._size += 1
+        self._cdf = None
+        if self._size >= self._max_size:
+            self._compress()
+
+    def update_many(self, values: Iterable) -> None:
+        for value in values:
+            self.update(value)
+
+    def _compress(self) -> None:
+        for height in range(len(self.levels)):
+            level = self.levels[height]
+            if len(level) < self._capacity(height):
+                continue
+            if height + 1 == len(self.levels):
+                self._grow()
+            level.sort()
+            # An odd item out stays behind so no weight is lost
+            keep = [level.pop()] if len(level) % 2 else []
+            promoted = level[self._rng.random() < 0.5::2]
+            self.levels[height + 1].extend(promoted)
+            self.levels[height] = keep
+            self._size -= len(level) - len(promoted)
+            if self._size < self._max_size:
+                break
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        """Fold ``other`` into this sketch (same ``k``); returns ``self``."""
+        if other.k != self.k:
+            raise ValueError("Can only merge KLL sketches with the same k")
+        while len(self.levels) < len(other.levels):
+            self._grow()
+        for height, level in enumerate(other.levels):
+            self.levels[height].extend(level)
+        self.n += other.n
+        self._size = sum(len(level) for level in self.levels)
+        self._cdf = None
+        while self._size >= self._max_size:
+            self._compress()
+        return self
+
+    # Queries -------------------------------------------------------------
+
+    def _weighted(self):
+        if self._cdf is None:
+            items = sorted(
+                (value, 1 << height) for height, level in enumerate(self.levels) for value in level
+            )
+            values, cumulative, total = [], [], 0
+            for value, weight in items:
+                total += weight
+                values.append(value)
+                cumulative.append(total)
+            self._cdf = (values, cumulative, total)
+        return self._cdf
+
+    def rank(self, value, inclusive: bool = False) -> float:
+        """Approximate fraction of items ``< value`` (``<=`` when ``inclusive``)."""
+        values, cumulative, total = self._weighted()
+        if not total:
+            return 0.0
+        index = (bisect.bisect_right if inclusive else bisect.bisect_left)(values, value)
+        return cumulative[index - 1] / total if index else 0.0
+
+    def quantile(self, q: float):
+        """Approximate item at normalized rank ``q`` (0..1); ``None`` when empty."""
+        values, cumulative, total = self._weighted()
+        if not total:
+            return None
+        index = bisect.bisect_left(cumulative, q * total)
+        return values[min(index, len(values) - 1)]
+
+    def histogram(self, edges: list) -> list:
+        """Approximate item counts in ``[edges[i], edges[i + 1])``."""
+        ranks = [self.rank(edge) for edge in edges]
+        return [round((high - low) * self.n) for low, high in zip(ranks, ranks[1:])]
+
+    # Serialization -------------------------------------------------------
+
+    def to_dict(self) -> dict:
+        return {"k": self.k, "c": self.c, "n": self.n, "levels": [list(level) for level in self.levels]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "KLLSketch":
+        sketch = cls(k=data["k"], c=data["c"])
+        sketch.n = data["n"]
+        sketch.levels = [list(level) for level in data["levels"]]
+        sketch._size = sum(len(level) for level in sketch.levels)
+        sketch._max_size = sum(sketch._capacity(h) for h in range(len(sketch.levels)))
+        return sketch
+
+
+class HyperLogLog:
+    def __init__(self, p: int = 12, registers: Optional[bytes] = None):
+        if not 4 <= p <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16")
+        self.p = p
+        self.m = 1 << p
+        if registers is not None and len(registers) != self.m:
+            raise ValueError("Register count does not match the precision")
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+
+    @staticmethod
+    def _hash(item) -> int:
+        return int.from_bytes(hashlib.blake2b(str(item).encode(), digest_size=8).digest(), "big")
+
+    def add(self, item) -> bool:
+        """Count ``item``; returns whether any register changed."""
+        h = self._hash(item)
+        index = h >> (64 - self.p)
+        rest = h & ((1 << (64 - self.p)) - 1)
+        rho = (64 - self.p) - rest.bit_length() + 1
+        if rho > self.registers[index]:
+            self.registers[index] = rho
+            return True
+        return False
+
+    def update(self, items: Iterable) -> None:
+        for item in items:
+            self.add(item)
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold ``other`` into this sketch (same ``p``); returns ``self``."""
+        if other.p != self.p:
+            raise ValueError("Can only merge HyperLogLog sketches with the same precision")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+        return self
+
+    def count(self) -> int:
+        """Approximate number of distinct items added."""
+        m = self.m
+        alpha = {16: 0.673, 32: 0.697, 64: 0.709}.get(m, 0.7213 / (1 + 1.079 / m))
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_dict(self) -> dict:
+        return {"p": self.p, "registers": bytes(self.registers)}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HyperLogLog":
+        return cls(p=data["p"], registers=data["registers"])
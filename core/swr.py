@@ -0,0 +1,140 @@
+"""Stale-while-revalidate caching with single-flight rebuilds.
+
+Values are cached in an envelope carrying their soft expiry and how long
+they took to compute. Readers:
+
+* get a fresh value straight away, except that close to expiry each reader
+  may volunteer to refresh early with a probability that grows as expiry
+  approaches (XFetch: ``now - delta * beta * log(rand) >= expiry``);
+* after the soft expiry (or :func:`mark_stale`) keep getting the previous
+  value for up to ``grace`` seconds while exactly one of them recomputes;
+* on a cold miss, one reader computes and the others wait briefly for it.
+
+"Exactly one" is enforced with ``cache.add`` on a lock key, which is atomic
+on the shared cache backends, so it holds across workers.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+from django.core.cache import cache
+
+from quiz_project import metrics
+
+LOCK_SUFFIX = ":rebuild-lock"
+
+
+def _observe(name: str, result: str) -> None:
+    metrics.cache_requests_total.labels(name, result).inc()
+
+
+def observe_rebuild(name: str, seconds: float) -> None:
+    metrics.cache_rebuild_seconds.labels(name).observe(seconds)
+
+
+def _compute_and_store(key: str, compute: Callable, ttl: float, grace: float, name: str):
+    started = time.perf_counter()
+    try:
+        value = compute()
+    finally:
+        delta = time.perf_counter() - started
+        observe_rebuild(name, delta)
+    envelope = {"value": value, "expires": time.time() + ttl, "delta": delta, "grace": grace}
+    cache.set(key, envelope, ttl + grace)
+    return value
+
+
+@contextmanager
+def single_flight(key: str, timeout: float = 10):
+    """Take the rebuild lock for ``key`` if nobody holds it; yields whether it was acquired."""
+    lock_key = key + LOCK_SUFFIX
+    acquired = cache.add(lock_key, 1, timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(lock_key)
+
+
+@contextmanager
+def locked(key: str, timeout: float = 10, poll: float = 0.01):
+    """Hold an exclusive lock on ``key`` across workers, waiting for it if needed.
+
+    The lock expires after ``timeout`` seconds, so a crashed holder blocks
+    the others for at most that long.
+    """
+    lock_key = key + LOCK_SUFFIX
+    deadline = time.monotonic() + timeout
+    while not cache.add(lock_key, 1, timeout):
+        if time.monotonic() >= deadline:
+            cache.set(lock_key, 1, timeout)  # the holder overran its lease; take over
+            break
+        time.sleep(poll)
+    try:
+        yield
+    finally:
+        cache.delete(lock_key)
+
+
+def refresh(key: str, compute: Callable, *, ttl: float, grace: float = 300, name: str = "default"):
+    """Recompute ``key`` now, bypassing the cached value, and store the result."""
+    _observe(name, "forced")
+    return _compute_and_store(key, compute, ttl, grace, name)
+
+
+def _try_rebuild(key, compute, ttl, grace, name, lock_timeout):
+    with single_flight(key, lock_timeout) as acquired:
+        if not acquired:
+            return False, None
+        return True, _compute_and_store(key, compute, ttl, grace, name)
+
+
+def get_or_compute(key: str, compute: Callable, *, ttl: float, grace: float = 300, beta: float = 1.0,
+                   lock_timeout: float = 10, wait: float = 0.5, name: str = "default"):
+    """Return the cached value for ``key``, recomputing it at most once at a time."""
+    envelope = cache.get(key)
+    if envelope is not None:
+        now = time.time()
+        expires = envelope["expires"]
+        if now < expires:
+            early = now - envelope["delta"] * beta * math.log(random.random() or 1e-12) >= expires
+            if early:
+                rebuilt, value = _try_rebuild(key, compute, ttl, grace, name, lock_timeout)
+                if rebuilt:
+                    _observe(name, "early_refresh")
+                    return value
+            _observe(name, "hit")
+            return envelope["value"]
+        # Stale: one reader refreshes, everyone else keeps the previous snapshot
+        rebuilt, value = _try_rebuild(key, compute, ttl, grace, name, lock_timeout)
+        _observe(name, "refresh" if rebuilt else "stale")
+        return value if rebuilt else envelope["value"]
+
+    rebuilt, value = _try_rebuild(key, compute, ttl, grace, name, lock_timeout)
+    if rebuilt:
+        _observe(name, "miss")
+        return value
+    # Someone else is computing a cold entry: wait for it rather than piling on
+    deadline = time.monotonic() + wait
+    while time.monotonic() < deadline:
+        time.sleep(0.01)
+        envelope = cache.get(key)
+        if envelope is not None:
+            _observe(name, "coalesced")
+            return envelope["value"]
+    _observe(name, "miss")
+    return _compute_and_store(key, compute, ttl, grace, name)
+
+
+def mark_stale(key: str) -> None:
+    """Expire ``key`` softly: readers keep the old value until one has rebuilt it."""
+    envelope = cache.get(key)
+    if envelope is None:
+        return
+    envelope["expires"] = 0
+    cache.set(key, envelope, envelope["grace"])
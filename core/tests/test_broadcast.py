@@ -0,0 +1,73 @@
+import threading
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core import channels
+from core.channels import BroadcastScheduler
+from quiz_project import metrics
+
+
+def _merged():
+    return metrics.leaderboard_broadcasts_merged_total._value.get()
+
+
+class BroadcastSchedulerTests(SimpleTestCase):
+    def test_burst_collapses_to_leading_and_trailing_push(self):
+        fired = threading.Event()
+        sent = []
+
+        def send(quiz_id):
+            sent.append(quiz_id)
+            if len(sent) == 3:
+                fired.set()
+
+        scheduler = BroadcastScheduler(0.05, send=send)
+        merged = _merged()
+        for _ in range(10):
+            scheduler.schedule(1)
+        scheduler.schedule(2)
+        self.assertEqual(sorted(sent), [1, 2])  # leading edges go out at once
+        self.assertTrue(fired.wait(2))
+        self.assertEqual(sorted(sent), [1, 1, 2])  # one trailing push carries the final state
+        self.assertEqual(_merged(), merged + 8)
+
+    def test_zero_window_sends_every_update(self):
+        send = mock.Mock()
+        scheduler = BroadcastScheduler(0, send=send)
+        for _ in range(3):
+            scheduler.schedule(5)
+        self.assertEqual(send.call_count, 3)
+
+    def test_flush_fires_pending_pushes(self):
+        send = mock.Mock()
+        scheduler = BroadcastScheduler(60, send=send)
+        scheduler.schedule(3)
+        scheduler.schedule(3)
+        scheduler.flush()
+        self.assertEqual(send.call_count, 2)
+        scheduler.schedule(3)  # the flushed push opened a new window
+        self.assertEqual(send.call_count, 2)
+        scheduler.flush()
+
+    def test_timer_push_releases_its_connection(self):
+        fired = threading.Event()
+        scheduler = BroadcastScheduler(0.01, send=lambda quiz_id: None)
+        with mock.patch.object(channels, "close_old_connections") as close_old, \
+                mock.patch.object(channels.connections, "close_all", side_effect=lambda: fired.set()):
+            scheduler.schedule(4)
+            scheduler.schedule(4)
+            self.assertTrue(fired.wait(2))
+        close_old.assert_called_once_with()
+
+    def test_process_scheduler_flush_and_reset(self):
+        send = mock.Mock()
+        with mock.patch.object(channels, "_scheduler", BroadcastScheduler(60, send=send)):
+            channels.schedule_leaderboard_broadcast(6)
+            channels.schedule_leaderboard_broadcast(6)
+            channels.flush_leaderboard_broadcasts()  # what commands do before exiting
+            self.assertEqual(send.call_count, 2)
+            channels.schedule_leaderboard_broadcast(6)
+            channels.reset_scheduler()
+            self.assertIsNone(channels._scheduler)
+        self.assertEqual(send.call_count, 2)  # the pending push was dropped
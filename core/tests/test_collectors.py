@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+
+from quiz_project import collectors
+from quizzes.models import Invitation, Quiz
+from submissions.models import Submission
+
+
+class BusinessMetricsCollectorTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.user = User.objects.create_user(username="u", password="x")
+        quiz = Quiz.objects.create(title="Q", creator=self.owner, is_published=True)
+        Quiz.objects.create(title="Draft", creator=self.owner)
+        Submission.objects.create(quiz=quiz, user=self.user)
+        Invitation.objects.create(quiz=quiz, email="a@example.com", invited_by=self.owner)
+        Invitation.objects.create(quiz=quiz, email="b@example.com", invited_by=self.owner, accepted=True)
+
+    def _scrape(self):
+        body = self.client.get("/metrics").content.decode()
+        return {
+            line.split(" ")[0]: float(line.split(" ")[1])
+            for line in body.splitlines()
+            if line.startswith(("quizzy_active", "quizzy_submissions_in", "quizzy_invitations", "quizzy_quizzes_pub"))
+        }
+
+    def test_scrape_reports_a_cached_sample(self):
+        values = self._scrape()
+        self.assertEqual(values["quizzy_submissions_in_progress"], 1)
+        self.assertEqual(values["quizzy_invitations_pending"], 1)
+        self.assertEqual(values["quizzy_quizzes_published"], 1)
+        self.assertIn('quizzy_active_users_window{window="24h"}', values)
+        with self.assertNumQueries(0):
+            self.assertEqual(list(collectors.BusinessMetricsCollector().collect())[1].samples[0].value, 1)
+
+    def test_requests_do_not_sample(self):
+        self.client.login(username="u", password="x")
+        with mock.patch.object(collectors, "sample") as sample:
+            self.client.get("/quizzes/")
+        sample.assert_not_called()
+
+    def test_failed_sample_leaves_the_scrape_working(self):
+        with mock.patch.object(collectors, "sample", side_effect=RuntimeError("db down")):
+            self.assertEqual(list(collectors.BusinessMetricsCollector().collect()), [])
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
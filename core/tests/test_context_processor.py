@@ -1,4 +1,12 @@
-from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.context_processors import global_ui
+from quizzes.models import Invitation, Quiz
+from quizzes.services import decline_invite
+from submissions.models import Submission
 
 
 class ContextProcessorTests(TestCase):
@@ -9,4 +17,53 @@ class ContextProcessorTests(TestCase):
             'FEATURE_FLAGS','PENDING_INVITES_COUNT','ACTIVE_QUIZ_ATTEMPTS',
             'MAX_QUIZ_ATTEMPTS','BUILD_TIMESTAMP'
         ]:
-            self.assertIn(key, resp.context)
\ No newline at end of file
+            self.assertIn(key, resp.context)
+
+class NavCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username='owner', password='x')
+        self.user = User.objects.create_user(username='u', password='x', email='u@example.com')
+        self.quiz = Quiz.objects.create(title='Q', creator=self.owner, is_published=True)
+        Invitation.objects.create(quiz=self.quiz, email='u@example.com', invited_by=self.owner)
+        other = Quiz.objects.create(title='R', creator=self.owner, is_published=True)
+        Invitation.objects.create(quiz=other, email='u@example.com', invited_by=self.owner, accepted=True)
+
+    def _context(self):
+        request = RequestFactory().get('/')
+        request.user = self.user
+        return global_ui(request)
+
+    def _counts(self):
+        context = self._context()
+        return int(context['PENDING_INVITES_COUNT']), int(context['ACTIVE_QUIZ_ATTEMPTS'])
+
+    def test_counts_are_lazy_and_cached(self):
+        with self.assertNumQueries(0):
+            self._context()  # nothing read until a template uses the counts
+        with self.assertNumQueries(2):
+            self.assertEqual(self._counts(), (1, 0))
+        with self.assertNumQueries(0):
+            self.assertEqual(self._counts(), (1, 0))
+
+    def test_signals_and_services_refresh_the_counts(self):
+        self.assertEqual(self._counts(), (1, 0))
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.objects.create(quiz=self.quiz, user=self.user)
+        self.assertEqual(self._counts(), (1, 1))
+        decline_invite(self.user, self.quiz)
+        self.assertEqual(self._counts(), (0, 1))
+        third = Quiz.objects.create(title='S', creator=self.owner, is_published=True)
+        invite = Invitation.objects.create(quiz=third, email='u@example.com', invited_by=self.owner)
+        self.assertEqual(self._counts(), (1, 1))
+        invite.delete()
+        self.assertEqual(self._counts(), (0, 1))
+
+    def test_submitting_through_the_take_view_refreshes_the_count(self):
+        quiz = Quiz.objects.create(title='M', creator=self.owner, is_published=True, allow_multiple_attempts=True)
+        self.assertEqual(self._counts(), (1, 0))
+        self.client.login(username='u', password='x')
+        for expected in (1, 2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse('quizzes:take', args=[quiz.id]), {})
+            self.assertEqual(self._counts(), (1, expected))
@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from core import counters, swr
+from core.counters import KEY_PREFIX, CacheCounters
+from quiz_project.stats import ActiveUsersMiddleware, active_users, record_active_user
+
+
+class CacheCountersTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_workers_merge_into_one_counter(self):
+        a, b = CacheCounters(flush_interval=60), CacheCounters(flush_interval=60)
+        a.add("k", range(0, 600))
+        b.add("k", range(400, 1000))
+        self.assertIsNone(cache.get(KEY_PREFIX + "k"))  # buffered until a flush
+        a.flush()
+        self.assertAlmostEqual(b.count("k"), 1000, delta=50)  # counting flushes the reader
+        self.assertAlmostEqual(CacheCounters().count("k", "missing"), 1000, delta=50)
+
+    def test_adds_wait_for_a_held_lock(self):
+        worker = CacheCounters(flush_interval=60)
+        worker.add("k", [1, 2, 3])
+        with swr.single_flight(KEY_PREFIX + "k"):
+            worker.flush()
+        self.assertIsNone(cache.get(KEY_PREFIX + "k"))
+        worker.add("k", [4])
+        self.assertEqual(worker.count("k"), 4)
+
+    def test_create_false_only_updates_existing_counters(self):
+        worker = CacheCounters(flush_interval=0)
+        worker.add("k", [1], create=False)
+        self.assertFalse(worker.exists("k"))
+        worker.store("k", [1, 2])
+        worker.add("k", [3], create=False)
+        self.assertEqual(worker.count("k"), 3)
+        worker.delete("k")
+        self.assertEqual(worker.count("k"), 0)
+
+
+class ActiveUserTests(SimpleTestCase):
+    NOW = 1_700_000_000.0
+
+    def setUp(self):
+        cache.clear()
+        self.backend = CacheCounters(flush_interval=60)
+        patcher = mock.patch.object(counters, "_backend", self.backend)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_windows_count_distinct_users(self):
+        for minutes_ago, user_id in [(0, 1), (1, 1), (2, 2), (20, 3), (50, 4), (600, 5)]:
+            record_active_user(user_id, now=self.NOW - minutes_ago * 60)
+        self.assertEqual(active_users(300, now=self.NOW), 2)
+        self.assertEqual(active_users(1800, now=self.NOW), 3)
+        self.assertEqual(active_users(86400, now=self.NOW), 5)
+
+    def test_middleware_records_users_without_queries(self):
+        middleware = ActiveUsersMiddleware(lambda request: HttpResponse())
+        for user in [User(pk=41), User(pk=42), User(pk=41), AnonymousUser()]:
+            request = RequestFactory().get("/")
+            request.user = user
+            middleware(request)  # SimpleTestCase fails any database query
+        self.assertEqual(active_users(300), 2)
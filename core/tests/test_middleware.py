@@ -1,8 +1,10 @@
-from django.test import TestCase
+from django.test import RequestFactory, TestCase
 from django.urls import reverse
 from django.contrib.auth.models import User
 
+from core.middleware import AttemptGuardMiddleware
 from quizzes.models import Quiz
+from submissions.attempts import finish_attempt
 from submissions.models import Submission
 
 
@@ -21,7 +23,7 @@ class AttemptGuardMiddlewareTests(TestCase):
 
     def test_no_attempts_left_blocked(self):
         self.client.login(username="u", password="x")
-        Submission.objects.create(quiz=self.quiz, user=self.user, attempt_number=1)
+        Submission.objects.create(quiz=self.quiz, user=self.user, attempt_number=1, in_progress=False)
         url = reverse("quiz-start", kwargs={"pk": self.quiz.id})
         res = self.client.get(url)
         self.assertEqual(res.status_code, 403)
@@ -33,3 +35,32 @@ class AttemptGuardMiddlewareTests(TestCase):
         res = self.client.get(url)
         self.assertEqual(res.status_code, 200)
         self.assertIn(b"Started quiz", res.content)
+
+    def test_open_attempt_can_be_resumed(self):
+        self.client.login(username="u", password="x")
+        url = reverse("quiz-start", kwargs={"pk": self.quiz.id})
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(self.client.get(url).status_code, 200)  # single-attempt quiz: same open attempt
+        self.assertEqual(Submission.objects.filter(quiz=self.quiz, user=self.user).count(), 1)
+
+        finish_attempt(Submission.objects.get(user=self.user))
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    def test_warm_guard_costs_no_queries(self):
+        middleware = AttemptGuardMiddleware(lambda request: None)
+        url = reverse("quiz-start", kwargs={"pk": self.quiz.id})
+        request = RequestFactory().get(url)
+        request.user = self.user
+        self.assertIsNone(middleware.process_view(request, None, (), {"pk": self.quiz.id}))
+        with self.assertNumQueries(0):
+            self.assertIsNone(middleware.process_view(request, None, (), {"pk": self.quiz.id}))
+
+        # A new submission invalidates the cached attempt count
+        Submission.objects.create(quiz=self.quiz, user=self.user, attempt_number=1, in_progress=False)
+        self.assertEqual(middleware.process_view(request, None, (), {"pk": self.quiz.id}).status_code, 403)
+
+        # So does raising the quiz's attempt limit
+        self.quiz.allow_multiple_attempts = True
+        self.quiz.max_attempts = 2
+        self.quiz.save()
+        self.assertIsNone(middleware.process_view(request, None, (), {"pk": self.quiz.id}))
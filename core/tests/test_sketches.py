@@ -0,0 +1,98 @@
+import bisect
+import random
+
+from django.test import SimpleTestCase
+
+from core.sketches import HyperLogLog, KLLSketch
+
+
+def _exact_rank(ordered, value):
+    return bisect.bisect_left(ordered, value) / len(ordered)
+
+
+class KLLSketchTests(SimpleTestCase):
+    # k=200 promises ~1.7% rank error w.h.p.; assert a little looser, seeded
+    TOLERANCE = 0.02
+
+    def setUp(self):
+        rng = random.Random(42)
+        self.scores = [min(20, max(0, int(rng.gauss(12, 4)))) for _ in range(50_000)]
+        self.ordered = sorted(self.scores)
+
+    def assertRanksClose(self, sketch, points):
+        worst = max(abs(sketch.rank(x) - _exact_rank(self.ordered, x)) for x in points)
+        self.assertLess(worst, self.TOLERANCE)
+
+    def test_rank_error_is_bounded(self):
+        sketch = KLLSketch(seed=1)
+        sketch.update_many(self.scores)
+        self.assertEqual(sketch.n, len(self.scores))
+        self.assertLess(sum(len(level) for level in sketch.levels), 1_000)  # O(k), not O(n)
+        self.assertRanksClose(sketch, range(22))
+
+    def test_continuous_quantiles(self):
+        rng = random.Random(7)
+        values = [rng.random() for _ in range(30_000)]
+        sketch = KLLSketch(seed=2)
+        sketch.update_many(values)
+        ordered = sorted(values)
+        for q in (0.01, 0.25, 0.5, 0.75, 0.99):
+            estimate = sketch.quantile(q)
+            self.assertLess(abs(_exact_rank(ordered, estimate) - q), self.TOLERANCE)
+
+    def test_merged_sketches_match_the_whole_stream(self):
+        parts = [KLLSketch(seed=i) for i in range(4)]
+        for i, score in enumerate(self.scores):
+            parts[i % 4].update(score)
+        merged = parts[0]
+        for part in parts[1:]:
+            merged.merge(part)
+        self.assertEqual(merged.n, len(self.scores))
+        self.assertRanksClose(merged, range(22))
+        with self.assertRaises(ValueError):
+            merged.merge(KLLSketch(k=100))
+
+    def test_histogram_and_round_trip(self):
+        sketch = KLLSketch(seed=3)
+        sketch.update_many(self.scores)
+        restored = KLLSketch.from_dict(sketch.to_dict())
+        self.assertEqual(restored.rank(12), sketch.rank(12))
+        edges = [0, 5, 10, 15, 21]
+        exact = [bisect.bisect_left(self.ordered, hi) - bisect.bisect_left(self.ordered, lo) for lo, hi in zip(edges, edges[1:])]
+        for approx, count in zip(restored.histogram(edges), exact):
+            self.assertLess(abs(approx - count), self.TOLERANCE * len(self.scores) * 2)
+        self.assertEqual(KLLSketch().rank(3), 0.0)
+        self.assertIsNone(KLLSketch().quantile(0.5))
+
+
+class HyperLogLogTests(SimpleTestCase):
+    # p=12 has a ~1.6% standard error; allow three of them
+    TOLERANCE = 0.05
+
+    def assertCountClose(self, sketch, exact):
+        self.assertLess(abs(sketch.count() - exact), self.TOLERANCE * exact)
+
+    def test_counts_distinct_items(self):
+        sketch = HyperLogLog()
+        self.assertEqual(sketch.count(), 0)
+        sketch.update(range(10))
+        sketch.update(range(10))
+        self.assertEqual(sketch.count(), 10)  # linear counting is exact-ish while sparse
+        sketch.update(range(100_000))
+        self.assertCountClose(sketch, 100_000)
+        self.assertEqual(len(sketch.registers), 4096)
+
+    def test_merge_counts_the_union(self):
+        a, b = HyperLogLog(), HyperLogLog()
+        a.update(range(0, 30_000))
+        b.update(range(20_000, 60_000))
+        self.assertCountClose(a.merge(b), 60_000)
+        with self.assertRaises(ValueError):
+            a.merge(HyperLogLog(p=10))
+
+    def test_round_trip(self):
+        sketch = HyperLogLog(p=10)
+        sketch.update(f"user-{i}" for i in range(5_000))
+        restored = HyperLogLog.from_dict(sketch.to_dict())
+        self.assertEqual(restored.count(), sketch.count())
+        self.assertFalse(restored.add("user-1"))
@@ -0,0 +1,92 @@
+import threading
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core import swr
+from quiz_project import metrics
+
+
+def _count(result, name="test"):
+    # Read the counter itself: a registry lookup would also run the business metrics collector
+    return metrics.cache_requests_total.labels(name, result)._value.get()
+
+
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        self.key = f"swr-test:{self.id()}"
+        cache.delete(self.key)
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return self.calls
+
+    def get(self, **kwargs):
+        return swr.get_or_compute(self.key, self.compute, ttl=60, name="test", **kwargs)
+
+    def test_fresh_value_is_served_from_cache(self):
+        hits = _count("hit")
+        self.assertEqual(self.get(), 1)
+        with mock.patch.object(swr.random, "random", return_value=0.999):
+            self.assertEqual(self.get(), 1)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(_count("hit"), hits + 1)
+
+    def test_stale_snapshot_served_while_another_worker_rebuilds(self):
+        self.get()
+        swr.mark_stale(self.key)
+        with swr.single_flight(self.key) as acquired:
+            self.assertTrue(acquired)
+            self.assertEqual(self.get(), 1)  # lock held elsewhere: previous snapshot
+        self.assertEqual(self.get(), 2)  # lock free: this reader refreshes
+        self.assertEqual(self.get(), 2)
+
+    def test_early_refresh_near_expiry(self):
+        self.get()
+        # One second left on an entry that took ten to compute: refresh is near certain
+        envelope = cache.get(self.key)
+        envelope.update(expires=time.time() + 1, delta=10)
+        cache.set(self.key, envelope)
+        with mock.patch.object(swr.random, "random", return_value=0.5):
+            self.assertEqual(self.get(), 2)
+
+    def test_concurrent_cold_misses_compute_once(self):
+        def slow():
+            time.sleep(0.1)
+            return self.compute()
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                swr.get_or_compute(self.key, slow, ttl=60, name="test", wait=2)
+            ))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(results, [1] * 8)
+
+    def test_locked_serializes_holders(self):
+        inside, overlaps = [], []
+
+        def work():
+            with swr.locked(self.key):
+                if inside:
+                    overlaps.append(1)
+                inside.append(1)
+                time.sleep(0.02)
+                inside.pop()
+
+        threads = [threading.Thread(target=work) for _ in range(5)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(overlaps, [])
+        self.assertTrue(cache.add(self.key + swr.LOCK_SUFFIX, 1, 1))  # released
@@ -0,0 +1,103 @@
+"""Business gauges sampled at scrape time instead of in requests.
+
+:class:`BusinessMetricsCollector` is registered with the default Prometheus
+registry, so ``/metrics`` evaluates it when scraped. It reports a snapshot
+of the counts below, cached for ``METRICS_SAMPLE_INTERVAL`` seconds in the
+shared cache through :mod:`core.swr`: one scrape per interval (across all
+workers) runs the queries while the others serve the previous snapshot.
+Requests never touch any of it.
+"""
+from __future__ import annotations
+
+import logging
+from threading import Lock
+
+from django.conf import settings
+from prometheus_client import REGISTRY
+from prometheus_client.core import GaugeMetricFamily
+
+from core import swr
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_KEY = 'metrics:business'
+
+# (metric name, help, snapshot field)
+GAUGES = (
+    ('quizzy_active_sessions', 'Unexpired sessions', 'active_sessions'),
+    ('quizzy_submissions_in_progress', 'Submissions started and not yet completed', 'submissions_in_progress'),
+    ('quizzy_invitations_pending', 'Invitations neither accepted nor declined', 'invitations_pending'),
+    ('quizzy_quizzes_published', 'Published quizzes', 'quizzes_published'),
+)
+ACTIVE_USERS = ('quizzy_active_users', 'Distinct authenticated users seen in the last 30 minutes (approximate)')
+ACTIVE_USERS_WINDOW = ('quizzy_active_users_window', 'Distinct authenticated users seen per time window (approximate)')
+
+
+def _interval() -> float:
+    return getattr(settings, 'METRICS_SAMPLE_INTERVAL', 30)
+
+
+def sample() -> dict:
+    """Run the queries behind the business gauges."""
+    from django.contrib.sessions.models import Session
+    from django.utils import timezone
+
+    from quiz_project.stats import ACTIVE_USER_WINDOWS, active_users
+    from quizzes.models import Invitation, Quiz
+    from submissions.models import Submission
+
+    return {
+        'active_sessions': Session.objects.filter(expire_date__gt=timezone.now()).count(),
+        'submissions_in_progress': Submission.objects.filter(in_progress=True).count(),
+        'invitations_pending': Invitation.objects.filter(accepted=False, declined=False).count(),
+        'quizzes_published': Quiz.objects.filter(is_published=True).count(),
+        'active_users': {label: active_users(seconds) for label, seconds in ACTIVE_USER_WINDOWS.items()},
+    }
+
+
+def snapshot() -> dict:
+    interval = _interval()
+    return swr.get_or_compute(SNAPSHOT_KEY, sample, ttl=interval, grace=interval, name='business-metrics')
+
+
+class BusinessMetricsCollector:
+    def _families(self):
+        gauges = {field: GaugeMetricFamily(name, doc) for name, doc, field in GAUGES}
+        active = GaugeMetricFamily(*ACTIVE_USERS)
+        windows = GaugeMetricFamily(*ACTIVE_USERS_WINDOW, labels=['window'])
+        return gauges, active, windows
+
+    def describe(self):
+        # Lets the registry learn the names without sampling at registration
+        gauges, active, windows = self._families()
+        return [*gauges.values(), active, windows]
+
+    def collect(self):
+        try:
+            values = snapshot()
+        except Exception:
+            logger.exception('Business metrics sampling failed')
+            return
+        gauges, active, windows = self._families()
+        for field, family in gauges.items():
+            family.add_metric([], values[field])
+            yield family
+        for label, count in values['active_users'].items():
+            windows.add_metric([label], count)
+        active.add_metric([], values['active_users'].get('30m', 0))
+        yield active
+        yield windows
+
+
+_lock = Lock()
+_collector = None
+
+
+def register(registry=REGISTRY) -> BusinessMetricsCollector:
+    """Register the collector once per process."""
+    global _collector
+    with _lock:
+        if _collector is None:
+            _collector = BusinessMetricsCollector()
+            registry.register(_collector)
+    return _collector
@@ -4,7 +4,7 @@ Centralizes metric definitions to avoid duplicate registrations when code reload
 """
 from __future__ import annotations
 
-from prometheus_client import Counter, Histogram, Gauge
+from prometheus_client import Counter, Histogram
 from prometheus_client import CollectorRegistry, CONTENT_TYPE_LATEST, generate_latest
 from threading import Lock
 
@@ -18,12 +18,17 @@ submission_created_total: Counter
 submission_score_hist: Histogram
 question_attempt_total: Counter
 question_correct_total: Counter
-active_users_gauge: Gauge
+cache_requests_total: Counter
+cache_rebuild_seconds: Histogram
+leaderboard_broadcasts_total: Counter
+leaderboard_broadcasts_merged_total: Counter
 
 
 def init_metrics():
     global _initialized, quiz_created_total, question_created_total, submission_created_total
-    global submission_score_hist, question_attempt_total, question_correct_total, active_users_gauge
+    global submission_score_hist, question_attempt_total, question_correct_total
+    global cache_requests_total, cache_rebuild_seconds
+    global leaderboard_broadcasts_total, leaderboard_broadcasts_merged_total
     if _initialized:
         return
     with _lock:
@@ -41,8 +46,14 @@ def init_metrics():
             'quizzy_question_attempts_total', 'Total question attempts', ['question_id','correct'])
         question_correct_total = Counter(
             'quizzy_question_correct_total', 'Total correct answers per question', ['question_id'])
-        active_users_gauge = Gauge(
-            'quizzy_active_users', 'Active authenticated users (session based)')
+        cache_requests_total = Counter(
+            'quizzy_cache_requests_total', 'Stale-while-revalidate cache lookups by outcome', ['cache','result'])
+        cache_rebuild_seconds = Histogram(
+            'quizzy_cache_rebuild_seconds', 'Time spent recomputing cached values', ['cache'])
+        leaderboard_broadcasts_total = Counter(
+            'quizzy_leaderboard_broadcasts_total', 'Leaderboard pushes sent, by debounce edge', ['edge'])
+        leaderboard_broadcasts_merged_total = Counter(
+            'quizzy_leaderboard_broadcasts_merged_total', 'Leaderboard updates merged into a pending push')
         _initialized = True
 
 
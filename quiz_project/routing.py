@@ -1,6 +1,7 @@
 from django.urls import re_path
-from realtime.consumers import LeaderboardConsumer
+from realtime.consumers import LeaderboardConsumer, ReceiptConsumer
 
 websocket_urlpatterns = [
     re_path(r"^ws/quizzes/(?P<quiz_id>\d+)/leaderboard/$", LeaderboardConsumer.as_asgi()),
+    re_path(r"^ws/receipts/(?P<token>[0-9a-f-]{36})/$", ReceiptConsumer.as_asgi()),
 ]
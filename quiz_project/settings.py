@@ -59,9 +59,11 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'quiz_project.stats.ActiveUsersMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'core.middleware.AttemptGuardMiddleware',
+    'submissions.coalesce.CoalescedScoringMiddleware',
     'django_prometheus.middleware.PrometheusAfterMiddleware',
 ]
 
@@ -246,6 +248,31 @@ else:
         "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}
     }
 
+# Leaderboard storage: 'redis' sorted sets when the channel layer uses Redis,
+# otherwise 'database' (ORDER BY + short cache), which every process shares.
+# 'memory' keeps process-local sorted sets: opt in for tests and
+# single-process development only.
+LEADERBOARD_BACKEND = os.environ.get(
+    "LEADERBOARD_BACKEND",
+    "redis" if CHANNEL_LAYERS["default"]["BACKEND"].startswith("channels_redis") else "database",
+)
+# The database backend counts at most this many entries for a rank lookup;
+# deeper ranks are estimated (sorted-set backends are always exact)
+LEADERBOARD_RANK_SCAN_LIMIT = int(os.environ.get("LEADERBOARD_RANK_SCAN_LIMIT", "10000"))
+# Minimum seconds between leaderboard pushes per quiz (0 pushes on every change)
+LEADERBOARD_BROADCAST_WINDOW = float(os.environ.get("LEADERBOARD_BROADCAST_WINDOW", "0.5"))
+# Approximate distinct counters (active users, quiz participants): Redis
+# HyperLogLogs, or sketches merged into the cache by each worker every
+# DISTINCT_COUNTER_FLUSH_INTERVAL seconds.
+DISTINCT_COUNTER_BACKEND = os.environ.get(
+    "DISTINCT_COUNTER_BACKEND",
+    "redis" if LEADERBOARD_BACKEND == "redis" else "cache",
+)
+DISTINCT_COUNTER_FLUSH_INTERVAL = float(os.environ.get("DISTINCT_COUNTER_FLUSH_INTERVAL", "10"))
+# Seconds a sample of the business gauges (sessions, open submissions, pending
+# invitations, published quizzes, active users) is served to /metrics scrapes
+METRICS_SAMPLE_INTERVAL = float(os.environ.get("METRICS_SAMPLE_INTERVAL", "30"))
+
 # Cache: prefer Redis if available, fallback to locmem
 USE_REDIS_CACHE = os.environ.get("USE_REDIS_CACHE", "0") == "1"  # default off until stable
 REDIS_CACHE_URL = os.environ.get("REDIS_CACHE_URL", "redis://127.0.0.1:6379/1")
@@ -290,6 +317,20 @@ FEATURE_FLAGS = {
     "bootstrap_ui": True,
 }
 MAX_QUIZ_ATTEMPTS = 3
+# Extra scoring policies: {"name": "dotted.path.to.Strategy"}
+SCORING_STRATEGIES = {}
+
+# Submission ingestion: 'inline' grades in the request; 'queue' enqueues and
+# returns a receipt, graded in batches by `manage.py drain_submissions`.
+SUBMISSION_INGEST_MODE = os.environ.get("SUBMISSION_INGEST_MODE", "inline")
+# 'database' (workers poll) or 'redis' (REDIS_URL list wakes idle workers)
+SUBMISSION_QUEUE_BACKEND = os.environ.get("SUBMISSION_QUEUE_BACKEND", "database")
+SUBMISSION_QUEUE_BATCH_SIZE = int(os.environ.get("SUBMISSION_QUEUE_BATCH_SIZE", "200"))
+SUBMISSION_QUEUE_POLL_INTERVAL = 0.5
+# Cached per-(user, quiz) attempt entitlements used by the /start/ guard
+ENTITLEMENT_CACHE_TIMEOUT = 60 * 60
+# Public quiz list body fragment; quiz saves/deletes invalidate it via its generation
+QUIZ_LIST_FRAGMENT_TIMEOUT = 60 * 60
 
 # ----------------------------------------------------------------------------
 # Logging (plaintext default, JSON/ECS selectable) 
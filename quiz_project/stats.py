@@ -1,12 +1,40 @@
-"""Stats middlewares for Prometheus metrics collection."""
-from typing import Callable
-from django.contrib.sessions.models import Session
-from django.utils import timezone
+"""Stats middlewares for Prometheus metrics collection.
 
-from prometheus_client import Counter, Gauge
+Gauges are not computed here: see :mod:`quiz_project.collectors`.
+"""
+import time
+from typing import Callable, Optional
+
+from prometheus_client import Counter
+
+from core import counters
 
 REQUEST_COUNTER = Counter('quizzy_http_requests_total', 'Total HTTP requests', ['method','path'])
-ACTIVE_USERS = Gauge('quizzy_active_users', 'Active authenticated users (session window)')
+
+# Active users are counted in HyperLogLog buckets of 5 minutes (windows up
+# to an hour) and 1 hour (longer ones); a window is the union of the
+# buckets overlapping it, so it reaches back up to one bucket further.
+ACTIVE_USER_WINDOWS = {'5m': 300, '30m': 1800, '1h': 3600, '24h': 86400}
+_BUCKETS = ((300, 3600), (3600, 86400))  # (bucket seconds, longest window served)
+
+
+def _granularity(seconds: int) -> int:
+    return next((size for size, longest in _BUCKETS if seconds <= longest), _BUCKETS[-1][0])
+
+
+def record_active_user(user_id: int, now: Optional[float] = None) -> None:
+    now = time.time() if now is None else now
+    for size, longest in _BUCKETS:
+        counters.add(f'active-users:{size}:{int(now // size)}', user_id, timeout=longest + size)
+
+
+def active_users(seconds: int, now: Optional[float] = None) -> int:
+    """Approximate number of distinct users seen in the last ``seconds``."""
+    now = time.time() if now is None else now
+    size = _granularity(seconds)
+    buckets = range(int((now - seconds) // size), int(now // size) + 1)
+    return counters.count(*[f'active-users:{size}:{bucket}' for bucket in buckets])
+
 
 class RequestMetricsMiddleware:
     def __init__(self, get_response: Callable):
@@ -23,18 +51,21 @@ class RequestMetricsMiddleware:
             pass
         return response
 
-class ActiveUsersGaugeMiddleware:
-    """Counts active authenticated sessions updated in last 30 minutes."""
-    WINDOW_MINUTES = 30
+class ActiveUsersMiddleware:
+    """Records authenticated users in the active-user counters.
+
+    Adds are buffered per worker (see :mod:`core.counters`), so this costs
+    no query and at most a periodic cache write.
+    """
     def __init__(self, get_response: Callable):
         self.get_response = get_response
 
     def __call__(self, request):
         resp = self.get_response(request)
         try:
-            cutoff = timezone.now() - timezone.timedelta(minutes=self.WINDOW_MINUTES)
-            count = Session.objects.filter(expire_date__gt=cutoff).count()
-            ACTIVE_USERS.set(count)
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                record_active_user(user.pk)
         except Exception:  # pragma: no cover
             pass
         return resp
@@ -0,0 +1,97 @@
+"""Precompiled taker-facing quiz payloads.
+
+A :class:`CompiledQuiz` is the quiz detail document served to takers (quiz
+fields, questions and their answers, without correctness) rendered once
+to JSON bytes, plus the SHA-256 of those bytes. It is cached per content
+generation: saving or deleting the quiz, one of its questions or one of
+their answers bumps the generation (see ``quizzes.signals``), so an
+artifact never changes once built and stale ones simply stop being read.
+
+The API detail endpoint returns :attr:`CompiledQuiz.body` as is; the take
+page renders from :attr:`CompiledQuiz.data`.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.fields import DateTimeField
+
+from core import generations
+
+CONTENT_GENERATION = "quiz-content:%s"
+COMPILED_KEY = "compiled-quiz:%s:%s"
+
+
+def _timeout() -> int:
+    return getattr(settings, "COMPILED_QUIZ_CACHE_TIMEOUT", 24 * 60 * 60)
+
+
+@dataclass(frozen=True)
+class CompiledQuiz:
+    version: str
+    body: bytes
+
+    @cached_property
+    def data(self) -> dict:
+        return json.loads(self.body)
+
+
+def build_payload(quiz_id: int) -> Optional[dict]:
+    """The taker-facing detail document of the quiz, in three flat queries."""
+    from .models import Answer, Question, Quiz
+
+    quiz = (
+        Quiz.objects.filter(pk=quiz_id)
+        .values("id", "title", "description", "visibility", "is_published", "creator_id", "created_at")
+        .first()
+    )
+    if quiz is None:
+        return None
+    answers = {}
+    for answer in Answer.objects.filter(question__quiz_id=quiz_id).order_by("id").values("id", "text", "question_id"):
+        answers.setdefault(answer.pop("question_id"), []).append(answer)
+    questions = [
+        {"id": question["id"], "text": question["text"], "answers": answers.get(question["id"], [])}
+        for question in Question.objects.filter(quiz_id=quiz_id).order_by("id").values("id", "text")
+    ]
+    return {
+        "id": quiz["id"],
+        "title": quiz["title"],
+        "description": quiz["description"],
+        "visibility": quiz["visibility"],
+        "is_published": quiz["is_published"],
+        "creator": quiz["creator_id"],
+        "created_at": DateTimeField().to_representation(quiz["created_at"]),
+        "questions": questions,
+    }
+
+
+def compile_quiz(quiz_id: int) -> Optional[CompiledQuiz]:
+    payload = build_payload(quiz_id)
+    if payload is None:
+        return None
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode()
+    return CompiledQuiz(version=hashlib.sha256(body).hexdigest(), body=body)
+
+
+def get_compiled_quiz(quiz_id: int) -> Optional[CompiledQuiz]:
+    """The quiz's compiled payload for its current content, built on a cache miss."""
+    key = COMPILED_KEY % (quiz_id, generations.current(CONTENT_GENERATION % quiz_id))
+    entry = cache.get(key)
+    if entry is not None:
+        return CompiledQuiz(version=entry["version"], body=entry["body"])
+    compiled = compile_quiz(quiz_id)
+    if compiled is not None:
+        cache.set(key, {"version": compiled.version, "body": compiled.body}, _timeout())
+    return compiled
+
+
+def invalidate_quiz_content(quiz_id: int) -> None:
+    generations.bump(CONTENT_GENERATION % quiz_id)
@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0004_invitation_pending_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(condition=models.Q(('is_published', True), ('visibility', 'public')), fields=['-created_at', 'id'], name='quiz_public_recent_idx'),
+        ),
+    ]
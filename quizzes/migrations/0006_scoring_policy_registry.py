@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 22:06
+
+import quizzes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_quiz_public_recent_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='quiz',
+            name='scoring_policy',
+            field=models.CharField(choices=quizzes.models.scoring_policy_choices, default='best', max_length=50),
+        ),
+    ]
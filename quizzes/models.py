@@ -2,6 +2,13 @@ from django.db import models
 from django.contrib.auth.models import User
 
 
+def scoring_policy_choices():
+	"""Every registered scoring strategy (see ``submissions.strategies``)."""
+	from submissions.strategies import available_strategies  # submissions imports these models
+
+	return [(name, name.replace("_", " ").capitalize()) for name in available_strategies()]
+
+
 class Quiz(models.Model):
 	PUBLIC = "public"
 	PRIVATE = "private"
@@ -9,11 +16,6 @@ class Quiz(models.Model):
 	SCORING_BEST = "best"
 	SCORING_FIRST = "first"
 	SCORING_LAST = "last"
-	SCORING_POLICY_CHOICES = [
-		(SCORING_BEST, "Best"),
-		(SCORING_FIRST, "First"),
-		(SCORING_LAST, "Last"),
-	]
 
 	title = models.CharField(max_length=255)
 	description = models.TextField(blank=True)
@@ -23,7 +25,17 @@ class Quiz(models.Model):
 	visibility = models.CharField(max_length=10, choices=VISIBILITY_CHOICES, default=PUBLIC)
 	allow_multiple_attempts = models.BooleanField(default=False)
 	max_attempts = models.PositiveIntegerField(null=True, blank=True)
-	scoring_policy = models.CharField(max_length=10, default="best", choices=SCORING_POLICY_CHOICES)
+	scoring_policy = models.CharField(max_length=50, default=SCORING_BEST, choices=scoring_policy_choices)
+
+	class Meta:
+		indexes = [
+			# Public list, newest first (API cursor pages and the list page)
+			models.Index(
+				fields=["-created_at", "id"],
+				name="quiz_public_recent_idx",
+				condition=models.Q(is_published=True, visibility="public"),
+			),
+		]
 
 	def __str__(self) -> str:  # pragma: no cover
 		return self.title
@@ -65,6 +77,12 @@ class Invitation(models.Model):
 
 	class Meta:
 		unique_together = ("quiz", "email")
+		indexes = [
+			# Pending invitations of an email (navbar counter)
+			models.Index(
+				fields=["email"], condition=models.Q(accepted=False, declined=False), name="invitation_pending_idx"
+			),
+		]
 
 	def __str__(self) -> str:  # pragma: no cover
 		return f"Invite {self.email} -> {self.quiz_id}"
@@ -1,8 +1,12 @@
 from django.core.exceptions import PermissionDenied
 from django.contrib.auth.models import User
 
+from core.navcounters import invalidate_invitations
 from .models import Quiz, Invitation
 
+# Generation of the public quiz list fragment (bumped on every quiz save/delete)
+QUIZ_LIST_GENERATION = "quiz-list"
+
 
 def ensure_creator(user: User, quiz: Quiz):
     if quiz.creator_id != user.id:
@@ -27,10 +31,12 @@ def invite_email(user: User, quiz: Quiz, email: str) -> Invitation:
 def accept_invite(user: User, quiz: Quiz) -> bool:
     """Accept an invitation for the current user's email. Returns True if marked accepted."""
     updated = Invitation.objects.filter(quiz=quiz, email=user.email).update(accepted=True, declined=False)
+    invalidate_invitations(user.email)  # update() sends no signals
     return updated > 0
 
 
 def decline_invite(user: User, quiz: Quiz) -> bool:
     """Decline an invitation for the current user's email. Returns True if marked declined."""
     updated = Invitation.objects.filter(quiz=quiz, email=user.email).update(declined=True, accepted=False)
+    invalidate_invitations(user.email)  # update() sends no signals
     return updated > 0
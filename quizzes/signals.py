@@ -0,0 +1,46 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core import generations
+from core.navcounters import invalidate_invitations
+from .compiled import invalidate_quiz_content
+from .models import Quiz, Question, Answer, Invitation
+from .services import QUIZ_LIST_GENERATION
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def bump_quiz_list_generation(sender, instance: Quiz, raw=False, **kwargs):
+    if not raw:
+        generations.bump(QUIZ_LIST_GENERATION)
+
+
+@receiver(post_save, sender=Quiz)
+@receiver(post_delete, sender=Quiz)
+def invalidate_compiled_quiz(sender, instance: Quiz, raw=False, **kwargs):
+    if not raw:
+        invalidate_quiz_content(instance.pk)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_compiled_quiz_on_question(sender, instance: Question, raw=False, **kwargs):
+    if not raw:
+        invalidate_quiz_content(instance.quiz_id)
+
+
+@receiver(post_save, sender=Answer)
+@receiver(post_delete, sender=Answer)
+def invalidate_compiled_quiz_on_answer(sender, instance: Answer, raw=False, **kwargs):
+    if raw:
+        return
+    quiz_id = Question.objects.filter(pk=instance.question_id).values_list("quiz_id", flat=True).first()
+    if quiz_id is not None:
+        invalidate_quiz_content(quiz_id)
+
+
+@receiver(post_save, sender=Invitation)
+@receiver(post_delete, sender=Invitation)
+def invalidate_nav_counter_on_invitation(sender, instance: Invitation, raw=False, **kwargs):
+    if not raw:
+        invalidate_invitations(instance.email)
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from quizzes.compiled import get_compiled_quiz
+from quizzes.models import Answer, Question, Quiz
+
+
+class CompiledQuizTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="x")
+        self.quiz = Quiz.objects.create(title="Math", creator=self.creator, is_published=True)
+        self.question = Question.objects.create(quiz=self.quiz, text="1+1?")
+        self.right = Answer.objects.create(question=self.question, text="2", is_correct=True)
+        Answer.objects.create(question=self.question, text="3")
+
+    def test_artifact_is_cached_per_content_version(self):
+        compiled = get_compiled_quiz(self.quiz.pk)
+        self.assertEqual(
+            compiled.data["questions"],
+            [{"id": self.question.pk, "text": "1+1?", "answers": [
+                {"id": self.right.pk, "text": "2"}, {"id": self.right.pk + 1, "text": "3"},
+            ]}],
+        )
+        self.assertNotIn(b"is_correct", compiled.body)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_compiled_quiz(self.quiz.pk), compiled)
+
+    def test_question_and_answer_changes_produce_a_new_version(self):
+        versions = {get_compiled_quiz(self.quiz.pk).version}
+        Question.objects.create(quiz=self.quiz, text="2+2?")
+        versions.add(get_compiled_quiz(self.quiz.pk).version)
+        self.right.delete()
+        versions.add(get_compiled_quiz(self.quiz.pk).version)
+        self.quiz.title = "Arithmetic"
+        self.quiz.save()
+        compiled = get_compiled_quiz(self.quiz.pk)
+        versions.add(compiled.version)
+        self.assertEqual(len(versions), 4)
+        self.assertEqual(compiled.data["title"], "Arithmetic")
+        self.assertEqual(len(compiled.data["questions"]), 2)
+
+    def test_take_page_renders_from_the_artifact(self):
+        User.objects.create_user(username="u", password="x")
+        self.client.login(username="u", password="x")
+        url = reverse("quizzes:take", args=[self.quiz.pk])
+        self.client.get(url)
+        res = self.client.get(url)
+        self.assertContains(res, f'name="answer_{self.question.pk}"', count=2)
+        self.assertContains(res, "1+1?")
+        self.assertIsNone(get_compiled_quiz(0))
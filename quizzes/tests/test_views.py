@@ -20,6 +20,27 @@ class QuizViewsTests(TestCase):
         res = self.client.get(url)
         self.assertContains(res, self.quiz.title)
 
+    def test_quiz_list_fragment_is_cached_until_a_quiz_changes(self):
+        url = reverse('quizzes:list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(url), self.quiz.title)
+        # Saves and deletes show up immediately
+        with self.captureOnCommitCallbacks(execute=True):
+            Quiz.objects.create(title="Physics", creator=self.creator, is_published=True)
+        self.assertContains(self.client.get(url), "Physics")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.delete()
+        self.assertNotContains(self.client.get(url), "Math")
+
+    def test_quiz_list_renders_user_bits_outside_the_fragment(self):
+        url = reverse('quizzes:list')
+        self.assertNotContains(self.client.get(url), "New Quiz")
+        self.client.login(username='u', password='x')
+        res = self.client.get(url)
+        self.assertContains(res, "New Quiz")
+        self.assertContains(res, self.quiz.title)
+
     def test_quiz_detail_published(self):
         url = reverse('quizzes:detail', args=[self.quiz.id])
         res = self.client.get(url)
@@ -39,3 +60,33 @@ class QuizViewsTests(TestCase):
         results_url = reverse('quizzes:results', args=[submission.id])
         res_results = self.client.get(results_url)
         self.assertContains(res_results, 'Score: 1')
+
+    def test_full_leaderboard_pages_and_shows_my_rank(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                other = User.objects.create_user(username=f"p{i}", password="x")
+                Submission.objects.create(quiz=self.quiz, user=other, score=5 - i, in_progress=False)
+            Submission.objects.create(quiz=self.quiz, user=self.user, score=2, attempt_number=1, in_progress=False)
+            Submission.objects.create(quiz=self.quiz, user=self.user, score=4, attempt_number=2, in_progress=False)
+        self.client.login(username='u', password='x')
+        url = reverse('quizzes:leaderboard', args=[self.quiz.id])
+        res = self.client.get(url)
+        self.assertContains(res, 'ranked <span class="fw-semibold">#3</span>')  # ties p1, who submitted first
+        self.assertNotContains(res, '?after=')
+        self.assertEqual(self.client.get(url, {'after': 'junk'}).status_code, 404)
+
+    def test_quiz_form_accepts_registered_scoring_policies(self):
+        from submissions import strategies
+
+        strategies.register_strategy("penalty", strategies.PenaltyAttempt)
+        self.addCleanup(strategies._registry.pop, "penalty")
+        self.client.login(username="creator", password="x")
+        data = {"title": "Math", "description": "desc", "is_published": "on", "visibility": "public"}
+        res = self.client.post(reverse("quizzes:edit", args=[self.quiz.id]), dict(data, scoring_policy="penalty"))
+        self.assertRedirects(res, reverse("quizzes:my-list"), fetch_redirect_response=False)
+        self.quiz.refresh_from_db()
+        self.assertEqual(self.quiz.scoring_policy, "penalty")
+
+        res = self.client.post(reverse("quizzes:create"), dict(data, scoring_policy="nope"))
+        self.assertEqual(res.status_code, 200)
+        self.assertIn("scoring_policy", res.context["form"].errors)
@@ -4,6 +4,7 @@ from .views import (
     QuizDetailView,
     TakeQuizView,
     SubmissionResultsView,
+    SubmissionReceiptView,
     InviteView,
     AcceptInviteView,
     DeclineInviteView,
@@ -27,6 +28,7 @@ urlpatterns = [
     path("<int:pk>/", QuizDetailView.as_view(), name="detail"),
     path("<int:pk>/take/", TakeQuizView.as_view(), name="take"),
     path("submissions/<int:pk>/", SubmissionResultsView.as_view(), name="results"),
+    path("submissions/queued/<uuid:token>/", SubmissionReceiptView.as_view(), name="receipt"),
     path("<int:pk>/invite/", InviteView.as_view(), name="invite"),
     path("<int:pk>/accept/", AcceptInviteView.as_view(), name="accept-invite"),
     path("<int:pk>/decline/", DeclineInviteView.as_view(), name="decline-invite"),
@@ -6,24 +6,37 @@ from django.urls import reverse
 from django.views.generic import ListView, DetailView, TemplateView, FormView, View
 from django.contrib import messages
 from django.views.generic.edit import CreateView, UpdateView, DeleteView
-from django.utils.decorators import method_decorator
-from django.views.decorators.cache import cache_page
-
-from .models import Quiz, Question, Answer
-from .services import is_invited, invite_email, accept_invite, decline_invite
-from submissions.models import Submission, QuestionAttempt
+from django.utils.dateparse import parse_datetime
+from django.conf import settings
+
+from core import generations
+from .compiled import get_compiled_quiz
+from .models import Quiz, Question
+from .services import QUIZ_LIST_GENERATION, is_invited, invite_email, accept_invite, decline_invite
+from submissions.models import Submission, QueuedSubmission
+from submissions.attempts import start_attempt
+from submissions.grading import submit_answers
+from submissions.ingest import enqueue, queue_mode_enabled
+from submissions.percentiles import percentile_below
 from .forms import QuestionForm, AnswerFormSet
 from quizzes.models import Invitation
+from realtime.utils import get_leaderboard_page, get_user_standing
 
 
 @login_required
 def start_quiz(request, pk):
-	# Minimal stub used for middleware tests; real logic added in later steps
-	return HttpResponse(f"Started quiz {pk}")
+	# Opens (or resumes) the user's in-progress attempt; AttemptGuardMiddleware pre-checks the limit
+	quiz = get_object_or_404(Quiz, pk=pk)
+	submission = start_attempt(quiz, request.user)
+	return HttpResponse(f"Started quiz {pk} (attempt {submission.attempt_number})")
 
 
-@method_decorator(cache_page(60), name="dispatch")
 class QuizListView(ListView):
+	"""Public quizzes; the list body is a cached fragment keyed by the quiz-list generation.
+
+	The queryset is only evaluated when the fragment misses, and any quiz
+	save or delete bumps the generation (see ``quizzes.signals``).
+	"""
 	model = Quiz
 	template_name = "quizzes/quiz_list.html"
 	context_object_name = "quizzes"
@@ -33,6 +46,12 @@ class QuizListView(ListView):
 		# For now, only show public quizzes in list to keep it simple
 		return qs.filter(visibility=Quiz.PUBLIC).order_by("-created_at")
 
+	def get_context_data(self, **kwargs):
+		ctx = super().get_context_data(**kwargs)
+		ctx["list_generation"] = generations.current(QUIZ_LIST_GENERATION)
+		ctx["list_cache_timeout"] = getattr(settings, "QUIZ_LIST_FRAGMENT_TIMEOUT", 60 * 60)
+		return ctx
+
 
 class QuizDetailView(DetailView):
 	model = Quiz
@@ -64,46 +83,45 @@ class TakeQuizView(LoginRequiredMixin, TemplateView):
 
 	def get_context_data(self, **kwargs):
 		ctx = super().get_context_data(**kwargs)
-		questions = Question.objects.filter(quiz=self.quiz).prefetch_related("answers")
+		# Questions and answers come from the precompiled payload, not the ORM
+		compiled = get_compiled_quiz(self.quiz.pk)
 		ctx.update({
 			"quiz": self.quiz,
-			"questions": questions,
+			"questions": compiled.data["questions"] if compiled is not None else [],
 		})
 		return ctx
 
 	def post(self, request, *args, **kwargs):
-		# Create or reuse submission (attempt 1 for now)
-		submission, _ = Submission.objects.get_or_create(
-			quiz=self.quiz, user=request.user, attempt_number=1,
-			defaults={"in_progress": True},
-		)
-
-		questions = Question.objects.filter(quiz=self.quiz).prefetch_related("answers")
-		for q in questions:
-			key = f"answer_{q.id}"
-			if key not in request.POST:
-				continue
-			try:
-				selected_id = int(request.POST[key])
-			except ValueError:
-				selected_id = None
-			is_correct = False
-			if selected_id:
-				is_correct = Answer.objects.filter(pk=selected_id, question=q, is_correct=True).exists()
-			QuestionAttempt.objects.create(
-				submission=submission,
-				question=q,
-				selected_answer_id=selected_id,
-				is_correct=is_correct,
-				attempt_number=1,
-			)
-
-		# Mark submission complete
-		Submission.objects.filter(pk=submission.pk).update(in_progress=False)
-		submission.in_progress = False
+		answers = {
+			key[len("answer_"):]: value
+			for key, value in request.POST.items()
+			if key.startswith("answer_")
+		}
+		if queue_mode_enabled():
+			entry = enqueue(self.quiz, request.user, answers)
+			return redirect(reverse("quizzes:receipt", kwargs={"token": entry.token}))
+		submission = submit_answers(self.quiz, request.user, answers)
 		return redirect(reverse("quizzes:results", kwargs={"pk": submission.pk}))
 
 
+class SubmissionReceiptView(LoginRequiredMixin, DetailView):
+	"""Status page for a queued submission; forwards to results once graded."""
+	model = QueuedSubmission
+	template_name = "quizzes/submission_receipt.html"
+	context_object_name = "receipt"
+	slug_field = "token"
+	slug_url_kwarg = "token"
+
+	def get_queryset(self):
+		return QueuedSubmission.objects.filter(user=self.request.user).select_related("quiz")
+
+	def get(self, request, *args, **kwargs):
+		self.object = self.get_object()
+		if self.object.status == QueuedSubmission.DONE:
+			return redirect(reverse("quizzes:results", kwargs={"pk": self.object.submission_id}))
+		return self.render_to_response(self.get_context_data(object=self.object))
+
+
 class SubmissionResultsView(LoginRequiredMixin, DetailView):
 	model = Submission
 	template_name = "quizzes/quiz_results.html"
@@ -113,6 +131,12 @@ class SubmissionResultsView(LoginRequiredMixin, DetailView):
 		# A user can only view their own submissions
 		return Submission.objects.filter(user=self.request.user).select_related("quiz")
 
+	def get_context_data(self, **kwargs):
+		ctx = super().get_context_data(**kwargs)
+		if not self.object.in_progress:
+			ctx["percentile"] = percentile_below(self.object.quiz_id, self.object.score)
+		return ctx
+
 
 class InviteView(LoginRequiredMixin, FormView):
 	template_name = "quizzes/invite.html"
@@ -273,7 +297,7 @@ class QuestionEditView(LoginRequiredMixin, TemplateView):
 
 
 class QuizLeaderboardView(DetailView):
-	"""Full leaderboard page (top 100 submissions)."""
+	"""Full leaderboard, browsed in keyset pages (``?after=<cursor>``)."""
 	model = Quiz
 	template_name = "quizzes/leaderboard_full.html"
 	context_object_name = "quiz"
@@ -289,10 +313,18 @@ class QuizLeaderboardView(DetailView):
 
 	def get_context_data(self, **kwargs):
 		ctx = super().get_context_data(**kwargs)
-		entries = (Submission.objects.filter(quiz=self.object, in_progress=False)
-			.select_related("user")
-			.order_by('-score', 'submitted_at')[:100])
-		ctx["entries"] = entries
+		after = self.request.GET.get("after") or None
+		try:
+			page = get_leaderboard_page(self.object.pk, after)
+		except ValueError:
+			raise Http404()
+		for entry in page["entries"]:
+			entry["submitted_at"] = parse_datetime(entry["submitted_at"])
+		ctx["entries"] = page["entries"]
+		ctx["next_cursor"] = page["next"]
+		ctx["is_first_page"] = after is None
+		user = self.request.user
+		ctx["standing"] = get_user_standing(self.object.pk, user.id) if user.is_authenticated else None
 		return ctx
 
 
@@ -0,0 +1,104 @@
+"""Wire encodings for realtime sockets, negotiated via WebSocket subprotocol.
+
+=========================  ======  ===========================================
+Subprotocol                Frames  Encoding
+=========================  ======  ===========================================
+(none) / ``quizzy.json``   text    JSON (the default)
+``quizzy.msgpack``         binary  MessagePack
+``quizzy.msgpack+deflate`` binary  MessagePack, raw-deflate compressed
+=========================  ======  ===========================================
+
+The deflate variant is for deployments whose ASGI server doesn't negotiate
+``permessage-deflate`` itself (Daphne doesn't); behind a server that does,
+``quizzy.msgpack`` already travels compressed. MessagePack codecs are only
+offered when the ``msgpack`` package is importable.
+
+Broadcasters encode a message once per codec with :func:`encode_all` and
+put the frames in the group message; consumers forward the frame for the
+codec their socket negotiated.
+"""
+
+from __future__ import annotations
+
+import json
+import zlib
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover - optional; JSON still works
+    msgpack = None
+
+
+class JSONCodec:
+    name = "json"
+    subprotocol = "quizzy.json"
+    binary = False
+
+    def encode(self, message) -> str:
+        return json.dumps(message, separators=(",", ":"))
+
+    def decode(self, data):
+        if isinstance(data, bytes):
+            data = data.decode("utf-8")
+        return json.loads(data)
+
+
+class MessagePackCodec:
+    name = "msgpack"
+    subprotocol = "quizzy.msgpack"
+    binary = True
+
+    def encode(self, message) -> bytes:
+        return msgpack.packb(message, use_bin_type=True)
+
+    def decode(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        return msgpack.unpackb(data, raw=False)
+
+
+class DeflateCodec:
+    """Raw-deflate (RFC 1951) wrapper around another binary codec."""
+
+    binary = True
+
+    def __init__(self, inner, level: int = 6):
+        self.inner = inner
+        self.level = level
+        self.name = f"{inner.name}+deflate"
+        self.subprotocol = f"{inner.subprotocol}+deflate"
+
+    def encode(self, message) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -15)
+        return compressor.compress(self.inner.encode(message)) + compressor.flush()
+
+    def decode(self, data):
+        return self.inner.decode(zlib.decompress(data, -15))
+
+
+DEFAULT_CODEC = JSONCodec()
+
+CODECS = {DEFAULT_CODEC.name: DEFAULT_CODEC}
+if msgpack is not None:
+    for _codec in (MessagePackCodec(), DeflateCodec(MessagePackCodec())):
+        CODECS[_codec.name] = _codec
+
+_BY_SUBPROTOCOL = {codec.subprotocol: codec for codec in CODECS.values()}
+
+
+def negotiate(requested) -> tuple:
+    """Pick the first supported subprotocol the client offered.
+
+    Returns ``(codec, subprotocol)``; ``subprotocol`` is ``None`` when the
+    client asked for none we know, in which case the socket speaks JSON.
+    """
+    for subprotocol in requested or ():
+        codec = _BY_SUBPROTOCOL.get(subprotocol)
+        if codec is not None:
+            return codec, subprotocol
+    return DEFAULT_CODEC, None
+
+
+def encode_all(message) -> dict:
+    """``{codec name: frame}`` for every available codec."""
+    return {name: codec.encode(message) for name, codec in CODECS.items()}
@@ -1,14 +1,42 @@
-import json
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 
+from .codecs import DEFAULT_CODEC, negotiate
 
-class LeaderboardConsumer(AsyncWebsocketConsumer):
+
+class CodecMixin:
+    """Speak whichever wire codec the client negotiated via subprotocol."""
+
+    codec = DEFAULT_CODEC
+
+    async def accept_negotiated(self):
+        self.codec, subprotocol = negotiate(self.scope.get("subprotocols"))
+        await self.accept(subprotocol=subprotocol)
+
+    async def send_frame(self, frame):
+        if self.codec.binary:
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
+
+    async def send_message(self, message):
+        await self.send_frame(self.codec.encode(message))
+
+    def decode_message(self, text_data=None, bytes_data=None):
+        try:
+            message = self.codec.decode(bytes_data if bytes_data is not None else text_data or "{}")
+        except Exception:
+            return None
+        return message if isinstance(message, dict) else None
+
+
+class LeaderboardConsumer(CodecMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.quiz_id = self.scope["url_route"]["kwargs"]["quiz_id"]
         self.group_name = f"quiz_{self.quiz_id}_leaderboard"
         print(f"[WS][connect] quiz={self.quiz_id} channel={self.channel_name}")  # debug
         await self.channel_layer.group_add(self.group_name, self.channel_name)
-        await self.accept()
+        await self.accept_negotiated()
         await self._send_leaderboard()
 
     async def disconnect(self, close_code):
@@ -16,15 +44,64 @@ class LeaderboardConsumer(AsyncWebsocketConsumer):
         await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def receive(self, text_data=None, bytes_data=None):
-        # Ignore any client messages (broadcast only)
-        return
+        # The only client message is a resync request after a sequence gap
+        message = self.decode_message(text_data, bytes_data)
+        if message is not None and message.get("type") == "resync":
+            await self._send_leaderboard()
 
     async def leaderboard_update(self, event):
-        print(f"[WS][group_message] quiz={self.quiz_id} type=leaderboard.update")  # debug
-        await self._send_leaderboard()
+        # The broadcaster encoded the update once per codec for the whole group
+        frame = event.get("frames", {}).get(self.codec.name)
+        if frame is None:
+            await self._send_leaderboard()
+            return
+        await self.send_frame(frame)
 
     async def _send_leaderboard(self):
-        from .utils import get_leaderboard  # local import to avoid early model import
-        data = get_leaderboard(int(self.quiz_id))
-        print(f"[WS][send_snapshot] quiz={self.quiz_id} entries={len(data)}")  # debug
-        await self.send(text_data=json.dumps({"type": "leaderboard", "entries": data}))
+        await self.send_message(await self._current_message())
+
+    @database_sync_to_async
+    def _current_message(self):
+        from .protocol import current_message  # local import to avoid early model import
+        return current_message(int(self.quiz_id))
+
+
+class ReceiptConsumer(CodecMixin, AsyncWebsocketConsumer):
+    """Pushes the outcome of a queued submission to its owner."""
+
+    async def connect(self):
+        self.token = str(self.scope["url_route"]["kwargs"]["token"])
+        payload = await self._load_receipt()
+        if payload is None:
+            await self.close()
+            return
+        from submissions.ingest import RECEIPT_GROUP
+
+        self.group_name = RECEIPT_GROUP % self.token
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept_negotiated()
+        await self.send_message({"type": "receipt", "receipt": payload})
+
+    async def disconnect(self, close_code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        return
+
+    async def receipt_update(self, event):
+        await self.send_message({"type": "receipt", "receipt": event["receipt"]})
+
+    @database_sync_to_async
+    def _load_receipt(self):
+        from submissions.ingest import receipt_payload
+        from submissions.models import QueuedSubmission
+
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            return None
+        entry = (
+            QueuedSubmission.objects.filter(token=self.token, user=user)
+            .select_related("submission").first()
+        )
+        return receipt_payload(entry) if entry else None
@@ -0,0 +1,524 @@
+"""Pluggable leaderboard backends.
+
+Every user with a completed submission is a leaderboard entry: their
+:class:`~submissions.models.QuizStanding`, ranked by score (descending) and
+then by the time of the deciding attempt (ascending). Backends:
+
+* ``database`` – ORDER BY over the quiz's standings behind a
+  stale-while-revalidate cache: a change marks the snapshot stale and one
+  reader recomputes it while the others keep getting the previous one.
+  ``top(..., fresh=True)`` (the broadcaster) recomputes it unconditionally.
+* ``memory`` – in-process sorted sets, for tests and single-process
+  development only: other processes (workers, management commands) never
+  see them. Must be selected explicitly.
+* ``redis`` – Redis sorted sets (``ZADD`` on score change, ``ZRANGE`` for
+  the top N, ``ZRANK`` for a rank) plus a hash of rendered entries, so
+  reading the board never touches the database. Falls back to ``database``
+  when Redis can't be reached.
+
+All backends rank identically: score descending, then ``decided_at``
+ascending, then standing id ascending.
+
+Ranks: the sorted-set backends answer in O(log n) (``ZRANK``, bisect).
+B-tree indexes keep no subtree counts, so no SQL query can; the database
+backend counts the entries ahead of a standing along two contiguous ranges
+of ``standing_board_idx`` (higher scores, then earlier ties), which costs
+O(rank) index entries. It stops counting after ``LEADERBOARD_RANK_SCAN_LIMIT``
+entries and estimates deeper ranks from a cached per-score histogram, so a
+rank lookup is bounded however large the quiz gets.
+
+Browsing past the top N always reads the database with keyset pagination
+(:func:`page`): each page seeks past the last entry of the previous one
+along the ``standing_board_idx`` index instead of skipping an OFFSET.
+
+Sorted-set backends are kept current incrementally by :meth:`refresh` (fed
+from the coalesced dirty set after each commit) and rebuild a quiz from the
+database lazily the first time it is read, or via
+``manage.py rebuild_leaderboards``.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import swr
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = "leaderboard:%s"
+SCORES_KEY = "leaderboard:scores:%s"
+CACHE_TIMEOUT = 30  # seconds
+CACHE_GRACE = 300  # seconds a stale snapshot may still be served while rebuilding
+LOAD_WAIT = 0.5  # seconds to wait for another worker's cold load
+DEFAULT_LIMIT = 10
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Redis sorted-set members encode the whole sort key as fixed-width digits
+# (score inverted around SCORE_BIAS) and all carry the same score, so Redis
+# orders them bytewise, i.e. exactly like :func:`sort_key`.
+SCORE_BIAS = 2 ** 63
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+_FIELDS = ("id", "quiz_id", "user__username", "score", "attempt_number", "decided_at")
+
+
+def _standings():
+    from submissions.models import QuizStanding  # lazy: imported from the ASGI chain
+
+    return QuizStanding.objects
+
+
+def entry_from_row(row: dict) -> dict:
+    return {
+        "id": row["id"],
+        "user": row["user__username"],
+        "score": row["score"],
+        "attempt": row["attempt_number"],
+        "submitted_at": row["decided_at"].isoformat(),
+    }
+
+
+def _micros(moment: datetime) -> int:
+    return (moment - _EPOCH) // _MICROSECOND
+
+
+def sort_key(row: dict) -> tuple:
+    """Ascending sort key: best score first, earlier deciding attempt first, then id."""
+    return (-row["score"], _micros(row["decided_at"]), row["id"])
+
+
+def _rank_scan_limit() -> int:
+    return getattr(settings, "LEADERBOARD_RANK_SCAN_LIMIT", 10_000)
+
+
+def _capped_count(qs, cap: int) -> Optional[int]:
+    """``qs.count()`` if below ``cap``, else ``None``; reads at most ``cap`` rows."""
+    count = qs.order_by()[:cap].count()
+    return count if count < cap else None
+
+
+class DatabaseLeaderboard:
+    name = "database"
+
+    @property
+    def exact_rank_limit(self) -> int:
+        """Ranks above this are estimates (see the module docstring)."""
+        return _rank_scan_limit()
+
+    def _query(self, quiz_id: int, limit: int) -> list:
+        rows = (
+            _standings().filter(quiz_id=quiz_id)
+            .order_by("-score", "decided_at", "id").values(*_FIELDS)[:limit]
+        )
+        return [entry_from_row(row) for row in rows]
+
+    def top(self, quiz_id: int, limit: int = DEFAULT_LIMIT, fresh: bool = False) -> list:
+        if limit != DEFAULT_LIMIT:
+            return self._query(quiz_id, limit)
+        if fresh:
+            return swr.refresh(
+                CACHE_KEY % quiz_id, lambda: self._query(quiz_id, limit),
+                ttl=CACHE_TIMEOUT, grace=CACHE_GRACE, name="leaderboard",
+            )
+        return swr.get_or_compute(
+            CACHE_KEY % quiz_id, lambda: self._query(quiz_id, limit),
+            ttl=CACHE_TIMEOUT, grace=CACHE_GRACE, name="leaderboard",
+        )
+
+    def rank(self, quiz_id: int, standing_id: int) -> Optional[int]:
+        row = _standings().filter(pk=standing_id, quiz_id=quiz_id).values(*_FIELDS).first()
+        if row is None:
+            return None
+        limit = _rank_scan_limit()
+        board = _standings().filter(quiz_id=quiz_id)
+        above = _capped_count(board.filter(score__gt=row["score"]), limit)
+        if above is not None:
+            ties = _capped_count(board.filter(score=row["score"]).filter(_tied_ahead_of(row)), limit - above)
+            if ties is not None:
+                return above + ties + 1
+        return max(limit + 1, self._estimate_rank(quiz_id, row))
+
+    def _score_counts(self, quiz_id: int) -> dict:
+        """``{score: (standings, first decided_at, last decided_at)}`` for the quiz."""
+        from django.db.models import Count, Max, Min
+
+        def compute():
+            rows = (
+                _standings().filter(quiz_id=quiz_id).order_by().values("score")
+                .annotate(n=Count("id"), first=Min("decided_at"), last=Max("decided_at"))
+            )
+            return {row["score"]: (row["n"], row["first"], row["last"]) for row in rows}
+
+        return swr.get_or_compute(
+            SCORES_KEY % quiz_id, compute, ttl=CACHE_TIMEOUT, grace=CACHE_GRACE, name="leaderboard-scores",
+        )
+
+    def _estimate_rank(self, quiz_id: int, row: dict) -> int:
+        # Exact count of higher scores, ties placed by interpolating decided_at
+        counts = self._score_counts(quiz_id)
+        above = sum(n for score, (n, _, _) in counts.items() if score > row["score"])
+        n, first, last = counts.get(row["score"], (0, None, None))
+        ties = 0
+        if n and last > first:
+            ties = int(n * min(1.0, max(0.0, (row["decided_at"] - first) / (last - first))))
+        return above + ties + 1
+
+    def invalidate(self, quiz_id: int) -> None:
+        swr.mark_stale(CACHE_KEY % quiz_id)
+        swr.mark_stale(SCORES_KEY % quiz_id)
+
+    def reset(self, quiz_id: int) -> None:
+        cache.delete_many([CACHE_KEY % quiz_id, SCORES_KEY % quiz_id])
+
+    def refresh(self, quiz_ids: Iterable[int], standing_ids: Iterable[int] = (), rebuild_quiz_ids=()) -> None:
+        for quiz_id in quiz_ids:
+            self.invalidate(quiz_id)
+
+    def rebuild(self, quiz_id: int) -> int:
+        self.reset(quiz_id)
+        return _standings().filter(quiz_id=quiz_id).count()
+
+
+def _tied_ahead_of(row: dict):
+    """Standings with ``row``'s score that rank before it."""
+    from django.db.models import Q
+
+    return Q(decided_at__lt=row["decided_at"]) | Q(decided_at=row["decided_at"], id__lt=row["id"])
+
+
+def _behind(row: dict):
+    from django.db.models import Q
+
+    return (
+        Q(score__lt=row["score"])
+        | Q(score=row["score"], decided_at__gt=row["decided_at"])
+        | Q(score=row["score"], decided_at=row["decided_at"], id__gt=row["id"])
+    )
+
+
+def encode_cursor(row: dict, rank: int) -> str:
+    """Opaque cursor pointing just past ``row`` (the entry at 1-based ``rank``)."""
+    return f"{rank}.{row['score']}.{_micros(row['decided_at'])}.{row['id']}"
+
+
+def decode_cursor(cursor: str) -> tuple:
+    """``(rank, row)`` from :func:`encode_cursor`; raises ``ValueError`` if malformed."""
+    rank, score, micros, standing_id = (int(part) for part in cursor.split("."))
+    if rank < 1:
+        raise ValueError("cursor rank must be positive")
+    return rank, {"score": score, "decided_at": _EPOCH + micros * _MICROSECOND, "id": standing_id}
+
+
+def page(quiz_id: int, after: Optional[str] = None, limit: int = PAGE_SIZE) -> dict:
+    """One page of the full leaderboard, ``limit`` entries after ``after``.
+
+    Returns ``{"entries": [...], "next": cursor or None}``; entries carry
+    their 1-based ``rank``. Seeking on (score, decided_at, id) keeps every
+    page as cheap as the first, however deep the client scrolls.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    qs = _standings().filter(quiz_id=quiz_id)
+    rank = 0
+    if after:
+        rank, last = decode_cursor(after)
+        qs = qs.filter(_behind(last))
+    rows = list(qs.order_by("-score", "decided_at", "id").values(*_FIELDS)[:limit + 1])
+    entries = []
+    for row in rows[:limit]:
+        rank += 1
+        entries.append(dict(entry_from_row(row), rank=rank))
+    cursor = encode_cursor(rows[limit - 1], rank) if len(rows) > limit else None
+    return {"entries": entries, "next": cursor}
+
+
+class SortedSetLeaderboard:
+    """Shared logic for sorted-set backends; subclasses provide the storage."""
+
+    name = None
+    exact_rank_limit = None  # every rank is exact
+
+    # Storage primitives -------------------------------------------------
+
+    def _is_loaded(self, quiz_id: int) -> bool:
+        raise NotImplementedError
+
+    def _replace(self, quiz_id: int, rows: list) -> None:
+        raise NotImplementedError
+
+    def _upsert(self, quiz_id: int, rows: list) -> None:
+        raise NotImplementedError
+
+    def _remove(self, quiz_id: int, standing_ids: list) -> None:
+        raise NotImplementedError
+
+    def _range(self, quiz_id: int, limit: int) -> list:
+        raise NotImplementedError
+
+    def _rank(self, quiz_id: int, standing_id: int) -> Optional[int]:
+        raise NotImplementedError
+
+    def reset(self, quiz_id: int) -> None:
+        """Forget everything about a quiz; the next read rebuilds it."""
+        raise NotImplementedError
+
+    # Public interface ---------------------------------------------------
+
+    def top(self, quiz_id: int, limit: int = DEFAULT_LIMIT, fresh: bool = False) -> list:
+        # Sets are updated when standings commit, so every read is fresh
+        self._ensure_loaded(quiz_id)
+        return self._range(quiz_id, limit)
+
+    def rank(self, quiz_id: int, standing_id: int) -> Optional[int]:
+        """1-based position of a standing, or ``None``."""
+        self._ensure_loaded(quiz_id)
+        position = self._rank(quiz_id, standing_id)
+        return None if position is None else position + 1
+
+    def invalidate(self, quiz_id: int) -> None:
+        self.reset(quiz_id)
+
+    def rebuild(self, quiz_id: int) -> int:
+        rows = list(_standings().filter(quiz_id=quiz_id).values(*_FIELDS))
+        self._replace(quiz_id, rows)
+        return len(rows)
+
+    def refresh(self, quiz_ids: Iterable[int], standing_ids: Iterable[int] = (), rebuild_quiz_ids=()) -> None:
+        """Apply changes of the standings ``standing_ids`` to the boards of ``quiz_ids``.
+
+        Quizzes in ``rebuild_quiz_ids`` (whole-quiz rescores) and quizzes
+        marked without any standing are reloaded from the database here,
+        replacing the old set in one step so readers never see a cold board.
+        """
+        quiz_ids, rebuild_quiz_ids = set(quiz_ids), set(rebuild_quiz_ids)
+        standing_ids = set(standing_ids)
+        rows = list(_standings().filter(pk__in=standing_ids).values(*_FIELDS)) if standing_ids else []
+        by_quiz = {}
+        for row in rows:
+            by_quiz.setdefault(row["quiz_id"], []).append(row)
+        # Standings that no longer exist are removed wherever they were
+        missing = list(standing_ids - {row["id"] for row in rows})
+
+        for quiz_id in quiz_ids | set(by_quiz):
+            if not self._is_loaded(quiz_id):
+                continue  # nothing cached yet; the first read loads current data
+            if quiz_id in rebuild_quiz_ids or (quiz_id not in by_quiz and not missing):
+                self.rebuild(quiz_id)
+                continue
+            if quiz_id in by_quiz:
+                self._upsert(quiz_id, by_quiz[quiz_id])
+            if missing:
+                self._remove(quiz_id, missing)
+
+    def _ensure_loaded(self, quiz_id: int) -> None:
+        if self._is_loaded(quiz_id):
+            return
+        # Cold quiz: one reader loads it, the rest wait for that load
+        with swr.single_flight(f"leaderboard-load:{self.name}:{quiz_id}") as acquired:
+            if acquired:
+                started = time.perf_counter()
+                self.rebuild(quiz_id)
+                swr.observe_rebuild("leaderboard", time.perf_counter() - started)
+                return
+        deadline = time.monotonic() + LOAD_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(0.01)
+            if self._is_loaded(quiz_id):
+                return
+        self.rebuild(quiz_id)
+
+
+class _MemoryBoard:
+    __slots__ = ("order", "keys", "entries")
+
+    def __init__(self):
+        self.order = []  # sorted list of sort keys
+        self.keys = {}  # standing id -> sort key
+        self.entries = {}  # standing id -> rendered entry
+
+
+class InMemoryLeaderboard(SortedSetLeaderboard):
+    """Process-local sorted sets (a sorted list per quiz, kept with bisect)."""
+
+    name = "memory"
+
+    def __init__(self):
+        self._boards = {}
+        self._lock = threading.RLock()
+
+    def _is_loaded(self, quiz_id):
+        return quiz_id in self._boards
+
+    def _replace(self, quiz_id, rows):
+        board = _MemoryBoard()
+        for row in rows:
+            key = sort_key(row)
+            board.keys[row["id"]] = key
+            board.entries[row["id"]] = entry_from_row(row)
+        board.order = sorted(board.keys.values())
+        with self._lock:
+            self._boards[quiz_id] = board
+
+    def _discard(self, board, standing_id):
+        key = board.keys.pop(standing_id, None)
+        if key is not None:
+            del board.order[bisect.bisect_left(board.order, key)]
+            del board.entries[standing_id]
+
+    def _upsert(self, quiz_id, rows):
+        with self._lock:
+            board = self._boards[quiz_id]
+            for row in rows:
+                self._discard(board, row["id"])
+                key = sort_key(row)
+                bisect.insort(board.order, key)
+                board.keys[row["id"]] = key
+                board.entries[row["id"]] = entry_from_row(row)
+
+    def _remove(self, quiz_id, standing_ids):
+        with self._lock:
+            board = self._boards[quiz_id]
+            for standing_id in standing_ids:
+                self._discard(board, standing_id)
+
+    def _range(self, quiz_id, limit):
+        with self._lock:
+            board = self._boards[quiz_id]
+            return [board.entries[key[-1]] for key in board.order[:limit]]
+
+    def _rank(self, quiz_id, standing_id):
+        with self._lock:
+            board = self._boards[quiz_id]
+            key = board.keys.get(standing_id)
+            return None if key is None else bisect.bisect_left(board.order, key)
+
+    def reset(self, quiz_id):
+        with self._lock:
+            self._boards.pop(quiz_id, None)
+
+
+class RedisLeaderboard(SortedSetLeaderboard):
+    """Redis sorted set per quiz plus hashes of rendered entries and members.
+
+    Members are :meth:`member` strings, all at score 0, so ``ZRANGE`` and
+    ``ZRANK`` follow the full tie-break. A standing's member changes with
+    its score, so the current one is kept in a hash and swapped atomically
+    by a Lua script.
+    """
+
+    name = "redis"
+    prefix = "quizzy:leaderboard:v2"  # v1 members were bare standing ids
+
+    # KEYS: zset, entries hash, members hash; ARGV: (id, member, entry) triples
+    UPSERT = """
+for i = 1, #ARGV, 3 do
+    local old = redis.call('HGET', KEYS[3], ARGV[i])
+    if old then redis.call('ZREM', KEYS[1], old) end
+    redis.call('ZADD', KEYS[1], 0, ARGV[i + 1])
+    redis.call('HSET', KEYS[3], ARGV[i], ARGV[i + 1])
+    redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 2])
+end
+"""
+    # KEYS: zset, entries hash, members hash; ARGV: standing ids
+    REMOVE = """
+for i = 1, #ARGV do
+    local old = redis.call('HGET', KEYS[3], ARGV[i])
+    if old then redis.call('ZREM', KEYS[1], old) end
+    redis.call('HDEL', KEYS[3], ARGV[i])
+    redis.call('HDEL', KEYS[2], ARGV[i])
+end
+"""
+
+    def __init__(self, url: str):
+        import redis  # type: ignore
+
+        self.client = redis.Redis.from_url(url, socket_connect_timeout=0.2)
+        self._upsert_script = self.client.register_script(self.UPSERT)
+        self._remove_script = self.client.register_script(self.REMOVE)
+
+    def _keys(self, quiz_id):
+        base = f"{self.prefix}:{quiz_id}"
+        return f"{base}:z", f"{base}:entries", f"{base}:members", f"{base}:loaded"
+
+    @staticmethod
+    def member(row) -> str:
+        """Sorted-set member whose bytewise order matches :func:`sort_key`."""
+        return f"{SCORE_BIAS - row['score']:020d}:{_micros(row['decided_at']):020d}:{row['id']:020d}"
+
+    @staticmethod
+    def _standing_id(member) -> int:
+        return int(member.rsplit(b":", 1)[-1])
+
+    def _is_loaded(self, quiz_id):
+        return bool(self.client.exists(self._keys(quiz_id)[3]))
+
+    def _replace(self, quiz_id, rows):
+        zkey, hkey, mkey, loaded = self._keys(quiz_id)
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(zkey, hkey, mkey)
+        if rows:
+            members = {row["id"]: self.member(row) for row in rows}
+            pipe.zadd(zkey, {member: 0 for member in members.values()})
+            pipe.hset(mkey, mapping=members)
+            pipe.hset(hkey, mapping={row["id"]: json.dumps(entry_from_row(row)) for row in rows})
+        pipe.set(loaded, 1)
+        pipe.execute()
+
+    def _upsert(self, quiz_id, rows):
+        zkey, hkey, mkey, _ = self._keys(quiz_id)
+        args = []
+        for row in rows:
+            args += [row["id"], self.member(row), json.dumps(entry_from_row(row))]
+        self._upsert_script(keys=[zkey, hkey, mkey], args=args)
+
+    def _remove(self, quiz_id, standing_ids):
+        zkey, hkey, mkey, _ = self._keys(quiz_id)
+        self._remove_script(keys=[zkey, hkey, mkey], args=list(standing_ids))
+
+    def _range(self, quiz_id, limit):
+        zkey, hkey, _, _ = self._keys(quiz_id)
+        members = self.client.zrange(zkey, 0, limit - 1)
+        if not members:
+            return []
+        ids = [self._standing_id(member) for member in members]
+        return [json.loads(raw) for raw in self.client.hmget(hkey, ids) if raw is not None]
+
+    def _rank(self, quiz_id, standing_id):
+        zkey, _, mkey, _ = self._keys(quiz_id)
+        member = self.client.hget(mkey, standing_id)
+        return None if member is None else self.client.zrank(zkey, member)
+
+    def reset(self, quiz_id):
+        self.client.delete(*self._keys(quiz_id))
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        name = getattr(settings, "LEADERBOARD_BACKEND", "database")
+        if name == "redis":
+            try:
+                _backend = RedisLeaderboard(settings.REDIS_URL)
+                _backend.client.ping()
+            except Exception:
+                logger.warning("Redis leaderboard unavailable; using the database backend")
+                _backend = DatabaseLeaderboard()
+        elif name == "memory":
+            _backend = InMemoryLeaderboard()
+        else:
+            _backend = DatabaseLeaderboard()
+    return _backend
@@ -0,0 +1,55 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+
+from realtime.codecs import CODECS
+from realtime.protocol import delta_message, diff_entries, snapshot_message
+
+
+class Command(BaseCommand):
+    help = "Benchmark bytes per update and encode/decode cost of each realtime wire codec (no database access)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--entries", type=int, default=100, help="Leaderboard size.")
+        parser.add_argument("--iterations", type=int, default=2000, help="Encodes per measurement.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+        entries = [
+            {
+                "id": 10_000 + i,
+                "user": f"student{rng.randrange(100_000):05d}",
+                "score": 100 - i,
+                "attempt": rng.randint(1, 3),
+                "submitted_at": (start + timedelta(seconds=rng.randrange(86_400))).isoformat(),
+            }
+            for i in range(options["entries"])
+        ]
+        # A typical update: one entry improves and climbs ten places
+        climber = dict(entries[60], score=entries[50]["score"] + 1)
+        updated = entries[:50] + [climber] + entries[50:60] + entries[61:]
+        messages = {
+            "snapshot": snapshot_message(2, updated),
+            "delta": delta_message(1, 2, diff_entries(entries, updated)),
+        }
+        n = options["iterations"]
+        self.stdout.write(f"{len(entries)}-entry leaderboard, {n} iterations per measurement")
+        self.stdout.write(f"  {'codec':<16} {'message':<9} {'bytes':>7} {'encode us':>10} {'decode us':>10}")
+        for name, codec in CODECS.items():
+            for label, message in messages.items():
+                frame = codec.encode(message)
+                started = time.perf_counter()
+                for _ in range(n):
+                    codec.encode(message)
+                encode_us = (time.perf_counter() - started) / n * 1e6
+                started = time.perf_counter()
+                for _ in range(n):
+                    codec.decode(frame)
+                decode_us = (time.perf_counter() - started) / n * 1e6
+                size = len(frame.encode("utf-8") if isinstance(frame, str) else frame)
+                self.stdout.write(f"  {name:<16} {label:<9} {size:>7} {encode_us:>10.1f} {decode_us:>10.1f}")
+        self.stdout.write(self.style.SUCCESS("Done."))
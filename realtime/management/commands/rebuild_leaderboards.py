@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quizzes.models import Quiz
+from realtime.leaderboard import get_backend
+from submissions.standings import rebuild_standings
+
+
+class Command(BaseCommand):
+    help = "Rebuild the leaderboard backend's sorted sets from the standings in the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("quiz_ids", nargs="*", type=int, help="Quiz ids to rebuild.")
+        parser.add_argument("--all", action="store_true", help="Rebuild every quiz.")
+        parser.add_argument(
+            "--standings", action="store_true", help="Re-derive the standings from completed submissions first."
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            quizzes = Quiz.objects.all()
+        elif options["quiz_ids"]:
+            quizzes = Quiz.objects.filter(pk__in=options["quiz_ids"])
+        else:
+            raise CommandError("Pass one or more quiz ids, or --all.")
+
+        backend = get_backend()
+        for quiz in quizzes.order_by("pk"):
+            started = time.perf_counter()
+            if options["standings"]:
+                rebuild_standings(quiz)
+            entries = backend.rebuild(quiz.pk)
+            self.stdout.write(f"quiz {quiz.pk}: {entries} entries in {time.perf_counter() - started:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Leaderboards rebuilt ({backend.name} backend)."))
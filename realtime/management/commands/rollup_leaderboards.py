@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quizzes.models import Quiz
+from realtime.rollups import prune_rollups, take_rollup
+from submissions.models import LeaderboardRollup
+
+WINDOWS = [choice for choice, _ in LeaderboardRollup.WINDOW_CHOICES]
+
+
+class Command(BaseCommand):
+    help = "Fold new submissions into the daily, weekly and all-time leaderboard rollups (run periodically)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("quiz_ids", nargs="*", type=int, help="Quiz ids to roll up.")
+        parser.add_argument("--all", action="store_true", help="Roll up every published quiz.")
+        parser.add_argument("--windows", nargs="+", choices=WINDOWS, default=WINDOWS, help="Windows to roll up.")
+        parser.add_argument(
+            "--prune-days", type=int, default=None,
+            help="Also delete rollups older than this many days (each quiz keeps its latest all-time snapshot).",
+        )
+
+    def handle(self, *args, **options):
+        if options["all"]:
+            quizzes = Quiz.objects.filter(is_published=True)
+        elif options["quiz_ids"]:
+            quizzes = Quiz.objects.filter(pk__in=options["quiz_ids"])
+        else:
+            raise CommandError("Pass one or more quiz ids, or --all.")
+
+        for quiz in quizzes.order_by("pk"):
+            for window in options["windows"]:
+                started = time.perf_counter()
+                rollup = take_rollup(quiz, window)
+                self.stdout.write(
+                    f"quiz {quiz.pk} {window}: {len(rollup.states)} users in {time.perf_counter() - started:.2f}s"
+                )
+        if options["prune_days"] is not None:
+            self.stdout.write(f"pruned {prune_rollups(options['prune_days'])} rollup(s)")
+        self.stdout.write(self.style.SUCCESS("Leaderboard rollups up to date."))
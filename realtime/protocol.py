@@ -0,0 +1,127 @@
+"""Versioned leaderboard protocol for WebSocket clients.
+
+Server -> client frames:
+
+* ``{"type": "leaderboard", "seq": n, "entries": [...]}`` – full snapshot,
+  sent on connect, on request and whenever it is smaller than the delta.
+* ``{"type": "leaderboard.delta", "base": m, "seq": n, "ops": [...]}`` –
+  changes from snapshot ``m`` to ``n``. Ops are ``remove`` (``id``),
+  ``upsert`` (``rank``, ``entry``: new or changed entry) and ``move``
+  (``id``, ``rank``); entries not mentioned keep their rank. See
+  :func:`apply_ops` for the reference client algorithm.
+
+Client -> server: ``{"type": "resync"}`` asks for a fresh snapshot, for when
+a delta's ``base`` doesn't match the client's last ``seq``.
+
+The last published snapshot and the sequence counter live in the shared
+cache, so every worker diffs against the same base. Publishing reads the
+board fresh and advances both under a per-quiz lock, so concurrent
+publishers never interleave a sequence number with another one's snapshot.
+Messages are plain dicts; :mod:`realtime.codecs` turns them into frames.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from django.core.cache import cache
+
+from core import swr
+
+from .codecs import DEFAULT_CODEC
+from .utils import get_leaderboard
+
+SNAPSHOT_KEY = "leaderboard:snapshot:%s"
+SEQ_KEY = "leaderboard:seq:%s"
+PUBLISH_LOCK = "leaderboard:publish:%s"
+SNAPSHOT_TIMEOUT = 24 * 60 * 60
+
+
+def diff_entries(old: list, new: list) -> list:
+    """Ops turning ranked entry list ``old`` into ``new`` (entries keyed by ``id``)."""
+    old_ranks = {entry["id"]: (rank, entry) for rank, entry in enumerate(old)}
+    new_ids = {entry["id"] for entry in new}
+    ops = [{"op": "remove", "id": entry["id"]} for entry in old if entry["id"] not in new_ids]
+    for rank, entry in enumerate(new):
+        previous = old_ranks.get(entry["id"])
+        if previous is None or previous[1] != entry:
+            ops.append({"op": "upsert", "rank": rank, "entry": entry})
+        elif previous[0] != rank:
+            ops.append({"op": "move", "id": entry["id"], "rank": rank})
+    return ops
+
+
+def apply_ops(old: list, ops: list) -> list:
+    """Apply ``ops`` to ``old``; mirrors what the browser client does."""
+    by_id = {entry["id"]: entry for entry in old}
+    removed, placed, touched = set(), {}, set()
+    for op in ops:
+        if op["op"] == "remove":
+            removed.add(op["id"])
+        elif op["op"] == "upsert":
+            placed[op["rank"]] = op["entry"]
+            touched.add(op["entry"]["id"])
+        elif op["op"] == "move":
+            placed[op["rank"]] = by_id[op["id"]]
+            touched.add(op["id"])
+    kept = [(rank, entry) for rank, entry in enumerate(old) if entry["id"] not in removed | touched]
+    result = [None] * (len(kept) + len(placed))
+    for rank, entry in kept:
+        result[rank] = entry
+    for rank, entry in placed.items():
+        result[rank] = entry
+    return result
+
+
+def snapshot_message(seq: int, entries: list) -> dict:
+    return {"type": "leaderboard", "seq": seq, "entries": entries}
+
+
+def delta_message(base: int, seq: int, ops: list) -> dict:
+    return {"type": "leaderboard.delta", "base": base, "seq": seq, "ops": ops}
+
+
+def _next_seq(quiz_id: int) -> int:
+    key = SEQ_KEY % quiz_id
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Start from the clock so a lost counter never reuses an old number
+        cache.add(key, int(time.time() * 1000), None)
+        return cache.incr(key)
+
+
+def _store(quiz_id: int, seq: int, entries: list) -> None:
+    cache.set(SNAPSHOT_KEY % quiz_id, {"seq": seq, "entries": entries}, SNAPSHOT_TIMEOUT)
+
+
+def current_message(quiz_id: int) -> dict:
+    """Snapshot for a newly connected (or resyncing) client."""
+    snapshot = cache.get(SNAPSHOT_KEY % quiz_id)
+    if snapshot is None:
+        with swr.locked(PUBLISH_LOCK % quiz_id):
+            snapshot = cache.get(SNAPSHOT_KEY % quiz_id)
+            if snapshot is None:
+                entries = get_leaderboard(quiz_id)
+                snapshot = {"seq": _next_seq(quiz_id), "entries": entries}
+                _store(quiz_id, snapshot["seq"], entries)
+    return snapshot_message(snapshot["seq"], snapshot["entries"])
+
+
+def publish_message(quiz_id: int) -> Optional[dict]:
+    """Advance the quiz's snapshot and return the message to broadcast (``None`` if unchanged)."""
+    with swr.locked(PUBLISH_LOCK % quiz_id):
+        entries = get_leaderboard(quiz_id, fresh=True)
+        previous = cache.get(SNAPSHOT_KEY % quiz_id)
+        ops = diff_entries(previous["entries"], entries) if previous is not None else None
+        if ops == []:
+            return None
+        seq = _next_seq(quiz_id)
+        _store(quiz_id, seq, entries)
+    snapshot = snapshot_message(seq, entries)
+    if ops is None:
+        return snapshot
+    delta = delta_message(previous["seq"], seq, ops)
+    encode = DEFAULT_CODEC.encode
+    return delta if len(encode(delta)) < len(encode(snapshot)) else snapshot
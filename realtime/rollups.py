@@ -0,0 +1,240 @@
+"""Time-windowed and historical leaderboards served from periodic rollups.
+
+``manage.py rollup_leaderboards`` folds completed submissions into
+:class:`~submissions.models.LeaderboardRollup` rows:
+
+* ``day`` / ``week`` – the current calendar period (site time zone, weeks
+  start on Monday), updated in place on every run;
+* ``all`` – an all-time snapshot appended on every run, the history behind
+  :func:`leaderboard_as_of`.
+
+Each run starts from the previous rollup and only reads the submissions
+created since (plus the ones that were still open then), so it never
+rescans a quiz. Queries merge the latest rollup with the same kind of
+small live tail. Submissions are placed in windows by ``submitted_at``,
+which is when the attempt was completed (it holds the start time while the
+attempt is open, so open attempts are tracked across the whole quiz and
+placed once they complete). Rollups are snapshots: a submission deleted
+afterwards still counts in them; a rescore discards them (see
+:func:`discard_rollups`).
+
+A rollup stores one list per user, mergeable in any order::
+
+    [user_id, attempts,
+     best_score, best_at, best_attempt,
+     first_score, first_at, first_attempt,
+     last_score, last_at, last_attempt]
+
+with times in epoch microseconds. The quiz's scoring policy picks which of
+best / first / last ranks the user, as for standings.
+"""
+
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .leaderboard import DEFAULT_LIMIT, page
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_COLUMNS = ("id", "user_id", "score", "attempt_number", "submitted_at")
+
+USER, ATTEMPTS = 0, 1
+BEST, FIRST, LAST = 2, 5, 8  # offsets of (score, at, attempt) triples
+_PICK = {"first": FIRST, "last": LAST}  # anything else ranks by the best attempt
+
+
+def _models():
+    from submissions.models import LeaderboardRollup, Submission  # lazy: imported from the ASGI chain
+
+    return LeaderboardRollup, Submission
+
+
+def _micros(value: datetime) -> int:
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def _datetime(micros: int) -> datetime:
+    return _EPOCH + micros * _MICROSECOND
+
+
+def period_bounds(window: str, now: Optional[datetime] = None) -> tuple:
+    """``(start, end)`` of the calendar period containing ``now``; ``(None, None)`` for all time."""
+    LeaderboardRollup, _ = _models()
+    if window == LeaderboardRollup.ALL:
+        return None, None
+    local = timezone.localtime(now or timezone.now())
+    start = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    if window == LeaderboardRollup.DAY:
+        return start, start + timedelta(days=1)
+    if window == LeaderboardRollup.WEEK:
+        start -= timedelta(days=start.weekday())
+        return start, start + timedelta(days=7)
+    raise ValueError(f"Unknown leaderboard window {window!r}")
+
+
+def state_from_row(row: dict) -> list:
+    at = _micros(row["submitted_at"])
+    triple = [row["score"], at, row["attempt_number"]]
+    return [row["user_id"], 1, *triple, *triple, *triple]
+
+
+def merge_state(a: list, b: list) -> list:
+    """Combine two states of the same user (associative and commutative)."""
+    best = min(a[BEST:BEST + 3], b[BEST:BEST + 3], key=lambda t: (-t[0], t[1], t[2]))
+    first = min(a[FIRST:FIRST + 3], b[FIRST:FIRST + 3], key=lambda t: (t[2], t[1]))
+    last = max(a[LAST:LAST + 3], b[LAST:LAST + 3], key=lambda t: (t[2], t[1]))
+    return [a[USER], a[ATTEMPTS] + b[ATTEMPTS], *best, *first, *last]
+
+
+def fold(states: dict, rows: Iterable[dict]) -> dict:
+    """Merge submission rows into ``{user_id: state}`` (in place)."""
+    for row in rows:
+        state = state_from_row(row)
+        previous = states.get(row["user_id"])
+        states[row["user_id"]] = state if previous is None else merge_state(previous, state)
+    return states
+
+
+def _window_submissions(quiz_id: int, start: Optional[datetime], end: Optional[datetime]):
+    _, Submission = _models()
+    qs = Submission.objects.filter(quiz_id=quiz_id)
+    if start is not None:
+        qs = qs.filter(submitted_at__gte=start, submitted_at__lt=end)
+    return qs
+
+
+def _unfolded(qs, rollup):
+    """Submissions of ``qs`` that ``rollup`` hasn't folded in (all of them without a rollup)."""
+    if rollup is None:
+        return qs
+    return qs.filter(Q(pk__gt=rollup.through_submission_id) | Q(pk__in=rollup.open_submission_ids))
+
+
+def _tail(qs, rollup):
+    return _unfolded(qs, rollup).filter(in_progress=False)
+
+
+def _latest(quiz_id: int, window: str, start: Optional[datetime] = None, at: Optional[datetime] = None):
+    LeaderboardRollup, _ = _models()
+    qs = LeaderboardRollup.objects.filter(quiz_id=quiz_id, window=window, period_start=start)
+    if at is not None:
+        qs = qs.filter(taken_at__lte=at)
+    return qs.order_by("-taken_at", "-pk").first()
+
+
+def take_rollup(quiz, window: str, now: Optional[datetime] = None, full: bool = False):
+    """Fold the submissions since the previous rollup into a new one for ``window``.
+
+    ``full`` ignores the previous rollup and folds the whole window.
+    """
+    LeaderboardRollup, _ = _models()
+    now = now or timezone.now()
+    start, end = period_bounds(window, now)
+    previous = None if full else _latest(quiz.pk, window, start)
+    submissions = _window_submissions(quiz.pk, None, None)
+    # Everything up to this id is either folded now, outside the window for
+    # good, or remembered as open (wherever it will land once completed)
+    through = submissions.aggregate(through=Max("pk"))["through"] or 0
+    if previous is not None:
+        through = max(through, previous.through_submission_id)
+    pending = _unfolded(submissions, previous).filter(pk__lte=through)
+    completed = pending.filter(in_progress=False)
+    if start is not None:
+        completed = completed.filter(submitted_at__gte=start, submitted_at__lt=end)
+    states = {state[USER]: state for state in previous.states} if previous is not None else {}
+    fold(states, completed.order_by("pk").values(*_COLUMNS).iterator())
+    still_open = list(pending.filter(in_progress=True).order_by("pk").values_list("pk", flat=True))
+
+    fields = {
+        "taken_at": now,
+        "through_submission_id": through,
+        "open_submission_ids": still_open,
+        "states": list(states.values()),
+    }
+    if window != LeaderboardRollup.ALL and previous is not None:
+        for name, value in fields.items():
+            setattr(previous, name, value)
+        previous.save(update_fields=list(fields))
+        return previous
+    return LeaderboardRollup.objects.create(quiz=quiz, window=window, period_start=start, **fields)
+
+
+def rank_states(states: Iterable[list], policy: str) -> list:
+    """``[(state, (score, at, attempt))]`` ordered like the live leaderboard."""
+    offset = _PICK.get(policy, BEST)
+    picked = [(state, tuple(state[offset:offset + 3])) for state in states]
+    picked.sort(key=lambda item: (-item[1][0], item[1][1], item[0][USER]))
+    return picked
+
+
+def _render(ranked: list, limit: int) -> list:
+    from django.contrib.auth.models import User
+
+    top = ranked[:limit]
+    names = dict(User.objects.filter(pk__in=[state[USER] for state, _ in top]).values_list("pk", "username"))
+    return [
+        {
+            "rank": rank,
+            "user": names.get(state[USER], ""),
+            "score": score,
+            "attempt": attempt,
+            "attempts": state[ATTEMPTS],
+            "submitted_at": _datetime(at).isoformat(),
+        }
+        for rank, (state, (score, at, attempt)) in enumerate(top, start=1)
+    ]
+
+
+def window_leaderboard(quiz, window: str, limit: int = DEFAULT_LIMIT, now: Optional[datetime] = None) -> list:
+    """Top ``limit`` users of the current ``day`` / ``week`` (``all`` reads the live standings)."""
+    LeaderboardRollup, _ = _models()
+    if window == LeaderboardRollup.ALL:
+        return page(quiz.pk, limit=limit)["entries"]
+    start, end = period_bounds(window, now)
+    base = _latest(quiz.pk, window, start)
+    states = {state[USER]: state for state in base.states} if base is not None else {}
+    fold(states, _tail(_window_submissions(quiz.pk, start, end), base).values(*_COLUMNS).iterator())
+    return _render(rank_states(states.values(), quiz.scoring_policy), limit)
+
+
+def leaderboard_as_of(quiz, at: datetime, limit: int = DEFAULT_LIMIT) -> list:
+    """Top ``limit`` users counting the submissions completed by ``at``."""
+    LeaderboardRollup, _ = _models()
+    base = _latest(quiz.pk, LeaderboardRollup.ALL, at=at)
+    states = {state[USER]: state for state in base.states} if base is not None else {}
+    tail = _tail(_window_submissions(quiz.pk, None, None), base).filter(submitted_at__lte=at)
+    fold(states, tail.values(*_COLUMNS).iterator())
+    return _render(rank_states(states.values(), quiz.scoring_policy), limit)
+
+
+def discard_rollups(quiz) -> None:
+    """Drop rollups built from scores that no longer hold (after a rescore).
+
+    Window rollups are deleted and rebuilt on the next run; the all-time
+    history is kept, with a fresh snapshot so later runs and "as of" queries
+    start from the new scores.
+    """
+    LeaderboardRollup, _ = _models()
+    if not LeaderboardRollup.objects.filter(quiz=quiz).exists():
+        return
+    with transaction.atomic():
+        LeaderboardRollup.objects.filter(quiz=quiz).exclude(window=LeaderboardRollup.ALL).delete()
+        take_rollup(quiz, LeaderboardRollup.ALL, full=True)
+
+
+def prune_rollups(keep_days: int, now: Optional[datetime] = None) -> int:
+    """Delete rollups older than ``keep_days``, keeping each quiz's latest all-time snapshot."""
+    LeaderboardRollup, _ = _models()
+    cutoff = (now or timezone.now()) - timedelta(days=keep_days)
+    latest = (
+        LeaderboardRollup.objects.filter(window=LeaderboardRollup.ALL)
+        .values("quiz_id").annotate(latest_id=Max("pk")).values_list("latest_id", flat=True)
+    )
+    deleted, _ = LeaderboardRollup.objects.filter(taken_at__lt=cutoff).exclude(pk__in=list(latest)).delete()
+    return deleted
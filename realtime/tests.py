@@ -1,3 +1,413 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import channels, swr
+from core.channels import broadcast_leaderboard
+from quiz_project.routing import websocket_urlpatterns
+from quizzes.models import Quiz, Question, Answer
+from realtime import codecs, leaderboard, protocol, rollups
+from realtime.leaderboard import DatabaseLeaderboard, InMemoryLeaderboard
+from submissions.grading import submit_answers
+from submissions.models import LeaderboardRollup, QuizStanding, Submission
+from submissions.standings import rebuild_standings
+
+
+class LeaderboardBackendTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="x")
+        self.quiz = Quiz.objects.create(
+            title="Q", creator=self.creator, is_published=True, allow_multiple_attempts=True
+        )
+        self.question = Question.objects.create(quiz=self.quiz, text="?")
+        self.right = Answer.objects.create(question=self.question, text="y", is_correct=True)
+        self.users = [User.objects.create_user(username=f"u{i}", password="x") for i in range(4)]
+        now = timezone.now()
+        scores = [(2, 3), (5, 2), (5, 1), (1, 0)]  # (score, minutes ago)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.subs = [
+                Submission.objects.create(quiz=self.quiz, user=user, score=score, in_progress=False)
+                for user, (score, _) in zip(self.users, scores)
+            ]
+        for sub, (_, minutes) in zip(self.subs, scores):
+            Submission.objects.filter(pk=sub.pk).update(submitted_at=now - timedelta(minutes=minutes))
+        rebuild_standings(self.quiz)
+        self.standings = [QuizStanding.objects.get(quiz=self.quiz, user=user) for user in self.users]
+
+    def test_memory_matches_database_order_and_ranks(self):
+        memory, database = InMemoryLeaderboard(), DatabaseLeaderboard()
+        database.reset(self.quiz.id)
+        expected = ["u1", "u2", "u0", "u3"]  # equal scores: earlier submission first
+        self.assertEqual([e["user"] for e in memory.top(self.quiz.id)], expected)
+        self.assertEqual([e["user"] for e in database.top(self.quiz.id)], expected)
+        for backend in (memory, database):
+            self.assertEqual(backend.rank(self.quiz.id, self.standings[2].pk), 2)
+            self.assertEqual(backend.top(self.quiz.id, limit=2)[0]["score"], 5)
+
+    def test_redis_members_sort_like_every_other_backend(self):
+        moment = timezone.now()
+        rows = [
+            {"id": 7, "score": 3, "decided_at": moment},
+            {"id": 2, "score": 3, "decided_at": moment},  # same instant: lower id first
+            {"id": 5, "score": 3, "decided_at": moment + timedelta(microseconds=1)},
+            {"id": 9, "score": 3, "decided_at": moment - timedelta(milliseconds=300)},
+            {"id": 4, "score": 12, "decided_at": moment},
+            {"id": 1, "score": -2, "decided_at": moment},
+            {"id": 3, "score": 0, "decided_at": moment},
+        ]
+        expected = [row["id"] for row in sorted(rows, key=leaderboard.sort_key)]
+        self.assertEqual(expected, [4, 9, 2, 7, 5, 3, 1])
+        members = sorted(leaderboard.RedisLeaderboard.member(row).encode() for row in rows)
+        self.assertEqual([leaderboard.RedisLeaderboard._standing_id(m) for m in members], expected)
+
+    @mock.patch.object(leaderboard, "_backend", None)
+    def test_unreachable_redis_falls_back_to_the_database(self):
+        with self.settings(LEADERBOARD_BACKEND="redis"), \
+                mock.patch.object(leaderboard, "RedisLeaderboard", side_effect=ConnectionError), \
+                self.assertLogs("realtime.leaderboard", "WARNING"):
+            self.assertIsInstance(leaderboard.get_backend(), DatabaseLeaderboard)
+
+    def test_warm_reads_skip_the_database(self):
+        memory = InMemoryLeaderboard()
+        memory.top(self.quiz.id)
+        with self.assertNumQueries(0):
+            memory.top(self.quiz.id)
+            memory.rank(self.quiz.id, self.standings[0].pk)
+
+    def test_refresh_applies_score_changes_incrementally(self):
+        memory = InMemoryLeaderboard()
+        memory.top(self.quiz.id)
+        QuizStanding.objects.filter(pk=self.standings[3].pk).update(score=9)
+        QuizStanding.objects.filter(pk__in=[self.standings[0].pk, self.standings[1].pk]).delete()
+        with mock.patch.object(memory, "rebuild") as rebuild:
+            memory.refresh({self.quiz.id}, {standing.pk for standing in self.standings[:2] + self.standings[3:]})
+        rebuild.assert_not_called()
+        self.assertEqual([e["user"] for e in memory.top(self.quiz.id)], ["u3", "u2"])
+        self.assertIsNone(memory.rank(self.quiz.id, self.standings[1].pk))
+
+    def test_submit_flows_into_backend_on_commit(self):
+        memory = InMemoryLeaderboard()
+        memory.top(self.quiz.id)
+        late = User.objects.create_user(username="late", password="x")
+        with mock.patch.object(leaderboard, "_backend", memory), self.captureOnCommitCallbacks(execute=True):
+            submission = submit_answers(self.quiz, late, {self.question.id: self.right.id})
+        standing = QuizStanding.objects.get(quiz=self.quiz, user=late)
+        self.assertEqual(standing.submission_id, submission.pk)
+        self.assertEqual(memory.rank(self.quiz.id, standing.pk), 5)  # ties u3's score, submitted later
+        self.assertEqual(memory.top(self.quiz.id)[4], {
+            "id": standing.pk, "user": "late", "score": 1, "attempt": 1, "submitted_at": submission.submitted_at.isoformat(),
+        })
+
+    def test_rebuild_command(self):
+        memory = InMemoryLeaderboard()
+        memory.top(self.quiz.id)
+        Submission.objects.filter(pk=self.subs[3].pk).update(score=7)  # written behind the backend's back
+        out = StringIO()
+        with mock.patch.object(leaderboard, "_backend", memory):
+            call_command("rebuild_leaderboards", str(self.quiz.id), "--standings", stdout=out)
+        self.assertIn("4 entries", out.getvalue())
+        self.assertEqual(memory.top(self.quiz.id)[0]["user"], "u3")
+
+    def test_database_backend_serves_previous_snapshot_while_stale(self):
+        database = DatabaseLeaderboard()
+        database.reset(self.quiz.id)
+        self.assertEqual(database.top(self.quiz.id)[0]["user"], "u1")
+        QuizStanding.objects.filter(pk=self.standings[3].pk).update(score=9)
+        database.invalidate(self.quiz.id)
+        with swr.single_flight(leaderboard.CACHE_KEY % self.quiz.id), self.assertNumQueries(0):
+            self.assertEqual(database.top(self.quiz.id)[0]["user"], "u1")
+        self.assertEqual(database.top(self.quiz.id)[0]["user"], "u3")
+
+    def test_publish_reads_past_a_stale_snapshot(self):
+        database = DatabaseLeaderboard()
+        database.reset(self.quiz.id)
+        cache.delete_many([protocol.SNAPSHOT_KEY % self.quiz.id, protocol.SEQ_KEY % self.quiz.id])
+        with mock.patch.object(leaderboard, "_backend", database):
+            protocol.current_message(self.quiz.id)
+            QuizStanding.objects.filter(pk=self.standings[3].pk).update(score=9)
+            database.invalidate(self.quiz.id)
+            # Another reader holds the rebuild lock, so an SWR read would still be stale
+            with swr.single_flight(leaderboard.CACHE_KEY % self.quiz.id):
+                update = protocol.publish_message(self.quiz.id)
+        self.assertIsNotNone(update)
+        self.assertEqual(protocol.current_message(self.quiz.id)["entries"][0]["user"], "u3")
+
+    def test_database_rank_counts_up_to_the_scan_limit_then_estimates(self):
+        from realtime.utils import get_user_standing
+
+        database = DatabaseLeaderboard()
+        database.reset(self.quiz.id)
+        with self.settings(LEADERBOARD_RANK_SCAN_LIMIT=10), self.assertNumQueries(3):
+            self.assertEqual(database.rank(self.quiz.id, self.standings[3].pk), 4)  # row, higher scores, ties
+        with self.settings(LEADERBOARD_RANK_SCAN_LIMIT=2):
+            # Exact while fewer than 2 entries are ahead; deeper ranks come from the score histogram
+            self.assertEqual([database.rank(self.quiz.id, s.pk) for s in self.standings], [3, 1, 2, 4])
+            with self.assertNumQueries(2):  # row, capped count; the histogram is cached
+                self.assertEqual(database.rank(self.quiz.id, self.standings[0].pk), 3)
+            with mock.patch.object(leaderboard, "_backend", database):
+                standing = get_user_standing(self.quiz.id, self.users[3].id)
+                self.assertEqual((standing["rank"], standing["approximate"]), (4, True))
+                standing = get_user_standing(self.quiz.id, self.users[1].id)
+                self.assertEqual((standing["rank"], standing["approximate"]), (1, False))
+
+    def test_keyset_pages_cover_the_board_in_order(self):
+        seen, after = [], None
+        while True:
+            result = leaderboard.page(self.quiz.id, after, limit=3)
+            seen.extend(result["entries"])
+            after = result["next"]
+            if after is None:
+                break
+        self.assertEqual([e["user"] for e in seen], ["u1", "u2", "u0", "u3"])
+        self.assertEqual([e["rank"] for e in seen], [1, 2, 3, 4])
+
+    def test_keyset_page_seeks_past_equal_scores(self):
+        first = leaderboard.page(self.quiz.id, limit=1)
+        self.assertEqual([e["user"] for e in first["entries"]], ["u1"])
+        second = leaderboard.page(self.quiz.id, first["next"], limit=1)
+        self.assertEqual([(e["user"], e["rank"]) for e in second["entries"]], [("u2", 2)])
+        with self.assertRaises(ValueError):
+            leaderboard.page(self.quiz.id, "not-a-cursor")
+
+    def test_user_standing_uses_best_attempt(self):
+        from realtime.utils import get_user_standing
+
+        DatabaseLeaderboard().reset(self.quiz.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            better = Submission.objects.create(
+                quiz=self.quiz, user=self.users[3], score=4, attempt_number=2, in_progress=False
+            )
+        standing = get_user_standing(self.quiz.id, self.users[3].id)
+        self.assertEqual((standing["rank"], standing["attempts"], standing["submission_id"]), (3, 2, better.pk))
+        self.assertIsNone(get_user_standing(self.quiz.id, self.creator.id))
+
+
+class LeaderboardRollupTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="x")
+        self.quiz = Quiz.objects.create(
+            title="Q", creator=self.creator, is_published=True, allow_multiple_attempts=True
+        )
+        self.users = [User.objects.create_user(username=f"u{i}", password="x") for i in range(3)]
+        self.now = timezone.now().replace(hour=12)
+        self.attempts = {}
+
+    def _submit(self, user, score, hours_ago=0, in_progress=False):
+        number = self.attempts[user.pk] = self.attempts.get(user.pk, 0) + 1
+        sub = Submission.objects.create(
+            quiz=self.quiz, user=user, score=score, attempt_number=number, in_progress=in_progress
+        )
+        Submission.objects.filter(pk=sub.pk).update(submitted_at=self.now - timedelta(hours=hours_ago))
+        return sub
+
+    def _board(self, window):
+        return [(e["user"], e["score"]) for e in rollups.window_leaderboard(self.quiz, window, now=self.now)]
+
+    def test_merge_is_order_independent(self):
+        rows = [
+            {"id": i, "user_id": 1, "score": score, "attempt_number": i, "submitted_at": self.now + timedelta(minutes=i)}
+            for i, score in enumerate([3, 7, 7, 1], start=1)
+        ]
+        forward = rollups.fold({}, rows)[1]
+        backward = rollups.fold({}, reversed(rows))[1]
+        self.assertEqual(forward, backward)
+        self.assertEqual(forward[rollups.ATTEMPTS], 4)
+        self.assertEqual(forward[rollups.BEST:rollups.BEST + 3][::2], [7, 2])  # earliest of the tied best
+
+    def test_day_window_merges_rollup_with_live_tail(self):
+        self._submit(self.users[0], 9, hours_ago=30)  # yesterday: outside the day window
+        self._submit(self.users[1], 4, hours_ago=2)
+        open_attempt = self._submit(self.users[2], 0, hours_ago=1, in_progress=True)
+        rollup = rollups.take_rollup(self.quiz, LeaderboardRollup.DAY, now=self.now)
+        self.assertEqual(rollup.open_submission_ids, [open_attempt.pk])
+        # Completed after the rollup: an attempt that was open then, and a new one
+        Submission.objects.filter(pk=open_attempt.pk).update(score=6, in_progress=False)
+        self._submit(self.users[1], 5)
+        expected = [("u2", 6), ("u1", 5)]
+        self.assertEqual(self._board(LeaderboardRollup.DAY), expected)
+        rollups.take_rollup(self.quiz, LeaderboardRollup.DAY, now=self.now)
+        self.assertEqual(LeaderboardRollup.objects.filter(window=LeaderboardRollup.DAY).count(), 1)
+        self.assertEqual(self._board(LeaderboardRollup.DAY), expected)
+        self.assertEqual(self._board(LeaderboardRollup.WEEK)[0], ("u0", 9) if self.now.weekday() else ("u2", 6))
+
+    def test_attempt_started_yesterday_counts_on_the_day_it_completes(self):
+        open_attempt = self._submit(self.users[0], 0, hours_ago=30, in_progress=True)
+        rollup = rollups.take_rollup(self.quiz, LeaderboardRollup.DAY, now=self.now)
+        self.assertEqual(rollup.open_submission_ids, [open_attempt.pk])
+        Submission.objects.filter(pk=open_attempt.pk).update(score=7, in_progress=False, submitted_at=self.now)
+        self.assertEqual(self._board(LeaderboardRollup.DAY), [("u0", 7)])
+        rollups.take_rollup(self.quiz, LeaderboardRollup.DAY, now=self.now)
+        self.assertEqual(self._board(LeaderboardRollup.DAY), [("u0", 7)])
+
+    def test_as_of_reads_history(self):
+        self._submit(self.users[0], 3, hours_ago=5)
+        rollups.take_rollup(self.quiz, LeaderboardRollup.ALL, now=self.now - timedelta(hours=4))
+        self._submit(self.users[1], 8, hours_ago=3)
+        rollups.take_rollup(self.quiz, LeaderboardRollup.ALL, now=self.now - timedelta(hours=2))
+        self._submit(self.users[2], 10, hours_ago=1)
+
+        def as_of(hours_ago):
+            return [e["user"] for e in rollups.leaderboard_as_of(self.quiz, self.now - timedelta(hours=hours_ago))]
+
+        self.assertEqual(as_of(4), ["u0"])
+        self.assertEqual(as_of(2.5), ["u1", "u0"])
+        self.assertEqual(as_of(0), ["u2", "u1", "u0"])
+        self.assertEqual(LeaderboardRollup.objects.filter(window=LeaderboardRollup.ALL).count(), 2)
+
+    def test_command_and_prune(self):
+        self._submit(self.users[0], 2)
+        out = StringIO()
+        call_command("rollup_leaderboards", str(self.quiz.pk), stdout=out)
+        self.assertIn("day: 1 users", out.getvalue())
+        LeaderboardRollup.objects.update(taken_at=self.now - timedelta(days=40))
+        call_command("rollup_leaderboards", "--all", "--windows", "all", "--prune-days", "30", stdout=out)
+        self.assertEqual(
+            list(LeaderboardRollup.objects.values_list("window", flat=True)), [LeaderboardRollup.ALL]
+        )
+
+    def test_rescore_discards_window_rollups(self):
+        self._submit(self.users[0], 2)
+        rollups.take_rollup(self.quiz, LeaderboardRollup.DAY, now=self.now)
+        rollups.discard_rollups(self.quiz)
+        self.assertEqual(list(LeaderboardRollup.objects.values_list("window", flat=True)), [LeaderboardRollup.ALL])
+
+
+def _entry(id, score):
+    return {"id": id, "user": f"u{id}", "score": score, "attempt": 1, "submitted_at": "2026-01-01T00:00:00+00:00"}
+
+
+class LeaderboardProtocolTests(SimpleTestCase):
+    def test_ops_reproduce_the_new_list(self):
+        a, b, c, d = _entry(1, 5), _entry(2, 4), _entry(3, 3), _entry(4, 2)
+        cases = [
+            ([a, b, c], [a, b, c]),
+            ([a, b, c], [b, a, c]),
+            ([a, b, c], [d, a, b]),  # insert at the top pushes c out
+            ([a, b, c], [a, c]),
+            ([a, b, c], [dict(c, score=9), a, b]),  # changed entry jumps up
+            ([], [a, b]),
+            ([a, b], []),
+        ]
+        for old, new in cases:
+            with self.subTest(old=[e["id"] for e in old], new=[e["id"] for e in new]):
+                self.assertEqual(protocol.apply_ops(old, protocol.diff_entries(old, new)), new)
+        ops = protocol.diff_entries([a, b, c], [a, c, b])
+        self.assertEqual(ops, [{"op": "move", "id": 3, "rank": 1}, {"op": "move", "id": 2, "rank": 2}])
+
+    def test_published_frames_chain_by_sequence(self):
+        quiz_id = 9001
+        cache.delete_many([protocol.SNAPSHOT_KEY % quiz_id, protocol.SEQ_KEY % quiz_id])
+        entries = [_entry(i, 10 - i) for i in range(10)]
+        with mock.patch.object(protocol, "get_leaderboard", side_effect=lambda quiz_id, fresh=False: list(entries)):
+            snapshot = protocol.current_message(quiz_id)
+            self.assertIsNone(protocol.publish_message(quiz_id))  # nothing changed, nothing sent
+
+            entries[9] = dict(entries[9], score=20)
+            entries.insert(0, entries.pop())
+            delta = protocol.publish_message(quiz_id)
+            self.assertEqual(delta["type"], "leaderboard.delta")
+            self.assertEqual(delta["base"], snapshot["seq"])
+            self.assertEqual(protocol.apply_ops(snapshot["entries"], delta["ops"]), entries)
+            self.assertEqual(protocol.current_message(quiz_id)["seq"], delta["seq"])
+
+            entries[:] = [_entry(i, i) for i in range(20, 30)]  # everything changed: snapshot is smaller
+            self.assertEqual(protocol.publish_message(quiz_id)["type"], "leaderboard")
+
+
+class SocketTestCase(TransactionTestCase):
+    """Websocket tests: consumers close old connections around each sync call,
+    so they need database access, and must not see timers or snapshots left
+    behind by earlier tests."""
+
+    def setUp(self):
+        self._reset()
+
+    def tearDown(self):
+        self._reset()
+
+    def _reset(self):
+        channels.reset_scheduler()
+        cache.clear()
+
+
+class LeaderboardFanOutTests(SocketTestCase):
+    def test_frame_built_once_per_broadcast_and_resync(self):
+        app = URLRouter(websocket_urlpatterns)
+        quiz_id = 7
+        cache.delete_many([protocol.SNAPSHOT_KEY % quiz_id, protocol.SEQ_KEY % quiz_id])
+        before = [_entry(i, 10 - i) for i in range(1, 6)]
+        after = [_entry(99, 20)] + before
+        boards = iter([before, after])
+
+        async def scenario():
+            sockets = [WebsocketCommunicator(app, f"/ws/quizzes/{quiz_id}/leaderboard/") for _ in range(3)]
+            snapshots = []
+            for socket in sockets:
+                connected, _ = await socket.connect()
+                self.assertTrue(connected)
+                snapshots.append(await socket.receive_json_from())
+            await sync_to_async(broadcast_leaderboard)(quiz_id)
+            deltas = [await socket.receive_json_from() for socket in sockets]
+            await sockets[0].send_json_to({"type": "resync"})
+            resynced = await sockets[0].receive_json_from()
+            for socket in sockets:
+                await socket.disconnect()
+            return snapshots, deltas, resynced
+
+        with mock.patch.object(protocol, "get_leaderboard", side_effect=lambda quiz_id, fresh=False: next(boards)) as build:
+            snapshots, deltas, resynced = async_to_sync(scenario)()
+        self.assertEqual(build.call_count, 2)  # first connect + one broadcast
+        self.assertEqual(len({json.dumps(d) for d in deltas}), 1)
+        delta = deltas[0]
+        self.assertEqual(delta["base"], snapshots[0]["seq"])
+        self.assertEqual(protocol.apply_ops(snapshots[0]["entries"], delta["ops"]), after)
+        self.assertEqual(resynced, {"type": "leaderboard", "seq": delta["seq"], "entries": after})
+
+
+class WireCodecTests(SocketTestCase):
+    def test_round_trip(self):
+        message = {"type": "leaderboard", "seq": 3, "entries": [_entry(1, 5)]}
+        for name, codec in codecs.CODECS.items():
+            with self.subTest(codec=name):
+                self.assertEqual(codec.decode(codec.encode(message)), message)
+
+    def test_msgpack_subprotocol_gets_binary_frames(self):
+        codec = codecs.CODECS["msgpack+deflate"]
+        app = URLRouter(websocket_urlpatterns)
+        quiz_id = 8
+        cache.delete_many([protocol.SNAPSHOT_KEY % quiz_id, protocol.SEQ_KEY % quiz_id])
+        boards = iter([[_entry(1, 1)], [_entry(1, 2)]])
+
+        async def scenario():
+            binary = WebsocketCommunicator(app, f"/ws/quizzes/{quiz_id}/leaderboard/", subprotocols=[codec.subprotocol])
+            text = WebsocketCommunicator(app, f"/ws/quizzes/{quiz_id}/leaderboard/")
+            connected, subprotocol = await binary.connect()
+            self.assertEqual(subprotocol, codec.subprotocol)
+            await text.connect()
+            snapshot = codec.decode(await binary.receive_from())
+            await text.receive_json_from()
+            await sync_to_async(broadcast_leaderboard)(quiz_id)
+            update = await binary.receive_output()
+            text_update = await text.receive_json_from()
+            await binary.send_to(bytes_data=codec.encode({"type": "resync"}))
+            resynced = codec.decode(await binary.receive_from())
+            await binary.disconnect()
+            await text.disconnect()
+            return snapshot, update, text_update, resynced
+
+        with mock.patch.object(protocol, "get_leaderboard", side_effect=lambda quiz_id, fresh=False: next(boards)):
+            snapshot, update, text_update, resynced = async_to_sync(scenario)()
+        self.assertEqual(snapshot["entries"], [_entry(1, 1)])
+        self.assertIn("bytes", update)
+        self.assertEqual(codec.decode(update["bytes"]), text_update)
+        self.assertEqual(resynced["seq"], text_update["seq"])
@@ -1,33 +1,50 @@
-from django.core.cache import cache
-
-CACHE_KEY = "leaderboard:%s"
-CACHE_TIMEOUT = 30  # seconds
-
-
-def get_leaderboard(quiz_id: int):
-    # Lazy import to avoid AppRegistryNotReady during ASGI import chain
-    from submissions.models import Submission  # noqa
-    key = CACHE_KEY % quiz_id
-    data = cache.get(key)
-    if data is not None:
-        return data
-    rows = (
-        Submission.objects.filter(quiz_id=quiz_id, in_progress=False)
-        .select_related("user")
-        .order_by("-score", "submitted_at")[:10]
-    )
-    data = [
-        {
-            "user": s.user.username,
-            "score": s.score,
-            "attempt": s.attempt_number,
-            "submitted_at": s.submitted_at.isoformat(),
-        }
-        for s in rows
-    ]
-    cache.set(key, data, CACHE_TIMEOUT)
-    return data
+from .leaderboard import CACHE_KEY, CACHE_TIMEOUT, PAGE_SIZE, get_backend, page  # noqa: F401
+
+
+def get_leaderboard(quiz_id: int, fresh: bool = False):
+    """Top entries of the quiz; ``fresh`` skips any stale cached snapshot."""
+    return get_backend().top(quiz_id, fresh=fresh)
+
+
+def get_rank(quiz_id: int, standing_id: int):
+    """1-based leaderboard position of a standing (``None`` if not ranked)."""
+    return get_backend().rank(quiz_id, standing_id)
+
+
+def get_leaderboard_page(quiz_id: int, after=None, limit: int = PAGE_SIZE):
+    """Keyset-paginated slice of the full leaderboard (see :func:`realtime.leaderboard.page`)."""
+    return page(quiz_id, after, limit)
+
+
+def get_user_standing(quiz_id: int, user_id: int):
+    """The user's leaderboard position and standing on a quiz, or ``None`` before a completed attempt."""
+    from submissions.standings import get_standing
+
+    standing = get_standing(quiz_id, user_id)
+    if standing is None:
+        return None
+    backend = get_backend()
+    rank = backend.rank(quiz_id, standing.pk)
+    if rank is None:
+        return None
+    return {
+        "rank": rank,
+        "approximate": backend.exact_rank_limit is not None and rank > backend.exact_rank_limit,
+        "id": standing.pk,
+        "score": standing.score,
+        "attempts": standing.attempts,
+        "submission_id": standing.submission_id,
+    }
+
+
+def refresh_leaderboards(quiz_ids, standing_ids=(), rebuild_quiz_ids=()):
+    """Push committed standing changes into the leaderboard backend."""
+    get_backend().refresh(quiz_ids, standing_ids, rebuild_quiz_ids)
 
 
 def invalidate_leaderboard(quiz_id: int):
-    cache.delete(CACHE_KEY % quiz_id)
+    get_backend().invalidate(quiz_id)
+
+
+def reset_leaderboard(quiz_id: int):
+    get_backend().reset(quiz_id)
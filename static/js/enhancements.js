@@ -72,12 +72,27 @@ $(function() {
       sock.onopen = function(){ console.log('[LB] websocket connected'); };
       sock.onerror = function(e){ console.error('[LB] websocket error', e); };
       sock.onclose = function(){ console.warn('[LB] websocket closed'); };
+      // Snapshot on connect, then deltas chained by sequence number
+      let lbSeq = null;
+      let lbEntries = [];
       sock.onmessage = function(ev){
         try {
           const data = JSON.parse(ev.data);
           if(data.type==='leaderboard'){
-            renderLeaderboard(data.entries || []);
-            flashLeaderboard(data.entries || []);
+            lbSeq = data.seq;
+            lbEntries = data.entries || [];
+            renderLeaderboard(lbEntries);
+            flashLeaderboard(lbEntries);
+          } else if(data.type==='leaderboard.delta'){
+            if(data.base !== lbSeq){
+              // Missed an update: ask for a fresh snapshot
+              sock.send(JSON.stringify({type: 'resync'}));
+              return;
+            }
+            lbSeq = data.seq;
+            lbEntries = applyLeaderboardOps(lbEntries, data.ops || []);
+            renderLeaderboard(lbEntries);
+            flashLeaderboard((data.ops || []).filter(op => op.op === 'upsert').map(op => op.entry));
           }
         } catch(err){ console.error('[LB] message parse error', err); }
       };
@@ -100,6 +115,25 @@ $(function() {
     return d.toLocaleDateString();
   }
 
+  // Mirrors realtime.protocol.apply_ops: untouched entries keep their rank
+  function applyLeaderboardOps(entries, ops){
+    const byId = {};
+    entries.forEach(e => { byId[e.id] = e; });
+    const skip = new Set();
+    const placed = {};
+    ops.forEach(op => {
+      if(op.op === 'remove'){ skip.add(op.id); }
+      else if(op.op === 'upsert'){ placed[op.rank] = op.entry; skip.add(op.entry.id); }
+      else if(op.op === 'move'){ placed[op.rank] = byId[op.id]; skip.add(op.id); }
+    });
+    const kept = [];
+    entries.forEach((e, i) => { if(!skip.has(e.id)) kept.push([i, e]); });
+    const result = new Array(kept.length + Object.keys(placed).length);
+    kept.forEach(([i, e]) => { result[i] = e; });
+    Object.keys(placed).forEach(rank => { result[rank] = placed[rank]; });
+    return result;
+  }
+
   function renderLeaderboard(entries){
     const tbody = $('#leaderboard-table tbody');
     tbody.empty();
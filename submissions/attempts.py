@@ -0,0 +1,124 @@
+"""Attempt lifecycle: start -> in progress -> submit.
+
+Attempt numbers are allocated with a single ``INSERT ... SELECT`` that reads
+the user's current attempt count and highest number and enforces the quiz's
+attempt limit in the same statement. Two concurrent starts can still pick
+the same number, or both open an attempt; the loser hits the ``(quiz, user,
+attempt_number)`` unique constraint or the one-open-attempt partial unique
+constraint, its savepoint rolls back and it retries, resuming the winner's
+open attempt if there is one. Nothing takes a table-level lock.
+"""
+
+from __future__ import annotations
+
+from typing import Optional
+
+from django.core.exceptions import PermissionDenied
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from core.navcounters import invalidate_submissions
+from .models import Submission
+from .entitlements import invalidate_user
+from .participants import record_participant
+from .services import touch_user_submissions
+
+MAX_ALLOCATION_RETRIES = 5
+
+
+class NoAttemptsLeft(PermissionDenied):
+    """The user has used every attempt the quiz allows."""
+
+
+def attempt_limit(quiz) -> Optional[int]:
+    """Maximum attempts per user for ``quiz`` (``None`` means unlimited)."""
+    if not quiz.allow_multiple_attempts:
+        return 1
+    return quiz.max_attempts
+
+
+def _allocate_sql(limited: bool) -> str:
+    table = connection.ops.quote_name(Submission._meta.db_table)
+    col = {f.name: connection.ops.quote_name(f.column) for f in Submission._meta.concrete_fields}
+    sql = (
+        f"INSERT INTO {table} ({col['quiz']}, {col['user']}, {col['score']}, {col['attempt_number']}, "
+        f"{col['in_progress']}, {col['submitted_at']}) "
+        f"SELECT %s, %s, 0, s.next_number, %s, %s FROM ("
+        f"SELECT COALESCE(MAX({col['attempt_number']}), 0) + 1 AS next_number, COUNT(*) AS used "
+        f"FROM {table} WHERE {col['quiz']} = %s AND {col['user']} = %s) s"
+    )
+    if limited:
+        sql += " WHERE s.used < %s"
+    if connection.features.can_return_columns_from_insert:
+        sql += f" RETURNING {col['id']}, {col['attempt_number']}"
+    return sql
+
+
+def _insert_next_attempt(quiz, user, limit: Optional[int], now):
+    """Run one allocation round trip; returns ``(id, attempt_number)`` or ``None`` if over the limit."""
+    submitted_at = Submission._meta.get_field("submitted_at").get_db_prep_value(
+        now, connection
+    )
+    params = [quiz.pk, user.pk, True, submitted_at, quiz.pk, user.pk]
+    if limit is not None:
+        params.append(limit)
+    with connection.cursor() as cursor:
+        cursor.execute(_allocate_sql(limit is not None), params)
+        if connection.features.can_return_columns_from_insert:
+            return cursor.fetchone()
+        inserted = cursor.rowcount
+    if not inserted:
+        return None
+    # Backends without RETURNING: the row we just inserted is the newest open one
+    return (
+        Submission.objects.filter(quiz=quiz, user=user, in_progress=True)
+        .order_by("-attempt_number").values_list("pk", "attempt_number").first()
+    )
+
+
+def _open_attempt(quiz, user) -> Optional[Submission]:
+    return Submission.objects.filter(quiz=quiz, user=user, in_progress=True).first()
+
+
+def start_attempt(quiz, user) -> Submission:
+    """Return the user's open attempt, or allocate the next attempt number.
+
+    Raises :class:`NoAttemptsLeft` when the quiz's attempt limit is reached.
+    """
+    limit = attempt_limit(quiz)
+    now = timezone.now()
+    for _ in range(MAX_ALLOCATION_RETRIES):
+        open_attempt = _open_attempt(quiz, user)
+        if open_attempt is not None:
+            open_attempt.quiz = quiz
+            return open_attempt
+        try:
+            with transaction.atomic():
+                row = _insert_next_attempt(quiz, user, limit, now)
+        except IntegrityError:
+            # Lost the race: resume the winner's open attempt, or try the next number
+            continue
+        if row is None:
+            raise NoAttemptsLeft("No attempts left")
+        pk, number = row
+        # Raw INSERT: no post_save, so do what the submission signals would here
+        invalidate_user(quiz.pk, user.pk)
+        touch_user_submissions([user.pk])
+        invalidate_submissions(user.pk)
+        record_participant(quiz.pk, user.pk)
+        submission = Submission(
+            pk=pk, quiz=quiz, user=user, attempt_number=number, in_progress=True, score=0, submitted_at=now
+        )
+        submission._state.adding = False
+        submission._state.db = connection.alias
+        return submission
+    raise IntegrityError(f"Could not allocate an attempt number after {MAX_ALLOCATION_RETRIES} tries")
+
+
+def finish_attempt(submission: Submission) -> None:
+    """Complete the attempt; ``submitted_at`` moves from its start to now."""
+    now = timezone.now()
+    Submission.objects.filter(pk=submission.pk).update(in_progress=False, submitted_at=now)
+    submission.in_progress = False
+    submission.submitted_at = now
+    invalidate_user(submission.quiz_id, submission.user_id)
@@ -0,0 +1,182 @@
+"""Transaction-scoped coalescing of score and leaderboard work.
+
+Writes that change a score *mark* the submission as scored (and its quiz
+dirty); writes that can't be applied to a score incrementally (edited
+attempts) mark the submission for recompute. The dirty set is flushed once
+per transaction via ``transaction.on_commit``: each submission is recomputed
+once, the standings of the users involved are re-derived, the changed
+standings are pushed into the leaderboard backend and each quiz is
+broadcast once, no matter how many attempts were written. Whole-quiz
+rescores are only queued here (see :mod:`submissions.rescoring`). Outside a transaction ``on_commit`` runs immediately, so plain
+autocommit saves keep their old behaviour.
+
+``coalesced()`` widens the scope to an arbitrary block (a request, a bulk
+import); the flush then happens when the outermost block exits.
+"""
+
+from __future__ import annotations
+
+import threading
+import weakref
+from contextlib import contextmanager
+
+from django.db import transaction
+
+try:
+    from realtime.utils import refresh_leaderboards
+except Exception:
+    def refresh_leaderboards(quiz_ids, standing_ids=(), rebuild_quiz_ids=()):
+        return None
+
+try:
+    from core.channels import schedule_leaderboard_broadcast
+except Exception:  # pragma: no cover - placeholder if not yet implemented
+    def schedule_leaderboard_broadcast(quiz_id):
+        return None
+
+
+class DirtySet:
+    """Per-thread record of submissions/quizzes touched since the last flush."""
+
+    def __init__(self):
+        self.submissions = set()
+        self.scored = set()
+        self.standings = set()  # (quiz_id, user_id) pairs whose submissions went away
+        self.quizzes = set()
+        self.rescores = {}  # quiz_id -> regrade attempts?
+        self.depth = 0
+        self.callback = None  # weak reference to the pending on_commit callback
+
+    def __bool__(self):
+        return bool(self.submissions or self.scored or self.standings or self.quizzes or self.rescores)
+
+    def take(self):
+        taken = self.submissions, self.scored, self.standings, self.quizzes, self.rescores
+        self.submissions, self.scored, self.standings, self.quizzes, self.rescores = set(), set(), set(), set(), {}
+        self.callback = None
+        return taken
+
+
+_local = threading.local()
+
+
+def _state() -> DirtySet:
+    state = getattr(_local, "dirty", None)
+    if state is None:
+        state = _local.dirty = DirtySet()
+    return state
+
+
+def _is_scheduled(state: DirtySet) -> bool:
+    if state.callback is None:
+        return False
+    if state.callback() is not None:
+        return True
+    # Only the connection's commit hooks hold the callback, and a rollback
+    # (of the transaction or of the savepoint it was registered in) drops
+    # them: whatever was marked belongs to work that never committed.
+    state.take()
+    return False
+
+
+def _schedule(state: DirtySet) -> None:
+    if state.depth or _is_scheduled(state):
+        return
+
+    def callback():
+        state.callback = None
+        flush()
+
+    state.callback = weakref.ref(callback)
+    transaction.on_commit(callback)
+
+
+def mark_dirty(submission_ids=(), quiz_ids=(), rescore_quiz_ids=(), regrade=False,
+               scored_submission_ids=(), standing_pairs=()) -> None:
+    """Record touched submissions/quizzes; bulk writers call this explicitly.
+
+    ``submission_ids`` need a full recompute; ``scored_submission_ids``
+    already carry their new score (or completion) and only need their
+    standing and the leaderboard updated. ``standing_pairs`` are
+    ``(quiz_id, user_id)`` standings to re-derive whose submissions can't be
+    looked up any more (deletions).
+    """
+    state = _state()
+    if state.callback is not None and not state.depth:
+        _is_scheduled(state)
+    state.submissions.update(submission_ids)
+    state.scored.update(scored_submission_ids)
+    state.standings.update(standing_pairs)
+    state.quizzes.update(quiz_ids)
+    for quiz_id in rescore_quiz_ids:
+        state.rescores[quiz_id] = state.rescores.get(quiz_id, False) or regrade
+    if state:
+        _schedule(state)
+
+
+def mark_submission(submission) -> None:
+    mark_dirty(submission_ids=[submission.pk], quiz_ids=[submission.quiz_id])
+
+
+def mark_scored(submission) -> None:
+    mark_dirty(scored_submission_ids=[submission.pk], quiz_ids=[submission.quiz_id])
+
+
+def mark_quiz(quiz_id: int) -> None:
+    mark_dirty(quiz_ids=[quiz_id])
+
+
+def mark_rescore(quiz_id: int, regrade: bool = False) -> None:
+    """Rescore the whole quiz on commit (policy change, or answer key change with ``regrade``)."""
+    mark_dirty(rescore_quiz_ids=[quiz_id], regrade=regrade)
+
+
+@contextmanager
+def coalesced():
+    """Defer flushing until the outermost ``coalesced()`` block exits."""
+    state = _state()
+    state.depth += 1
+    try:
+        yield state
+    finally:
+        state.depth -= 1
+        if not state.depth and state:
+            _schedule(state)
+
+
+def flush() -> None:
+    """Queue dirty quizzes' rescores, recompute each dirty submission once, then refresh each dirty quiz once."""
+    from .models import Submission
+    from .services import recompute_score, touch_user_submissions
+    from .rescoring import queue_rescores
+    from .percentiles import refresh_score_sketches
+    from .standings import update_standings
+
+    submission_ids, scored_ids, pairs, quiz_ids, rescores = _state().take()
+    if rescores:
+        queue_rescores(rescores)
+    if submission_ids:
+        for submission in Submission.objects.filter(pk__in=submission_ids).select_related("quiz"):
+            recompute_score(submission)
+            quiz_ids.add(submission.quiz_id)
+            scored_ids.add(submission.pk)
+    if scored_ids:
+        pairs.update(Submission.objects.filter(pk__in=scored_ids).values_list("quiz_id", "user_id"))
+    standing_ids = update_standings(pairs)
+    # Scores moved under these users' submission lists
+    touch_user_submissions({user_id for quiz_id, user_id in pairs}, on_commit=False)  # the flush runs on commit
+    refresh_leaderboards(quiz_ids, standing_ids)
+    refresh_score_sketches(quiz_ids)
+    for quiz_id in sorted(quiz_ids):
+        schedule_leaderboard_broadcast(quiz_id)
+
+
+class CoalescedScoringMiddleware:
+    """Scope the dirty set to the request so N attempt saves flush once."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with coalesced():
+            return self.get_response(request)
@@ -0,0 +1,92 @@
+"""Cached per-(user, quiz) attempt entitlements.
+
+An :class:`Entitlement` is the quiz creator, the attempt limit, the
+number of attempts the user has used and whether one of them is still open.
+It backs the ``/start/`` guard and
+:func:`~submissions.services.remaining_attempts`, so a warm start costs no
+database queries.
+
+Cache keys embed two generations (see :mod:`core.generations`), one per
+quiz (bumped on quiz save or delete) and one per (quiz, user) (bumped when a
+submission is created or deleted, or an open attempt is finished). Bumping
+a generation orphans every entry built from older data, so a worker that
+races a write can only ever store under a key nobody reads again.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+
+from core import generations
+
+UNLIMITED = 999_999
+
+QUIZ_GENERATION = "entitlement:%s"
+USER_GENERATION = "entitlement:%s:%s"
+ENTRY_KEY = "entitlement:%s:%s:%s.%s"
+
+
+@dataclass(frozen=True)
+class Entitlement:
+    creator_id: int
+    limit: Optional[int]
+    used: int
+    open_attempt: bool = False
+
+    @property
+    def remaining(self) -> int:
+        if self.limit is None:
+            return UNLIMITED
+        return max(0, self.limit - self.used)
+
+    @property
+    def can_start(self) -> bool:
+        """Whether ``/start/`` may proceed: resuming the open attempt needs no attempt left."""
+        return self.open_attempt or self.remaining > 0
+
+
+def invalidate_quiz(quiz_id) -> None:
+    generations.bump(QUIZ_GENERATION % quiz_id)
+
+
+def invalidate_user(quiz_id, user_id) -> None:
+    generations.bump(USER_GENERATION % (quiz_id, user_id))
+
+
+def _load(quiz_id, user_id) -> Optional[Entitlement]:
+    from quizzes.models import Quiz  # local import to avoid circulars
+    from .attempts import attempt_limit
+    from .models import Submission
+
+    quiz = Quiz.objects.only("creator_id", "allow_multiple_attempts", "max_attempts").filter(pk=quiz_id).first()
+    if quiz is None:
+        return None
+    counts = Submission.objects.filter(quiz_id=quiz_id, user_id=user_id).aggregate(
+        used=Count("pk"), open=Count("pk", filter=Q(in_progress=True))
+    )
+    return Entitlement(
+        creator_id=quiz.creator_id, limit=attempt_limit(quiz), used=counts["used"], open_attempt=counts["open"] > 0
+    )
+
+
+def get_entitlement(user_id, quiz_id) -> Optional[Entitlement]:
+    """Entitlement of ``user_id`` on ``quiz_id``, or ``None`` if the quiz doesn't exist."""
+    quiz_generation, user_generation = generations.current_many(
+        QUIZ_GENERATION % quiz_id, USER_GENERATION % (quiz_id, user_id)
+    )
+    key = ENTRY_KEY % (quiz_id, user_id, quiz_generation, user_generation)
+    cached = cache.get(key)
+    if cached is not None:
+        return Entitlement(*cached)
+    entitlement = _load(quiz_id, user_id)
+    if entitlement is not None:
+        timeout = getattr(settings, "ENTITLEMENT_CACHE_TIMEOUT", 3600)
+        cache.set(
+            key, (entitlement.creator_id, entitlement.limit, entitlement.used, entitlement.open_attempt), timeout
+        )
+    return entitlement
@@ -0,0 +1,112 @@
+"""Set-based grading for quiz submissions.
+
+The answer key for a quiz is loaded once, the whole payload is graded in
+memory and all attempts are written with a single ``bulk_create``. Both the
+web take view and the API submit action go through :func:`submit_answers`.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Mapping, Optional
+
+from django.db import transaction
+
+from .models import Submission, QuestionAttempt
+from .services import apply_attempts
+from .coalesce import mark_scored
+from .attempts import start_attempt, finish_attempt
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """Question ids of a quiz (in display order) and its correct (question, answer) pairs."""
+
+    question_ids: tuple
+    correct: frozenset
+
+    def is_correct(self, question_id: int, answer_id: Optional[int]) -> bool:
+        return bool(answer_id) and (question_id, answer_id) in self.correct
+
+
+def load_answer_key(quiz) -> AnswerKey:
+    """Load the answer key for ``quiz`` in two flat queries."""
+    from quizzes.models import Question, Answer  # local import to avoid circulars
+
+    question_ids = tuple(
+        Question.objects.filter(quiz=quiz).order_by("id").values_list("id", flat=True)
+    )
+    correct = frozenset(
+        Answer.objects.filter(question__quiz=quiz, is_correct=True).values_list("question_id", "id")
+    )
+    return AnswerKey(question_ids=question_ids, correct=correct)
+
+
+def normalize_answers(answers: Mapping) -> dict:
+    """Coerce a ``{question_id: answer_id}`` mapping to ints; bad answer ids become ``None``."""
+    normalized = {}
+    for qid, aid in answers.items():
+        try:
+            qid = int(qid)
+        except (TypeError, ValueError):
+            continue
+        try:
+            aid = int(aid) if aid not in (None, "") else None
+        except (TypeError, ValueError):
+            aid = None
+        normalized[qid] = aid
+    return normalized
+
+
+def build_attempts(submission: Submission, answers: Mapping, key: AnswerKey, *,
+                   include_unanswered: bool = False) -> list:
+    """Grade ``answers`` against ``key`` into unsaved :class:`QuestionAttempt` rows.
+
+    Questions missing from ``answers`` are skipped unless ``include_unanswered``
+    is set, in which case they are recorded as unanswered (incorrect) attempts.
+    """
+    answers = normalize_answers(answers)
+    attempts = []
+    for qid in key.question_ids:
+        if qid not in answers and not include_unanswered:
+            continue
+        selected_id = answers.get(qid)
+        attempts.append(QuestionAttempt(
+            submission=submission,
+            question_id=qid,
+            selected_answer_id=selected_id,
+            is_correct=key.is_correct(qid, selected_id),
+            attempt_number=1,
+        ))
+    return attempts
+
+
+def grade_submission(submission: Submission, answers: Mapping, *, key: Optional[AnswerKey] = None,
+                     include_unanswered: bool = False) -> list:
+    """Grade ``answers`` against the quiz key and bulk-insert the attempts.
+
+    The submission score is updated incrementally. Returns the created
+    :class:`QuestionAttempt` instances.
+    """
+    if key is None:
+        key = load_answer_key(submission.quiz)
+    attempts = build_attempts(submission, answers, key, include_unanswered=include_unanswered)
+    # bulk_create bypasses post_save, so the attempts are folded into the score here
+    QuestionAttempt.objects.bulk_create(attempts)
+    apply_attempts(submission, attempts)
+    return attempts
+
+
+def submit_answers(quiz, user, answers: Mapping, *, include_unanswered: bool = False) -> Submission:
+    """Grade ``answers`` into the user's open attempt (starting one if needed) and complete it.
+
+    Raises :class:`~submissions.attempts.NoAttemptsLeft` when the quiz's
+    attempt limit is used up.
+    """
+    with transaction.atomic():
+        submission = start_attempt(quiz, user)
+        grade_submission(submission, answers, include_unanswered=include_unanswered)
+        finish_attempt(submission)
+        # The score is already current; only the leaderboard refresh is deferred.
+        mark_scored(submission)
+    return submission
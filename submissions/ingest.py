@@ -0,0 +1,251 @@
+"""Write-behind submission ingestion.
+
+With ``SUBMISSION_INGEST_MODE = "queue"`` the submit endpoints only validate
+and enqueue the payload as a :class:`QueuedSubmission` row and hand back its
+token as a receipt. The ``drain_submissions`` worker claims queued rows in
+batches and grades a whole batch per transaction, bulk-inserting its
+attempts (see :func:`process_batch`). Clients poll the receipt or listen
+on ``ws/receipts/<token>/``.
+
+The table is the queue (and the status store). ``SUBMISSION_QUEUE_BACKEND =
+"redis"`` adds a Redis list used only to wake idle workers immediately
+instead of polling.
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Submission, QuestionAttempt, QueuedSubmission
+from .coalesce import mark_dirty
+from .entitlements import invalidate_user
+from .attempts import start_attempt
+from .grading import build_attempts, load_answer_key, normalize_answers
+from .services import apply_attempts
+
+logger = logging.getLogger(__name__)
+
+RECEIPT_GROUP = "submission_receipt_%s"
+
+
+def queue_mode_enabled() -> bool:
+    return getattr(settings, "SUBMISSION_INGEST_MODE", "inline") == "queue"
+
+
+class DatabaseQueue:
+    """Workers poll the ``QueuedSubmission`` table."""
+
+    def __init__(self, poll_interval: float = 0.5):
+        self.poll_interval = poll_interval
+
+    def notify(self, entry: QueuedSubmission) -> None:
+        return None
+
+    def wait(self, timeout: float) -> None:
+        time.sleep(min(timeout, self.poll_interval))
+
+
+class RedisQueue(DatabaseQueue):
+    """Same table, plus a Redis list that wakes blocked workers on enqueue."""
+
+    key = "quizzy:ingest:wakeup"
+
+    def __init__(self, url: str, poll_interval: float = 0.5):
+        import redis  # type: ignore
+
+        super().__init__(poll_interval)
+        self.client = redis.Redis.from_url(url, socket_connect_timeout=0.2)
+
+    def notify(self, entry: QueuedSubmission) -> None:
+        try:
+            self.client.rpush(self.key, entry.pk)
+        except Exception:  # pragma: no cover - workers still poll
+            logger.warning("ingest wake-up push failed", exc_info=True)
+
+    def wait(self, timeout: float) -> None:
+        try:
+            if self.client.blpop([self.key], timeout=max(1, int(timeout))):
+                # One wake-up is enough: the worker claims a whole batch
+                self.client.delete(self.key)
+        except Exception:  # pragma: no cover - fall back to polling
+            super().wait(timeout)
+
+
+_queue = None
+
+
+def get_queue() -> DatabaseQueue:
+    global _queue
+    if _queue is None:
+        poll = getattr(settings, "SUBMISSION_QUEUE_POLL_INTERVAL", 0.5)
+        if getattr(settings, "SUBMISSION_QUEUE_BACKEND", "database") == "redis":
+            try:
+                _queue = RedisQueue(settings.REDIS_URL, poll_interval=poll)
+                _queue.client.ping()
+            except Exception:
+                logger.warning("Redis ingest queue unavailable; polling the database instead")
+                _queue = DatabaseQueue(poll_interval=poll)
+        else:
+            _queue = DatabaseQueue(poll_interval=poll)
+    return _queue
+
+
+def enqueue(quiz, user, answers, *, include_unanswered: bool = False) -> QueuedSubmission:
+    """Persist a submit request for the worker; one INSERT on the request path."""
+    entry = QueuedSubmission.objects.create(
+        quiz=quiz,
+        user=user,
+        answers={str(qid): aid for qid, aid in normalize_answers(answers).items()},
+        include_unanswered=include_unanswered,
+    )
+    transaction.on_commit(lambda: get_queue().notify(entry))
+    return entry
+
+
+def receipt_payload(entry: QueuedSubmission, submission: Submission = None) -> dict:
+    submission = submission if submission is not None else entry.submission
+    return {
+        "token": str(entry.token),
+        "status": entry.status,
+        "quiz": entry.quiz_id,
+        "submission": entry.submission_id,
+        "score": submission.score if submission is not None and entry.status == QueuedSubmission.DONE else None,
+        "error": entry.error or None,
+    }
+
+
+def _rounds(entries) -> list:
+    """Split ``entries`` into rounds holding at most one entry per (user, quiz).
+
+    The n-th entry of a user on a quiz goes into round n, so each round's
+    attempts are finished before the user's next entry starts one.
+    """
+    rounds, seen = [], {}
+    for entry in entries:
+        n = seen[entry.user_id, entry.quiz_id] = seen.get((entry.user_id, entry.quiz_id), -1) + 1
+        if n == len(rounds):
+            rounds.append([])
+        rounds[n].append(entry)
+    return rounds
+
+
+def _fail(entry, exc) -> None:
+    logger.exception("queued submission %s failed", entry.token)
+    entry.status = QueuedSubmission.FAILED
+    entry.error = str(exc) or exc.__class__.__name__
+
+
+def _grade(entries, keys) -> list:
+    """Start, grade and finish one attempt per entry; returns ``(entry, submission)`` pairs.
+
+    Starting and grading run in a savepoint per entry, so a bad payload only
+    fails its own entry. The attempts of all entries are then inserted with a
+    single ``bulk_create``; an error from here on propagates to the caller.
+    """
+    graded = []
+    for entry in entries:
+        try:
+            with transaction.atomic():
+                if entry.quiz_id not in keys:
+                    keys[entry.quiz_id] = load_answer_key(entry.quiz)
+                submission = start_attempt(entry.quiz, entry.user)
+                attempts = build_attempts(
+                    submission, entry.answers, keys[entry.quiz_id], include_unanswered=entry.include_unanswered
+                )
+        except Exception as exc:
+            _fail(entry, exc)
+            continue
+        graded.append((entry, submission, attempts))
+
+    QuestionAttempt.objects.bulk_create([a for _, _, attempts in graded for a in attempts])
+    now = timezone.now()
+    for entry, submission, attempts in graded:
+        apply_attempts(submission, attempts)
+        submission.in_progress = False
+        submission.submitted_at = now
+    Submission.objects.filter(pk__in={s.pk for _, s, _ in graded}).update(in_progress=False, submitted_at=now)
+    for _, submission, _ in graded:
+        invalidate_user(submission.quiz_id, submission.user_id)
+    return [(entry, submission) for entry, submission, _ in graded]
+
+
+def process_batch(entries) -> None:
+    """Grade a batch of queued submissions; must run inside a transaction.
+
+    Entries are graded in rounds (see :func:`_rounds`), one ``bulk_create``
+    per round. A round that fails as a whole rolls back to its savepoint and
+    is replayed one entry at a time, so only the entry at fault is marked
+    failed and the rest of the batch still commits.
+    """
+    keys = {}
+    graded = []
+    for batch in _rounds(entries):
+        try:
+            with transaction.atomic():
+                done = _grade(batch, keys)
+        except Exception:
+            logger.warning("batch round failed; grading its entries one by one", exc_info=True)
+            done = []
+            for entry in batch:
+                if entry.status == QueuedSubmission.FAILED:
+                    continue
+                try:
+                    with transaction.atomic():
+                        done += _grade([entry], keys)
+                except Exception as exc:
+                    _fail(entry, exc)
+        graded += done
+
+    for entry, submission in graded:
+        entry.submission = submission
+        entry.status = QueuedSubmission.DONE
+    now = timezone.now()
+    for entry in entries:
+        entry.processed_at = now
+    QueuedSubmission.objects.bulk_update(entries, ["status", "submission", "error", "processed_at"])
+    mark_dirty(
+        quiz_ids={entry.quiz_id for entry, _ in graded},
+        scored_submission_ids={submission.pk for _, submission in graded},
+    )
+    payloads = [receipt_payload(entry) for entry in entries]
+    transaction.on_commit(lambda: notify_receipts(payloads))
+
+
+def drain_once(batch_size: int = 200) -> list:
+    """Claim up to ``batch_size`` queued rows and process them in one transaction.
+
+    Rows are claimed with ``SKIP LOCKED`` where supported, so several workers
+    can drain concurrently; a crashed worker's claim rolls back with its
+    transaction.
+    """
+    with transaction.atomic():
+        entries = list(
+            QueuedSubmission.objects.select_for_update(skip_locked=True, of=("self",))
+            .filter(status=QueuedSubmission.QUEUED)
+            .select_related("quiz", "user")
+            .order_by("id")[:batch_size]
+        )
+        if entries:
+            process_batch(entries)
+    return entries
+
+
+def notify_receipts(payloads) -> None:
+    from channels.layers import get_channel_layer
+
+    channel_layer = get_channel_layer()
+    if not channel_layer:
+        return
+    for payload in payloads:
+        try:
+            async_to_sync(channel_layer.group_send)(
+                RECEIPT_GROUP % payload["token"], {"type": "receipt.update", "receipt": payload}
+            )
+        except Exception:  # pragma: no cover - polling still works
+            logger.warning("receipt notification failed for %s", payload["token"], exc_info=True)
@@ -0,0 +1,61 @@
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from submissions.rescoring import regrade, AttemptArrays
+from submissions.strategies import get_strategy, group_attempts, sum_by_submission
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the in-memory rescoring kernel only (regrade, grouping, scoring) on synthetic "
+        "attempts. Database reads and writes are not measured."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--attempts", type=int, default=1_200_000, help="Total attempts to generate.")
+        parser.add_argument("--questions", type=int, default=20, help="Questions per quiz.")
+        parser.add_argument("--tries", type=int, default=3, help="Attempts per question.")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = np.random.default_rng(options["seed"])
+        questions, tries = options["questions"], options["tries"]
+        per_submission = questions * tries
+        submissions = max(1, options["attempts"] // per_submission)
+        n = submissions * per_submission
+
+        submission = np.repeat(np.arange(1, submissions + 1, dtype=np.int64), per_submission)
+        question = np.tile(np.repeat(np.arange(1, questions + 1, dtype=np.int64), tries), submissions)
+        attempt_number = np.tile(np.arange(1, tries + 1, dtype=np.int64), submissions * questions)
+        answer = question * 4 + rng.integers(0, 4, n)
+        arrays = AttemptArrays(
+            submission=submission, question=question, attempt_number=attempt_number,
+            answer=answer, correct=np.zeros(n, dtype=bool), id=np.arange(1, n + 1, dtype=np.int64),
+        )
+        correct_pairs = {(q, q * 4) for q in range(1, questions + 1)}
+        self.stdout.write(
+            f"Kernel only, no database I/O: {n:,} attempts, {submissions:,} submissions, "
+            f"{questions} questions x {tries} tries"
+        )
+
+        def timed(label, fn):
+            started = time.perf_counter()
+            value = fn()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"  {label:<10} {elapsed * 1000:9.1f} ms  ({n / elapsed / 1e6:6.1f} M attempts/s)")
+            return value
+
+        arrays.correct = timed("regrade", lambda: regrade(arrays, correct_pairs))
+        groups = timed("group", lambda: group_attempts(
+            arrays.submission, arrays.question, arrays.attempt_number, arrays.correct, presorted=True
+        ))
+        for policy in ("best", "first", "last"):
+            strategy = get_strategy(policy)
+            ids, totals = timed(policy, lambda: sum_by_submission(groups.submission, strategy.score_groups(groups)))
+        shuffled = np.random.default_rng(options["seed"]).permutation(n)
+        timed("unsorted", lambda: get_strategy("last").compute_many(
+            submission[shuffled], question[shuffled], attempt_number[shuffled], arrays.correct[shuffled]
+        ))
+        self.stdout.write(self.style.SUCCESS(f"mean 'last' score: {totals.mean():.2f}"))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from submissions.models import Submission
+from submissions.services import find_score_drift, recompute_score
+
+
+class Command(BaseCommand):
+    help = "Verify incrementally maintained submission scores against a full recompute (optionally repair drift)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--quiz", type=int, action="append", help="Limit to a quiz id (repeatable).")
+        parser.add_argument("--repair", action="store_true", help="Rewrite drifted scores and rebuild their scoring state.")
+
+    def handle(self, *args, **options):
+        submissions = Submission.objects.order_by("pk")
+        if options["quiz"]:
+            submissions = submissions.filter(quiz_id__in=options["quiz"])
+
+        drifted = 0
+        for submission, stored, expected in find_score_drift(submissions):
+            drifted += 1
+            self.stdout.write(
+                f"submission {submission.pk} (quiz {submission.quiz_id}, user {submission.user_id}): "
+                f"stored={stored} expected={expected}"
+            )
+            if options["repair"]:
+                recompute_score(submission)
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("No score drift found."))
+        elif options["repair"]:
+            self.stdout.write(self.style.SUCCESS(f"Repaired {drifted} submission(s)."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{drifted} submission(s) drifted; rerun with --repair to fix."))
@@ -0,0 +1,46 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.channels import flush_leaderboard_broadcasts
+from submissions.ingest import drain_once, get_queue
+
+
+class Command(BaseCommand):
+    help = "Worker for queue ingestion mode: grade queued submissions in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=getattr(settings, "SUBMISSION_QUEUE_BATCH_SIZE", 200))
+        parser.add_argument("--once", action="store_true", help="Drain what is queued now, then exit.")
+        parser.add_argument("--idle-timeout", type=float, default=5.0, help="Max seconds to block while idle.")
+
+    def handle(self, *args, **options):
+        try:
+            self.drain(options)
+        finally:
+            # Leaderboard pushes are debounced on daemon timers that die with the process
+            flush_leaderboard_broadcasts()
+
+    def drain(self, options):
+        queue = get_queue()
+        batch_size = options["batch_size"]
+        total = 0
+        while True:
+            started = time.perf_counter()
+            try:
+                batch = drain_once(batch_size)
+            except Exception as exc:  # keep the worker alive; rows stay queued
+                self.stderr.write(self.style.ERROR(f"batch failed: {exc}"))
+                if options["once"]:
+                    raise
+                queue.wait(options["idle_timeout"])
+                continue
+            if batch:
+                total += len(batch)
+                self.stdout.write(f"processed {len(batch)} submission(s) in {time.perf_counter() - started:.3f}s")
+                continue
+            if options["once"]:
+                break
+            queue.wait(options["idle_timeout"])
+        self.stdout.write(self.style.SUCCESS(f"Drained {total} submission(s)."))
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.channels import flush_leaderboard_broadcasts
+from quizzes.models import Quiz
+from submissions.rescoring import DEFAULT_CHUNK_SIZE, run_pending_rescores, run_rescore
+
+
+class Command(BaseCommand):
+    help = "Bulk-rescore every submission of one or more quizzes under their current scoring policy."
+
+    def add_arguments(self, parser):
+        parser.add_argument("quiz_ids", nargs="*", type=int, help="Quiz ids to rescore.")
+        parser.add_argument("--all", action="store_true", help="Rescore every quiz.")
+        parser.add_argument("--pending", action="store_true", help="Run the rescores queued by quiz edits.")
+        parser.add_argument("--regrade", action="store_true", help="Re-derive attempt correctness from the current answer key first.")
+        parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Submissions per block.")
+
+    def handle(self, *args, **options):
+        if options["pending"]:
+            quizzes = None
+        elif options["all"]:
+            quizzes = Quiz.objects.order_by("pk")
+        elif options["quiz_ids"]:
+            quizzes = Quiz.objects.filter(pk__in=options["quiz_ids"]).order_by("pk")
+        else:
+            raise CommandError("Pass one or more quiz ids, --all or --pending.")
+
+        try:
+            if quizzes is None:
+                started = time.perf_counter()
+                for quiz, result in run_pending_rescores(chunk_size=options["chunk_size"]):
+                    self.report(quiz, result, started)
+                    started = time.perf_counter()
+            else:
+                for quiz in quizzes:
+                    started = time.perf_counter()
+                    result = run_rescore(quiz, regrade_attempts=options["regrade"], chunk_size=options["chunk_size"])
+                    self.report(quiz, result, started)
+        finally:
+            # Leaderboard pushes are debounced on daemon timers that die with the process
+            flush_leaderboard_broadcasts()
+        self.stdout.write(self.style.SUCCESS("Rescore complete."))
+
+    def report(self, quiz, result, started):
+        self.stdout.write(
+            f"quiz {quiz.pk} ({quiz.scoring_policy}): {result.submissions} submissions, "
+            f"{result.attempts} attempts, {result.regraded} regraded, {result.changed} scores changed "
+            f"in {time.perf_counter() - started:.2f}s"
+        )
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:50
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_quiz_scoring_choices'),
+        ('submissions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('first_correct', models.BooleanField(default=False)),
+                ('last_correct', models.BooleanField(default=False)),
+                ('best_correct', models.BooleanField(default=False)),
+                ('first_attempt_number', models.PositiveIntegerField(default=0)),
+                ('last_attempt_number', models.PositiveIntegerField(default=0)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quizzes.question')),
+                ('submission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='question_scores', to='submissions.submission')),
+            ],
+            options={
+                'unique_together': {('submission', 'question')},
+            },
+        ),
+    ]
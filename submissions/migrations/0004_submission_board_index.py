@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_quiz_scoring_choices'),
+        ('submissions', '0003_queued_submission'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(condition=models.Q(('in_progress', False)), fields=['quiz', '-score', 'submitted_at', 'id'], name='submission_board_idx'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from submissions.standings import standing_values
+
+
+def backfill_standings(apps, schema_editor):
+    Quiz = apps.get_model("quizzes", "Quiz")
+    Submission = apps.get_model("submissions", "Submission")
+    QuizStanding = apps.get_model("submissions", "QuizStanding")
+    for quiz_id, policy in Quiz.objects.values_list("pk", "scoring_policy").iterator():
+        rows_by_user = {}
+        completed = (
+            Submission.objects.filter(quiz_id=quiz_id, in_progress=False)
+            .order_by("user_id", "attempt_number", "id")
+            .values("id", "user_id", "score", "attempt_number", "submitted_at")
+        )
+        for row in completed.iterator(chunk_size=1000):
+            rows_by_user.setdefault(row["user_id"], []).append(row)
+        QuizStanding.objects.bulk_create(
+            [
+                QuizStanding(quiz_id=quiz_id, user_id=user_id, **standing_values(rows, policy))
+                for user_id, rows in rows_by_user.items()
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_quiz_scoring_choices'),
+        ('submissions', '0004_submission_board_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuizStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.IntegerField(default=0)),
+                ('best_score', models.IntegerField(default=0)),
+                ('first_score', models.IntegerField(default=0)),
+                ('last_score', models.IntegerField(default=0)),
+                ('attempts', models.PositiveIntegerField(default=0)),
+                ('attempt_number', models.PositiveIntegerField(default=1)),
+                ('decided_at', models.DateTimeField()),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='standings', to='quizzes.quiz')),
+                ('submission', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='submissions.submission')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='quiz_standings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['quiz', '-score', 'decided_at', 'id'], name='standing_board_idx')],
+                'unique_together': {('quiz', 'user')},
+            },
+        ),
+        migrations.RunPython(backfill_standings, migrations.RunPython.noop),
+        # Leaderboards rank standings now (standing_board_idx)
+        migrations.RemoveIndex(
+            model_name='submission',
+            name='submission_board_idx',
+        ),
+    ]
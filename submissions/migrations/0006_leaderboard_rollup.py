@@ -0,0 +1,31 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0003_quiz_scoring_choices'),
+        ('submissions', '0005_quiz_standing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('day', 'Day'), ('week', 'Week'), ('all', 'All time')], max_length=8)),
+                ('period_start', models.DateTimeField(blank=True, null=True)),
+                ('taken_at', models.DateTimeField()),
+                ('through_submission_id', models.BigIntegerField(default=0)),
+                ('open_submission_ids', models.JSONField(default=list)),
+                ('states', models.JSONField(default=list)),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_rollups', to='quizzes.quiz')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['quiz', 'window', 'period_start', '-taken_at'], name='submissions_quiz_id_7146c6_idx')],
+            },
+        ),
+    ]
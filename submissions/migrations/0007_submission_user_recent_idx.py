@@ -0,0 +1,20 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0005_quiz_public_recent_idx'),
+        ('submissions', '0006_leaderboard_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['user', '-submitted_at', 'id'], name='submission_user_recent_idx'),
+        ),
+    ]
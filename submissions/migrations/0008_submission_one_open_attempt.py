@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+def close_duplicate_open_attempts(apps, schema_editor):
+    # Racing starts could leave several open attempts; keep the newest one open
+    Submission = apps.get_model("submissions", "Submission")
+    newest = {}
+    duplicates = []
+    for pk, quiz_id, user_id in (
+        Submission.objects.filter(in_progress=True)
+        .order_by("-attempt_number").values_list("pk", "quiz_id", "user_id").iterator()
+    ):
+        if (quiz_id, user_id) in newest:
+            duplicates.append(pk)
+        else:
+            newest[quiz_id, user_id] = pk
+    Submission.objects.filter(pk__in=duplicates).update(in_progress=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('submissions', '0007_submission_user_recent_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(close_duplicate_open_attempts, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='submission',
+            constraint=models.UniqueConstraint(
+                condition=models.Q(in_progress=True), fields=('quiz', 'user'), name='submission_one_open_attempt'
+            ),
+        ),
+    ]
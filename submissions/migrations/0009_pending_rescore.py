@@ -0,0 +1,25 @@
+# Generated by Django 5.0.7 on 2026-10-18 22:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quizzes', '0006_scoring_policy_registry'),
+        ('submissions', '0008_submission_one_open_attempt'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PendingRescore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('regrade', models.BooleanField(default=False)),
+                ('requested_at', models.DateTimeField()),
+                ('claimed_at', models.DateTimeField(blank=True, null=True)),
+                ('quiz', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='pending_rescore', to='quizzes.quiz')),
+            ],
+        ),
+    ]
@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from quizzes.models import Quiz, Question
@@ -13,6 +15,18 @@ class Submission(models.Model):
 
 	class Meta:
 		unique_together = ("quiz", "user", "attempt_number")
+		constraints = [
+			# At most one open attempt per user and quiz; racing starts retry and resume it
+			models.UniqueConstraint(
+				fields=["quiz", "user"],
+				condition=models.Q(in_progress=True),
+				name="submission_one_open_attempt",
+			),
+		]
+		indexes = [
+			# A user's submissions, newest first (API cursor pages)
+			models.Index(fields=["user", "-submitted_at", "id"], name="submission_user_recent_idx"),
+		]
 
 	def __str__(self) -> str:  # pragma: no cover
 		return f"Submission {self.user_id} -> {self.quiz_id} (#{self.attempt_number})"
@@ -21,6 +35,67 @@ class Submission(models.Model):
 		return super().save(*args, **kwargs)
 
 
+class QuizStanding(models.Model):
+	"""A user's standing on a quiz, derived from their completed submissions.
+
+	Leaderboards rank these rows (one per user) rather than individual
+	submissions. ``score`` follows the quiz's scoring policy across attempts
+	(``first`` / ``last`` attempt, otherwise the best one) and ``submission``
+	is the attempt that decided it. Maintained by :mod:`submissions.standings`.
+	"""
+	quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="standings")
+	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="quiz_standings")
+	score = models.IntegerField(default=0)
+	best_score = models.IntegerField(default=0)
+	first_score = models.IntegerField(default=0)
+	last_score = models.IntegerField(default=0)
+	attempts = models.PositiveIntegerField(default=0)
+	submission = models.ForeignKey(Submission, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+	attempt_number = models.PositiveIntegerField(default=1)
+	decided_at = models.DateTimeField()
+
+	class Meta:
+		unique_together = ("quiz", "user")
+		indexes = [
+			models.Index(fields=["quiz", "-score", "decided_at", "id"], name="standing_board_idx"),
+		]
+
+	def __str__(self) -> str:  # pragma: no cover
+		return f"Standing {self.user_id} on {self.quiz_id}: {self.score}"
+
+
+class LeaderboardRollup(models.Model):
+	"""Compact per-user leaderboard state of a quiz over a time window.
+
+	``day`` / ``week`` rollups cover submissions completed in one calendar
+	period and are refreshed in place of their predecessor; ``all`` rollups
+	are all-time snapshots kept as history for "as of" queries. ``states``
+	holds one mergeable list per user (see :mod:`realtime.rollups`) for the
+	completed submissions up to ``through_submission_id``, except those
+	still open then (``open_submission_ids``).
+	"""
+	DAY = "day"
+	WEEK = "week"
+	ALL = "all"
+	WINDOW_CHOICES = [(DAY, "Day"), (WEEK, "Week"), (ALL, "All time")]
+
+	quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="leaderboard_rollups")
+	window = models.CharField(max_length=8, choices=WINDOW_CHOICES)
+	period_start = models.DateTimeField(null=True, blank=True)
+	taken_at = models.DateTimeField()
+	through_submission_id = models.BigIntegerField(default=0)
+	open_submission_ids = models.JSONField(default=list)
+	states = models.JSONField(default=list)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=["quiz", "window", "period_start", "-taken_at"]),
+		]
+
+	def __str__(self) -> str:  # pragma: no cover
+		return f"Rollup {self.quiz_id} {self.window} @ {self.taken_at:%Y-%m-%d %H:%M}"
+
+
 class QuestionAttempt(models.Model):
 	submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name="question_attempts")
 	question = models.ForeignKey(Question, on_delete=models.CASCADE)
@@ -40,3 +115,84 @@ class QuestionAttempt(models.Model):
 	def save(self, *args, **kwargs):
 		return super().save(*args, **kwargs)
 
+
+
+class QuestionScore(models.Model):
+	"""Running scoring state of one question within a submission.
+
+	Folded forward on every new attempt so the submission score can be
+	maintained with a delta instead of a rescan of all attempts.
+	"""
+	submission = models.ForeignKey(Submission, on_delete=models.CASCADE, related_name="question_scores")
+	question = models.ForeignKey(Question, on_delete=models.CASCADE)
+	attempts = models.PositiveIntegerField(default=0)
+	first_correct = models.BooleanField(default=False)
+	last_correct = models.BooleanField(default=False)
+	best_correct = models.BooleanField(default=False)
+	first_attempt_number = models.PositiveIntegerField(default=0)
+	last_attempt_number = models.PositiveIntegerField(default=0)
+
+	class Meta:
+		unique_together = ("submission", "question")
+
+	def __str__(self) -> str:  # pragma: no cover
+		return f"Score state Q{self.question_id} sub {self.submission_id}"
+
+	def fold(self, is_correct: bool, attempt_number: int) -> None:
+		"""Account for one more attempt (later ids win ties on attempt_number)."""
+		if not self.attempts or attempt_number < self.first_attempt_number:
+			self.first_correct = is_correct
+			self.first_attempt_number = attempt_number
+		if not self.attempts or attempt_number >= self.last_attempt_number:
+			self.last_correct = is_correct
+			self.last_attempt_number = attempt_number
+		self.best_correct = self.best_correct or is_correct
+		self.attempts += 1
+
+
+class QueuedSubmission(models.Model):
+	"""A submit request accepted in queue ingestion mode.
+
+	Doubles as the queue entry drained by ``drain_submissions`` and as the
+	receipt the client polls for the outcome.
+	"""
+	QUEUED = "queued"
+	DONE = "done"
+	FAILED = "failed"
+	STATUS_CHOICES = [(QUEUED, "Queued"), (DONE, "Done"), (FAILED, "Failed")]
+
+	token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+	quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE, related_name="queued_submissions")
+	user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="queued_submissions")
+	answers = models.JSONField(default=dict)
+	include_unanswered = models.BooleanField(default=False)
+	status = models.CharField(max_length=12, choices=STATUS_CHOICES, default=QUEUED)
+	submission = models.ForeignKey(Submission, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+	error = models.TextField(blank=True)
+	created_at = models.DateTimeField(auto_now_add=True)
+	processed_at = models.DateTimeField(null=True, blank=True)
+
+	class Meta:
+		indexes = [
+			models.Index(fields=["status", "id"]),
+		]
+
+	def __str__(self) -> str:  # pragma: no cover
+		return f"Queued {self.token} ({self.status})"
+
+
+class PendingRescore(models.Model):
+	"""A whole-quiz rescore requested by a scoring policy or answer key change.
+
+	Requests only queue one of these; ``manage.py rescore_quiz --pending``
+	runs them. ``claimed_at`` is the running worker's lease: a new request
+	clears it so the quiz is rescored again, and a lease that outlives
+	:data:`~submissions.rescoring.RESCORE_LEASE` is taken over.
+	"""
+	quiz = models.OneToOneField(Quiz, on_delete=models.CASCADE, related_name="pending_rescore")
+	regrade = models.BooleanField(default=False)
+	requested_at = models.DateTimeField()
+	claimed_at = models.DateTimeField(null=True, blank=True)
+
+	def __str__(self) -> str:  # pragma: no cover
+		return f"Rescore {self.quiz_id}{' (regrade)' if self.regrade else ''}"
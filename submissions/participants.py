@@ -0,0 +1,49 @@
+"""Approximate unique participants per quiz, as distinct counters.
+
+Every user who starts an attempt is added to the quiz's HyperLogLog (see
+:mod:`core.counters`) once the submission commits. Adds only update
+counters that exist; a missing one is built from the database on first
+read. Deleted submissions still count until the counter is rebuilt.
+"""
+
+from __future__ import annotations
+
+from django.conf import settings
+from django.db import transaction
+
+from core import counters
+from core import swr
+from .models import Submission
+
+PARTICIPANTS_KEY = "participants:%s"
+
+
+def _timeout() -> int:
+    return getattr(settings, "PARTICIPANT_COUNTER_TIMEOUT", 7 * 24 * 60 * 60)
+
+
+def record_participant(quiz_id: int, user_id: int) -> None:
+    transaction.on_commit(
+        lambda: counters.add(PARTICIPANTS_KEY % quiz_id, user_id, timeout=_timeout(), create=False)
+    )
+
+
+def rebuild_participants(quiz_id: int) -> None:
+    users = Submission.objects.filter(quiz_id=quiz_id).values_list("user_id", flat=True).distinct()
+    counters.get_backend().store(PARTICIPANTS_KEY % quiz_id, users.iterator(), timeout=_timeout())
+
+
+def discard_participants(quiz_id: int) -> None:
+    counters.get_backend().delete(PARTICIPANTS_KEY % quiz_id)
+
+
+def unique_participants(quiz_id: int) -> int:
+    """Approximate number of distinct users with a submission on the quiz."""
+    key = PARTICIPANTS_KEY % quiz_id
+    if not counters.get_backend().exists(key):
+        with swr.single_flight(key) as acquired:
+            if acquired:
+                rebuild_participants(quiz_id)
+            else:
+                return Submission.objects.filter(quiz_id=quiz_id).values("user_id").distinct().count()
+    return counters.count(key)
@@ -0,0 +1,96 @@
+"""Per-quiz score distributions kept as KLL sketches in the shared cache.
+
+Each quiz's sketch covers the scores of its completed attempts. Besides
+the sketch the cache entry remembers the highest submission id folded in
+and the attempts that were still open below it, so an update only reads
+the attempts completed since, and a skipped update is caught up by the next
+one. Updates run from the coalesced flush for quizzes whose sketch is
+cached; a missing sketch is built on first read. Rescores rebuild it.
+
+Scores changed after an attempt was counted (by a later rescore aside)
+aren't reflected until the next rebuild; percentiles are approximate
+anyway.
+"""
+
+from __future__ import annotations
+
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Max, Q
+
+from core import swr
+from core.sketches import KLLSketch
+from .models import Submission
+
+SKETCH_KEY = "score-sketch:%s"
+
+
+def _timeout() -> int:
+    return getattr(settings, "SCORE_SKETCH_CACHE_TIMEOUT", 24 * 60 * 60)
+
+
+def _fold(quiz_id: int, entry: Optional[dict]) -> dict:
+    """Fold attempts completed since ``entry`` (all of them without one) into a new entry."""
+    submissions = Submission.objects.filter(quiz_id=quiz_id)
+    through = submissions.aggregate(through=Max("pk"))["through"] or 0
+    if entry is None:
+        sketch, pending = KLLSketch(), submissions
+    else:
+        sketch = KLLSketch.from_dict(entry["sketch"])
+        through = max(through, entry["through"])
+        pending = submissions.filter(Q(pk__gt=entry["through"]) | Q(pk__in=entry["open"]))
+    pending = pending.filter(pk__lte=through)
+    sketch.update_many(pending.filter(in_progress=False).values_list("score", flat=True).iterator())
+    still_open = list(pending.filter(in_progress=True).values_list("pk", flat=True))
+    return {"sketch": sketch.to_dict(), "through": through, "open": still_open}
+
+
+def _store(quiz_id: int, entry: dict) -> None:
+    cache.set(SKETCH_KEY % quiz_id, entry, _timeout())
+
+
+def refresh_score_sketches(quiz_ids: Iterable[int], rebuild_quiz_ids: Iterable[int] = ()) -> None:
+    """Catch cached sketches up with newly completed attempts; rebuild ``rebuild_quiz_ids``."""
+    rebuild_quiz_ids = set(rebuild_quiz_ids)
+    for quiz_id in set(quiz_ids) | rebuild_quiz_ids:
+        key = SKETCH_KEY % quiz_id
+        with swr.single_flight(key) as acquired:
+            if not acquired:
+                continue  # another worker is updating; its successor picks up where it stops
+            entry = cache.get(key)
+            if quiz_id in rebuild_quiz_ids:
+                if entry is not None:
+                    _store(quiz_id, _fold(quiz_id, None))
+            elif entry is not None:
+                _store(quiz_id, _fold(quiz_id, entry))
+
+
+def discard_score_sketch(quiz_id: int) -> None:
+    cache.delete(SKETCH_KEY % quiz_id)
+
+
+def get_score_sketch(quiz_id: int) -> KLLSketch:
+    """The quiz's score sketch, built from the database on a cache miss."""
+    key = SKETCH_KEY % quiz_id
+    entry = cache.get(key)
+    if entry is None:
+        with swr.single_flight(key) as acquired:
+            entry = _fold(quiz_id, None)
+            if acquired:
+                _store(quiz_id, entry)
+    return KLLSketch.from_dict(entry["sketch"])
+
+
+def percentile_below(quiz_id: int, score: int) -> Optional[float]:
+    """Approximate percentage of completed attempts that scored less than ``score``."""
+    sketch = get_score_sketch(quiz_id)
+    if not sketch.n:
+        return None
+    return 100 * sketch.rank(score)
+
+
+def score_histogram(quiz_id: int, edges: list) -> list:
+    """Approximate attempt counts per ``[edges[i], edges[i + 1])`` score bucket."""
+    return get_score_sketch(quiz_id).histogram(edges)
@@ -0,0 +1,254 @@
+"""Vectorized bulk rescoring of a quiz's submissions.
+
+Used when a quiz's ``scoring_policy`` changes (scores must be re-derived) or
+its answer key changes (attempts must be regraded first). Attempts are
+streamed in blocks of whole submissions into NumPy arrays, the policy is
+applied through the strategy's columnar API and scores are written back with one
+``UPDATE`` per distinct score value per block. The per-question scoring state
+(:class:`QuestionScore`) is rebuilt from the same arrays.
+
+Each block locks its submission rows before reading their attempts, and
+:func:`~submissions.services.apply_attempts` takes the same lock first, so
+a concurrent one either committed before (its attempts and score are read)
+or folds its attempts into the rebuilt state and adds its delta once the
+block commits: absolute writes never drop it.
+
+Edits never rescore in the request: the coalesced flush only queues a
+:class:`~submissions.models.PendingRescore` per quiz (:func:`queue_rescores`)
+and ``manage.py rescore_quiz --pending`` runs them (:func:`run_pending_rescores`),
+then rebuilds what derives from the scores (standings, rollups, leaderboards,
+sketches). Until then the quiz keeps its previous scores.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Optional
+
+import numpy as np
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import PendingRescore, Submission, QuestionAttempt, QuestionScore
+from .strategies import QuestionGroups, get_strategy, group_attempts, sum_by_submission
+
+DEFAULT_CHUNK_SIZE = 2_000  # submissions per block
+UPDATE_BATCH_SIZE = 1_000  # ids per ``pk__in`` clause
+RESCORE_LEASE = timedelta(minutes=30)  # a claimed rescore older than this is retried
+
+_ATTEMPT_COLUMNS = ("submission_id", "question_id", "attempt_number", "answer", "is_correct", "id")
+
+
+@dataclass
+class AttemptArrays:
+    """Attempts of a block of submissions, sorted by (submission, question, attempt order)."""
+
+    submission: np.ndarray
+    question: np.ndarray
+    attempt_number: np.ndarray
+    answer: np.ndarray  # -1 when no answer was selected
+    correct: np.ndarray  # bool
+    id: np.ndarray
+
+    @classmethod
+    def from_rows(cls, rows) -> "AttemptArrays":
+        data = np.array(rows, dtype=np.int64).reshape(-1, len(_ATTEMPT_COLUMNS))
+        return cls(
+            submission=data[:, 0],
+            question=data[:, 1],
+            attempt_number=data[:, 2],
+            answer=data[:, 3],
+            correct=data[:, 4].astype(bool),
+            id=data[:, 5],
+        )
+
+    def __len__(self) -> int:
+        return len(self.id)
+
+
+def regrade(arrays: AttemptArrays, correct_pairs) -> np.ndarray:
+    """Correctness of each attempt under the current answer key (vectorized set lookup)."""
+    if not len(arrays) or not correct_pairs:
+        return np.zeros(len(arrays), dtype=bool)
+    key = np.array(sorted((q << 32) | a for q, a in correct_pairs), dtype=np.int64)
+    attempt_key = (arrays.question << 32) | np.where(arrays.answer < 0, 0, arrays.answer)
+    return np.isin(attempt_key, key) & (arrays.answer > 0)
+
+
+def _batched(values, size=UPDATE_BATCH_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _load_block(quiz_id: int, lo: int, hi: int) -> AttemptArrays:
+    rows = (
+        QuestionAttempt.objects.filter(submission__quiz_id=quiz_id, submission__gte=lo, submission__lte=hi)
+        .order_by("submission_id", "question_id", "attempt_number", "attempted_at", "id")
+        .values_list("submission_id", "question_id", "attempt_number",
+                     Coalesce("selected_answer_id", -1), "is_correct", "id")
+    )
+    return AttemptArrays.from_rows(list(rows))
+
+
+def _write_regrade(arrays: AttemptArrays, correct: np.ndarray) -> int:
+    changed = correct != arrays.correct
+    for flag in (True, False):
+        ids = arrays.id[changed & (correct == flag)]
+        for batch in _batched(ids.tolist()):
+            QuestionAttempt.objects.filter(pk__in=batch).update(is_correct=flag)
+    arrays.correct = correct
+    return int(changed.sum())
+
+
+def _write_states(groups: QuestionGroups, submission_ids) -> None:
+    for batch in _batched(submission_ids):
+        QuestionScore.objects.filter(submission_id__in=batch).delete()
+    QuestionScore.objects.bulk_create(
+        [
+            QuestionScore(
+                submission_id=s, question_id=q, attempts=n,
+                first_correct=fc, last_correct=lc, best_correct=bc,
+                first_attempt_number=fn, last_attempt_number=ln,
+            )
+            for s, q, n, fc, lc, bc, fn, ln in zip(
+                groups.submission.tolist(), groups.question.tolist(), groups.attempts.tolist(),
+                groups.first_correct.tolist(), groups.last_correct.tolist(), groups.best_correct.tolist(),
+                groups.first_attempt_number.tolist(), groups.last_attempt_number.tolist(),
+            )
+        ],
+        batch_size=UPDATE_BATCH_SIZE,
+    )
+
+
+def _write_scores(current: dict, totals: dict) -> int:
+    """Write changed scores with one UPDATE per distinct score value."""
+    by_score = {}
+    for sid, total in totals.items():
+        if current[sid] != total:
+            by_score.setdefault(total, []).append(sid)
+    for score, sids in by_score.items():
+        for batch in _batched(sids):
+            Submission.objects.filter(pk__in=batch).update(score=score)
+    return sum(len(sids) for sids in by_score.values())
+
+
+@dataclass
+class RescoreResult:
+    submissions: int = 0
+    attempts: int = 0
+    regraded: int = 0
+    changed: int = 0
+
+
+def rescore_quiz(quiz, *, regrade_attempts: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE) -> RescoreResult:
+    """Recompute every submission score of ``quiz`` under its current policy.
+
+    With ``regrade_attempts`` each attempt's ``is_correct`` is first re-derived
+    from the current answer key. Leaderboard refresh is left to the caller.
+    """
+    from .grading import load_answer_key
+
+    strategy = get_strategy(quiz)
+    correct_pairs = load_answer_key(quiz).correct if regrade_attempts else None
+    submission_ids = list(Submission.objects.filter(quiz=quiz).order_by("pk").values_list("pk", flat=True))
+    result = RescoreResult(submissions=len(submission_ids))
+
+    for i in range(0, len(submission_ids), chunk_size):
+        with transaction.atomic():
+            block = dict(
+                Submission.objects.select_for_update().filter(pk__in=submission_ids[i:i + chunk_size])
+                .order_by("pk").values_list("pk", "score")
+            )
+            if not block:
+                continue  # deleted meanwhile
+            block_ids = list(block)
+            arrays = _load_block(quiz.pk, block_ids[0], block_ids[-1])
+            result.attempts += len(arrays)
+            if regrade_attempts:
+                result.regraded += _write_regrade(arrays, regrade(arrays, correct_pairs))
+            groups = group_attempts(
+                arrays.submission, arrays.question, arrays.attempt_number, arrays.correct, presorted=True
+            )
+            _write_states(groups, block_ids)
+            ids, totals = sum_by_submission(groups.submission, strategy.score_groups(groups))
+            # Submissions without attempts score zero
+            totals_by_id = dict.fromkeys(block_ids, 0)
+            totals_by_id.update(zip(ids.tolist(), totals.tolist()))
+            result.changed += _write_scores(block, totals_by_id)
+    return result
+
+
+def run_rescore(quiz, *, regrade_attempts: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE) -> RescoreResult:
+    """Rescore ``quiz`` and rebuild everything derived from its scores."""
+    from core.channels import schedule_leaderboard_broadcast
+    from realtime.rollups import discard_rollups
+    from realtime.utils import refresh_leaderboards
+    from .percentiles import refresh_score_sketches
+    from .services import touch_user_submissions
+    from .standings import rebuild_standings
+
+    result = rescore_quiz(quiz, regrade_attempts=regrade_attempts, chunk_size=chunk_size)
+    rebuild_standings(quiz)
+    discard_rollups(quiz)
+    touch_user_submissions(set(Submission.objects.filter(quiz=quiz).values_list("user_id", flat=True)))
+    refresh_leaderboards({quiz.pk}, rebuild_quiz_ids={quiz.pk})
+    refresh_score_sketches({quiz.pk}, rebuild_quiz_ids={quiz.pk})
+    schedule_leaderboard_broadcast(quiz.pk)
+    return result
+
+
+def queue_rescores(rescores: dict) -> None:
+    """Queue ``{quiz_id: regrade}`` rescores; a quiz already queued keeps one entry."""
+    now = timezone.now()
+    for quiz_id, regrade in rescores.items():
+        changes = {"requested_at": now, "claimed_at": None}
+        if regrade:
+            changes["regrade"] = True
+        for _ in range(2):
+            if PendingRescore.objects.filter(quiz_id=quiz_id).update(**changes):
+                break
+            try:
+                with transaction.atomic():
+                    PendingRescore.objects.create(quiz_id=quiz_id, regrade=regrade, requested_at=now)
+                break
+            except IntegrityError:
+                continue  # queued concurrently; update that entry instead
+
+
+def _claim() -> Optional[PendingRescore]:
+    now = timezone.now()
+    with transaction.atomic():
+        pending = (
+            PendingRescore.objects.select_for_update(skip_locked=True)
+            .filter(Q(claimed_at__isnull=True) | Q(claimed_at__lt=now - RESCORE_LEASE))
+            .select_related("quiz").order_by("requested_at").first()
+        )
+        if pending is not None:
+            pending.claimed_at = now
+            pending.save(update_fields=["claimed_at"])
+    return pending
+
+
+def run_pending_rescores(limit: Optional[int] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list:
+    """Run queued rescores, oldest first; returns ``(quiz, result)`` pairs.
+
+    A rescore requested again while it runs stays queued (the request
+    cleared the claim), so the newer change is picked up by the next run.
+    """
+    done = []
+    while limit is None or len(done) < limit:
+        pending = _claim()
+        if pending is None:
+            break
+        try:
+            result = run_rescore(pending.quiz, regrade_attempts=pending.regrade, chunk_size=chunk_size)
+        except Exception:
+            PendingRescore.objects.filter(pk=pending.pk, claimed_at=pending.claimed_at).update(claimed_at=None)
+            raise
+        PendingRescore.objects.filter(pk=pending.pk, claimed_at=pending.claimed_at).delete()
+        done.append((pending.quiz, result))
+    return done
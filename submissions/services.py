@@ -1,55 +1,144 @@
 from collections import defaultdict
-from django.db.models import Prefetch
+from django.db import connection, transaction
+from django.db.models import F
 
-from .models import Submission, QuestionAttempt
+from core import generations
+from .models import Submission, QuestionAttempt, QuestionScore
 from .strategies import get_strategy
 
+# Version stamp of a user's submissions, behind the submissions API ETags
+USER_SUBMISSIONS_GENERATION = "user-submissions:%s"
 
-def recompute_score(submission: Submission) -> int:
-    """Recompute total score for a submission.
 
-    Strategy is applied per-question on that submission's attempts,
-    and the total is the sum across all questions.
-    """
-    # Gather attempts per question for this submission, ordered by attempt_number
+def _attempts_by_question(submission: Submission) -> dict:
     attempts = (
         QuestionAttempt.objects.filter(submission=submission)
-        .select_related("question")
         .order_by("question_id", "attempt_number", "attempted_at", "id")
     )
-
     per_question = defaultdict(list)
     for a in attempts:
         per_question[a.question_id].append(a)
+    return per_question
+
+
+def expected_score(submission: Submission) -> int:
+    """Score of a submission computed from scratch with the quiz's strategy."""
+    strategy = get_strategy(submission.quiz)
+    return sum(strategy.compute(q_attempts) for q_attempts in _attempts_by_question(submission).values())
+
 
+def recompute_score(submission: Submission) -> int:
+    """Recompute total score for a submission.
+
+    Strategy is applied per-question on that submission's attempts,
+    and the total is the sum across all questions. The incremental
+    per-question state is rebuilt alongside, so this doubles as the
+    repair path for drifted scores.
+    """
+    per_question = _attempts_by_question(submission)
     strategy = get_strategy(submission.quiz)
-    total = 0
-    for _, q_attempts in per_question.items():
-        total += strategy.compute(q_attempts)
-
-    # Update and save only if changed to avoid unnecessary writes
-    if submission.score != total:
-        Submission.objects.filter(pk=submission.pk).update(score=total)
-        submission.score = total
+    total = sum(strategy.compute(q_attempts) for q_attempts in per_question.values())
+
+    states = []
+    for question_id, q_attempts in per_question.items():
+        state = QuestionScore(submission=submission, question_id=question_id)
+        for a in q_attempts:
+            state.fold(a.is_correct, a.attempt_number)
+        states.append(state)
+    with transaction.atomic():
+        QuestionScore.objects.filter(submission=submission).delete()
+        QuestionScore.objects.bulk_create(states)
+        # Update and save only if changed to avoid unnecessary writes
+        if submission.score != total:
+            Submission.objects.filter(pk=submission.pk).update(score=total)
+    submission.score = total
     return total
 
 
+def apply_attempts(submission: Submission, attempts) -> int:
+    """Fold new attempts into the per-question state and bump the score by the delta.
+
+    Costs a constant number of queries regardless of how many attempts are
+    applied. Returns the score delta. Strategies that can't score from the
+    folded state get a coalesced full recompute instead (delta 0 here).
+    """
+    if not attempts:
+        return 0
+    strategy = get_strategy(submission.quiz)
+    question_ids = {a.question_id for a in attempts}
+    with transaction.atomic():
+        if connection.features.has_select_for_update:
+            # Same lock order as a bulk rescore (submission, then its question
+            # states), so the two never interleave on one submission
+            list(Submission.objects.select_for_update().filter(pk=submission.pk).values_list("pk"))
+        states = {
+            s.question_id: s
+            for s in QuestionScore.objects.select_for_update().filter(
+                submission=submission, question_id__in=question_ids
+            )
+        }
+        before = _state_points(strategy, states)
+        created = []
+        for a in attempts:
+            state = states.get(a.question_id)
+            if state is None:
+                state = states[a.question_id] = QuestionScore(submission=submission, question_id=a.question_id)
+                created.append(state)
+            state.fold(a.is_correct, a.attempt_number)
+
+        after = _state_points(strategy, states)
+        delta = 0 if after is None else sum(p - before.get(qid, 0) for qid, p in after.items())
+        updated = [s for s in states.values() if s.pk is not None]
+        if created:
+            QuestionScore.objects.bulk_create(created)
+        if updated:
+            QuestionScore.objects.bulk_update(updated, [
+                "attempts", "first_correct", "last_correct", "best_correct",
+                "first_attempt_number", "last_attempt_number",
+            ])
+        if delta:
+            Submission.objects.filter(pk=submission.pk).update(score=F("score") + delta)
+    if after is None:
+        from .coalesce import mark_submission  # local import: coalesce imports this module
+
+        mark_submission(submission)
+    submission.score += delta
+    return delta
+
+
+def _state_points(strategy, states: dict):
+    try:
+        return {qid: strategy.score_state(s) for qid, s in states.items()}
+    except NotImplementedError:
+        return None
+
+
+def find_score_drift(submissions):
+    """Yield ``(submission, stored, expected)`` for submissions whose score is stale."""
+    for submission in submissions.select_related("quiz").iterator():
+        expected = expected_score(submission)
+        if submission.score != expected:
+            yield submission, submission.score, expected
+
+
 def remaining_attempts(user, quiz_id) -> int:
     """Compute remaining attempts for a user on a quiz (quiz-level).
 
     If the quiz does not allow multiple attempts, remaining is 1 if no submission exists, else 0.
     If allows multiple attempts and max_attempts is set, remaining = max_attempts - attempts_made.
     If max_attempts is not set, treat as unlimited (large number); here we return 999999.
+    Served from the cached entitlement record, so repeat calls don't hit the database.
     """
     from quizzes.models import Quiz  # local import to avoid circulars
+    from .entitlements import get_entitlement
 
-    quiz = Quiz.objects.get(pk=quiz_id)
-    attempts_made = Submission.objects.filter(quiz_id=quiz_id, user=user).count()
-
-    if not quiz.allow_multiple_attempts:
-        return 0 if attempts_made > 0 else 1
+    entitlement = get_entitlement(user.pk, quiz_id)
+    if entitlement is None:
+        raise Quiz.DoesNotExist(f"Quiz {quiz_id} does not exist")
+    return entitlement.remaining
 
-    if quiz.max_attempts is not None:
-        return max(0, quiz.max_attempts - attempts_made)
 
-    return 999_999
+def touch_user_submissions(user_ids, on_commit: bool = True) -> None:
+    """Bump the submissions version stamp of each user (any change to their rows)."""
+    for user_id in set(user_ids):
+        generations.bump(USER_SUBMISSIONS_GENERATION % user_id, on_commit=on_commit)
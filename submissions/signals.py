@@ -1,24 +1,147 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
 
-from .models import QuestionAttempt
-from .services import recompute_score
-try:
-    from realtime.utils import invalidate_leaderboard
-except Exception:
-    def invalidate_leaderboard(quiz_id: int):
-        return None
-
-try:
-    from core.channels import broadcast_leaderboard
-except Exception:  # pragma: no cover - placeholder if not yet implemented
-    def broadcast_leaderboard(quiz_id, payload=None):
-        return None
+from core.navcounters import invalidate_submissions
+from quizzes.models import Quiz, Question, Answer
+from realtime.utils import reset_leaderboard
+from .models import QuestionAttempt, Submission
+from .coalesce import mark_dirty, mark_rescore, mark_scored, mark_submission
+from .entitlements import invalidate_quiz, invalidate_user
+from .participants import discard_participants, record_participant
+from .percentiles import discard_score_sketch
+from .services import apply_attempts, touch_user_submissions
 
 
 @receiver(post_save, sender=QuestionAttempt)
-def update_score_and_leaderboard(sender, instance: QuestionAttempt, **kwargs):
+def update_score_and_leaderboard(sender, instance: QuestionAttempt, created=False, raw=False, **kwargs):
+    if raw:
+        return
     submission = instance.submission
-    recompute_score(submission)
-    invalidate_leaderboard(submission.quiz_id)
-    broadcast_leaderboard(submission.quiz_id)
+    if created:
+        # New attempts are folded into the running score in O(1); the
+        # leaderboard refresh is coalesced per quiz until commit.
+        apply_attempts(submission, [instance])
+        mark_scored(submission)
+    else:
+        # Edited attempts can't be folded in; recompute once on commit.
+        mark_submission(submission)
+
+
+@receiver(pre_save, sender=Quiz)
+def remember_scoring_policy(sender, instance: Quiz, raw=False, update_fields=None, **kwargs):
+    if raw or instance.pk is None or (update_fields is not None and "scoring_policy" not in update_fields):
+        instance._previous_scoring_policy = None
+        return
+    instance._previous_scoring_policy = (
+        Quiz.objects.filter(pk=instance.pk).values_list("scoring_policy", flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Quiz)
+def rescore_on_policy_change(sender, instance: Quiz, created=False, raw=False, **kwargs):
+    previous = getattr(instance, "_previous_scoring_policy", None)
+    if not created and previous is not None and previous != instance.scoring_policy:
+        mark_rescore(instance.pk)
+
+
+@receiver(pre_save, sender=Answer)
+def remember_answer_correctness(sender, instance: Answer, raw=False, **kwargs):
+    previous = None
+    if not raw and instance.pk is not None:
+        previous = Answer.objects.filter(pk=instance.pk).values_list("is_correct", flat=True).first()
+    instance._previous_is_correct = previous
+
+
+def _regrade_question(question_id: int) -> None:
+    # Only questions that already have attempts can move any score
+    if not QuestionAttempt.objects.filter(question_id=question_id).exists():
+        return
+    quiz_id = Question.objects.filter(pk=question_id).values_list("quiz_id", flat=True).first()
+    if quiz_id is not None:
+        mark_rescore(quiz_id, regrade=True)
+
+
+@receiver(post_save, sender=Answer)
+def rescore_on_answer_key_change(sender, instance: Answer, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, "_previous_is_correct", None)
+    if (previous is None and instance.is_correct) or (previous is not None and previous != instance.is_correct):
+        _regrade_question(instance.question_id)
+
+
+@receiver(post_delete, sender=Answer)
+def rescore_on_answer_delete(sender, instance: Answer, **kwargs):
+    if instance.is_correct:
+        _regrade_question(instance.question_id)
+
+
+@receiver(post_save, sender=Submission)
+def invalidate_entitlement_on_submission(sender, instance: Submission, created=False, raw=False, **kwargs):
+    if created and not raw:
+        invalidate_user(instance.quiz_id, instance.user_id)
+
+
+@receiver(post_save, sender=Submission)
+def count_participant_on_submission(sender, instance: Submission, created=False, raw=False, **kwargs):
+    if created and not raw:
+        record_participant(instance.quiz_id, instance.user_id)
+
+
+@receiver(post_delete, sender=Submission)
+def invalidate_entitlement_on_submission_delete(sender, instance: Submission, **kwargs):
+    invalidate_user(instance.quiz_id, instance.user_id)
+
+
+@receiver(post_save, sender=Submission)
+@receiver(post_delete, sender=Submission)
+def touch_user_submissions_on_change(sender, instance: Submission, raw=False, **kwargs):
+    if not raw:
+        touch_user_submissions([instance.user_id])
+
+
+@receiver(post_save, sender=Submission)
+def invalidate_nav_counter_on_submission(sender, instance: Submission, created=False, raw=False, **kwargs):
+    if created and not raw:
+        invalidate_submissions(instance.user_id)
+
+
+@receiver(post_delete, sender=Submission)
+def invalidate_nav_counter_on_submission_delete(sender, instance: Submission, **kwargs):
+    invalidate_submissions(instance.user_id)
+
+
+@receiver(post_delete, sender=Submission)
+def drop_deleted_submission_from_leaderboard(sender, instance: Submission, **kwargs):
+    mark_dirty(quiz_ids=[instance.quiz_id], standing_pairs=[(instance.quiz_id, instance.user_id)])
+
+
+@receiver(post_save, sender=Submission)
+def update_standing_on_submission_save(sender, instance: Submission, created=False, raw=False, **kwargs):
+    # Graded flows mark their submissions themselves; this covers direct saves (admin, fixtures)
+    if not raw and not instance.in_progress:
+        mark_scored(instance)
+
+
+@receiver(post_save, sender=Quiz)
+def invalidate_entitlements_on_quiz_save(sender, instance: Quiz, raw=False, **kwargs):
+    # Creator and attempt settings may have changed; a new quiz also gets a fresh key space
+    invalidate_quiz(instance.pk)
+
+
+@receiver(post_delete, sender=Quiz)
+def invalidate_entitlements_on_quiz_delete(sender, instance: Quiz, **kwargs):
+    invalidate_quiz(instance.pk)
+    reset_leaderboard(instance.pk)
+    discard_score_sketch(instance.pk)
+    discard_participants(instance.pk)
+
+
+@receiver(post_save, sender=Quiz)
+def reset_leaderboard_for_new_quiz(sender, instance: Quiz, created=False, raw=False, **kwargs):
+    # Quiz ids can be reused (e.g. after a rollback); never serve a board from a previous owner of the id
+    if created:
+        reset_leaderboard(instance.pk)
+        discard_score_sketch(instance.pk)
+        discard_participants(instance.pk)
+
@@ -0,0 +1,140 @@
+"""Per-(quiz, user) standings materialized from completed submissions.
+
+A standing folds all of a user's completed attempts on a quiz into one
+row, so leaderboards rank users without grouping over submissions. Which
+attempt decides the standing follows ``Quiz.scoring_policy``: the first or
+last completed attempt for ``first`` / ``last``, and the best one (earliest
+wins ties) for ``best`` and any custom policy.
+
+Standings are kept current from the coalesced dirty set: every flush
+re-derives the standings of the (quiz, user) pairs it touched from those
+users' submissions only, and whole-quiz rescores rebuild the quiz's
+standings in one pass.
+"""
+
+from __future__ import annotations
+
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from django.db import transaction
+
+from .models import QuizStanding, Submission
+
+BATCH_SIZE = 1_000
+
+_COLUMNS = ("id", "user_id", "score", "attempt_number", "submitted_at")
+_DERIVED = (
+    "score", "best_score", "first_score", "last_score", "attempts",
+    "submission_id", "attempt_number", "decided_at",
+)
+
+
+def _deciding(rows: list, policy: str) -> dict:
+    if policy == "first":
+        return rows[0]
+    if policy == "last":
+        return rows[-1]
+    return min(rows, key=lambda row: (-row["score"], row["submitted_at"], row["id"]))
+
+
+def standing_values(rows: list, policy: str) -> Optional[dict]:
+    """Derived standing fields from one user's completed submissions (ordered by attempt)."""
+    if not rows:
+        return None
+    deciding = _deciding(rows, policy)
+    return {
+        "score": deciding["score"],
+        "best_score": max(row["score"] for row in rows),
+        "first_score": rows[0]["score"],
+        "last_score": rows[-1]["score"],
+        "attempts": len(rows),
+        "submission_id": deciding["id"],
+        "attempt_number": deciding["attempt_number"],
+        "decided_at": deciding["submitted_at"],
+    }
+
+
+def _completed(quiz_id: int):
+    return (
+        Submission.objects.filter(quiz_id=quiz_id, in_progress=False)
+        .order_by("user_id", "attempt_number", "id").values(*_COLUMNS)
+    )
+
+
+def _group_by_user(rows: Iterable[dict]) -> dict:
+    by_user = defaultdict(list)
+    for row in rows:
+        by_user[row["user_id"]].append(row)
+    return by_user
+
+
+def _policy(quiz_id: int) -> Optional[str]:
+    from quizzes.models import Quiz
+
+    return Quiz.objects.filter(pk=quiz_id).values_list("scoring_policy", flat=True).first()
+
+
+def update_standings(pairs: Iterable[tuple]) -> set:
+    """Re-derive the standings of ``(quiz_id, user_id)`` pairs; returns the ids of changed standings.
+
+    Ids of standings that were deleted (their user has no completed
+    attempt left) are included, so callers can drop them from caches.
+    """
+    users_by_quiz = defaultdict(set)
+    for quiz_id, user_id in pairs:
+        users_by_quiz[quiz_id].add(user_id)
+
+    touched = set()
+    for quiz_id, user_ids in users_by_quiz.items():
+        policy = _policy(quiz_id)
+        if policy is None:
+            continue  # quiz deleted; its standings went with it
+        by_user = _group_by_user(_completed(quiz_id).filter(user_id__in=user_ids))
+        with transaction.atomic():
+            existing = {
+                standing.user_id: standing
+                for standing in QuizStanding.objects.select_for_update().filter(quiz_id=quiz_id, user_id__in=user_ids)
+            }
+            stale, changed = [], []
+            for user_id in user_ids:
+                values = standing_values(by_user.get(user_id, []), policy)
+                standing = existing.get(user_id)
+                if values is None:
+                    if standing is not None:
+                        stale.append(standing.pk)
+                    continue
+                if standing is not None and all(getattr(standing, name) == values[name] for name in _DERIVED):
+                    continue
+                changed.append(QuizStanding(quiz_id=quiz_id, user_id=user_id, **values))
+            if stale:
+                QuizStanding.objects.filter(pk__in=stale).delete()
+            if changed:
+                # Upsert: a concurrent flush may have created the row since we read
+                QuizStanding.objects.bulk_create(
+                    changed, update_conflicts=True, unique_fields=["quiz", "user"], update_fields=list(_DERIVED),
+                )
+        touched.update(stale)
+        if changed:
+            touched.update(
+                QuizStanding.objects.filter(quiz_id=quiz_id, user_id__in=[s.user_id for s in changed])
+                .values_list("pk", flat=True)
+            )
+    return touched
+
+
+def rebuild_standings(quiz) -> int:
+    """Recompute every standing of ``quiz`` from its completed submissions; returns the count."""
+    by_user = _group_by_user(_completed(quiz.pk).iterator(chunk_size=BATCH_SIZE))
+    standings = [
+        QuizStanding(quiz_id=quiz.pk, user_id=user_id, **standing_values(rows, quiz.scoring_policy))
+        for user_id, rows in by_user.items()
+    ]
+    with transaction.atomic():
+        QuizStanding.objects.filter(quiz_id=quiz.pk).delete()
+        QuizStanding.objects.bulk_create(standings, batch_size=BATCH_SIZE)
+    return len(standings)
+
+
+def get_standing(quiz_id: int, user_id: int) -> Optional[QuizStanding]:
+    return QuizStanding.objects.filter(quiz_id=quiz_id, user_id=user_id).first()
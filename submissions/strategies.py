@@ -1,22 +1,231 @@
+"""Scoring strategies and their registry.
+
+A strategy turns the attempts of one question into points. Strategies are
+stateless singletons looked up by policy name (``Quiz.scoring_policy``);
+extra policies can be registered with :func:`register_strategy` or the
+``SCORING_STRATEGIES`` setting (``{"name": "dotted.path.Strategy"}``).
+
+Three entry points per strategy:
+
+* ``compute(attempts)`` – ordered ``QuestionAttempt`` list of one question.
+* ``compute_many(submission_ids, question_ids, attempt_order, correct)`` –
+  columnar arrays for any number of submissions; returns
+  ``(submission_ids, totals)`` without instantiating models.
+* ``score_state(state)`` – points from a folded ``QuestionScore`` row, used
+  for incremental updates. Strategies that can't work from that state raise
+  ``NotImplementedError`` and fall back to a full recompute.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass
+class QuestionGroups:
+    """Per-(submission, question) reductions of columnar attempts."""
+
+    submission: np.ndarray
+    question: np.ndarray
+    attempts: np.ndarray
+    correct_count: np.ndarray
+    first_correct: np.ndarray
+    last_correct: np.ndarray
+    best_correct: np.ndarray
+    first_attempt_number: np.ndarray
+    last_attempt_number: np.ndarray
+
+
+def group_attempts(submission_ids, question_ids, attempt_order, correct, *, presorted=False) -> QuestionGroups:
+    """Reduce columnar attempts to one row per (submission, question).
+
+    Unless ``presorted``, the inputs are ordered by (submission, question,
+    attempt_order) first; ties keep their input order.
+    """
+    submission_ids = np.asarray(submission_ids, dtype=np.int64)
+    question_ids = np.asarray(question_ids, dtype=np.int64)
+    attempt_order = np.asarray(attempt_order, dtype=np.int64)
+    correct = np.asarray(correct, dtype=bool)
+    n = len(submission_ids)
+    if not n:
+        ints, flags = np.empty(0, dtype=np.int64), np.empty(0, dtype=bool)
+        return QuestionGroups(ints, ints, ints, ints, flags, flags, flags, ints, ints)
+    if not presorted:
+        order = np.lexsort((attempt_order, question_ids, submission_ids))
+        submission_ids, question_ids = submission_ids[order], question_ids[order]
+        attempt_order, correct = attempt_order[order], correct[order]
+
+    boundary = np.empty(n, dtype=bool)
+    boundary[0] = True
+    boundary[1:] = (submission_ids[1:] != submission_ids[:-1]) | (question_ids[1:] != question_ids[:-1])
+    starts = np.flatnonzero(boundary)
+    ends = np.append(starts[1:], n) - 1
+    return QuestionGroups(
+        submission=submission_ids[starts],
+        question=question_ids[starts],
+        attempts=np.diff(np.append(starts, n)),
+        correct_count=np.add.reduceat(correct.astype(np.int64), starts),
+        first_correct=correct[starts],
+        last_correct=correct[ends],
+        best_correct=np.logical_or.reduceat(correct, starts),
+        first_attempt_number=attempt_order[starts],
+        last_attempt_number=attempt_order[ends],
+    )
+
+
+def sum_by_submission(submission: np.ndarray, values: np.ndarray):
+    """Sum per-question values of grouped rows into ``(submission_ids, totals)``."""
+    if not len(submission):
+        return submission, np.asarray(values, dtype=np.int64)
+    ids, starts = np.unique(submission, return_index=True)
+    return ids, np.add.reduceat(values, starts)
+
+
 class ScoringStrategy:
+    name = None
+
     def compute(self, attempts):  # attempts: list[QuestionAttempt]
         raise NotImplementedError
 
+    def score_groups(self, groups: QuestionGroups) -> np.ndarray:
+        """Points per (submission, question) group."""
+        raise NotImplementedError
+
+    def score_state(self, state) -> int:  # state: QuestionScore
+        raise NotImplementedError
+
+    def compute_many(self, submission_ids, question_ids, attempt_order, correct, *, presorted=False):
+        groups = group_attempts(submission_ids, question_ids, attempt_order, correct, presorted=presorted)
+        return sum_by_submission(groups.submission, self.score_groups(groups))
+
 
 class BestAttempt(ScoringStrategy):
+    name = "best"
+
     def compute(self, attempts):
         return int(any(a.is_correct for a in attempts))
 
+    def score_groups(self, groups):
+        return groups.best_correct.astype(np.int64)
+
+    def score_state(self, state):
+        return int(state.best_correct)
+
 
 class LastAttempt(ScoringStrategy):
+    name = "last"
+
     def compute(self, attempts):
         return int(attempts[-1].is_correct) if attempts else 0
 
+    def score_groups(self, groups):
+        return groups.last_correct.astype(np.int64)
+
+    def score_state(self, state):
+        return int(state.last_correct)
+
 
 class FirstAttempt(ScoringStrategy):
+    name = "first"
+
     def compute(self, attempts):
         return int(attempts[0].is_correct) if attempts else 0
 
+    def score_groups(self, groups):
+        return groups.first_correct.astype(np.int64)
+
+    def score_state(self, state):
+        return int(state.first_correct)
+
+
+class PenaltyAttempt(ScoringStrategy):
+    """Last attempt counts; a wrong final answer costs ``penalty`` points."""
+
+    name = "penalty"
+
+    def __init__(self, penalty: int = 1):
+        self.penalty = penalty
+
+    def compute(self, attempts):
+        if not attempts:
+            return 0
+        return 1 if attempts[-1].is_correct else -self.penalty
+
+    def score_groups(self, groups):
+        return np.where(groups.last_correct, 1, -self.penalty).astype(np.int64)
+
+    def score_state(self, state):
+        if not state.attempts:
+            return 0
+        return 1 if state.last_correct else -self.penalty
+
+
+class WeightedAttempt(ScoringStrategy):
+    """Scale another strategy's points by a per-question weight (default 1)."""
+
+    def __init__(self, base: ScoringStrategy, weights: dict, name: str = "weighted"):
+        self.base = base
+        self.weights = dict(weights)
+        self.name = name
+
+    def _weight(self, question_id):
+        return self.weights.get(question_id, 1)
+
+    def compute(self, attempts):
+        return self._weight(attempts[0].question_id) * self.base.compute(attempts) if attempts else 0
+
+    def score_groups(self, groups):
+        weights = np.array([self._weight(q) for q in groups.question.tolist()], dtype=np.int64)
+        return weights * self.base.score_groups(groups)
+
+    def score_state(self, state):
+        return self._weight(state.question_id) * self.base.score_state(state)
+
+
+_registry = {}
+_settings_loaded = False
+
+
+def register_strategy(name: str, strategy) -> ScoringStrategy:
+    """Register a strategy instance (or class, instantiated once) under ``name``."""
+    if isinstance(strategy, type):
+        strategy = strategy()
+    _registry[name] = strategy
+    return strategy
+
+
+def _load_settings():
+    global _settings_loaded
+    if _settings_loaded:
+        return
+    from django.conf import settings
+    from django.utils.module_loading import import_string
+
+    for name, path in getattr(settings, "SCORING_STRATEGIES", {}).items():
+        register_strategy(name, import_string(path))
+    _settings_loaded = True
+
+
+def available_strategies() -> list:
+    _load_settings()
+    return sorted(_registry)
+
+
+def get_strategy(quiz_or_policy) -> ScoringStrategy:
+    """Shared strategy for a quiz (or a policy name)."""
+    policy = getattr(quiz_or_policy, "scoring_policy", quiz_or_policy)
+    try:
+        return _registry[policy]
+    except KeyError:
+        _load_settings()
+    try:
+        return _registry[policy]
+    except KeyError:
+        raise KeyError(f"Unknown scoring policy {policy!r}") from None
+
 
-def get_strategy(quiz):
-    return {"best": BestAttempt(), "last": LastAttempt(), "first": FirstAttempt()}[quiz.scoring_policy]
+register_strategy("best", BestAttempt)
+register_strategy("last", LastAttempt)
+register_strategy("first", FirstAttempt)
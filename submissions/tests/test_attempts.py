@@ -0,0 +1,147 @@
+import threading
+from contextlib import nullcontext
+from datetime import timedelta
+from unittest import mock
+
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase
+from django.contrib.auth.models import User
+from django.urls import reverse
+from django.utils import timezone
+
+from quizzes.models import Quiz, Question, Answer
+from submissions import attempts
+from submissions.attempts import NoAttemptsLeft, finish_attempt, start_attempt
+from submissions.grading import submit_answers
+from submissions.models import Submission
+
+
+class AttemptLifecycleTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="x")
+        self.user = User.objects.create_user(username="u", password="x")
+        self.quiz = Quiz.objects.create(
+            title="Q", creator=self.creator, is_published=True, allow_multiple_attempts=True, max_attempts=3
+        )
+
+    def test_allocates_sequential_numbers_up_to_limit(self):
+        numbers = []
+        for _ in range(3):
+            submission = start_attempt(self.quiz, self.user)
+            # Starting again resumes the open attempt instead of burning a new one
+            self.assertEqual(start_attempt(self.quiz, self.user).pk, submission.pk)
+            numbers.append(submission.attempt_number)
+            finish_attempt(submission)
+        self.assertEqual(numbers, [1, 2, 3])
+        with self.assertRaises(NoAttemptsLeft):
+            start_attempt(self.quiz, self.user)
+        self.assertEqual(Submission.objects.filter(user=self.user).count(), 3)
+
+    def test_allocation_is_one_statement(self):
+        with self.assertNumQueries(4):  # open-attempt lookup, savepoint, INSERT ... SELECT, release
+            start_attempt(self.quiz, self.user)
+
+    def test_retries_after_losing_the_race(self):
+        real = attempts._insert_next_attempt
+        outcomes = [IntegrityError("dup")]
+
+        def insert_once_conflicting(*args):
+            if outcomes:
+                raise outcomes.pop()
+            return real(*args)
+
+        with mock.patch.object(attempts, "_insert_next_attempt", side_effect=insert_once_conflicting) as insert:
+            submission = start_attempt(self.quiz, self.user)
+        self.assertEqual(insert.call_count, 2)
+        self.assertEqual(submission.attempt_number, 1)
+
+    def test_racing_start_resumes_the_winners_open_attempt(self):
+        real = attempts._open_attempt
+        winner = []
+
+        def other_worker_starts_in_between(quiz, user):
+            if winner:
+                return real(quiz, user)
+            # Our lookup finds nothing, then another request opens an attempt before our INSERT
+            found = real(quiz, user)
+            winner.append(attempts._insert_next_attempt(quiz, user, 3, timezone.now()))
+            return found
+
+        with mock.patch.object(attempts, "_open_attempt", side_effect=other_worker_starts_in_between), \
+                mock.patch.object(attempts, "_insert_next_attempt", wraps=attempts._insert_next_attempt) as insert:
+            submission = start_attempt(self.quiz, self.user)
+        self.assertEqual(insert.call_count, 2)  # the winner's, then ours hitting the one-open-attempt constraint
+        self.assertEqual(submission.pk, winner[0][0])
+        self.assertEqual(Submission.objects.filter(user=self.user).count(), 1)
+
+    def test_finishing_stamps_the_submission_time(self):
+        submission = start_attempt(self.quiz, self.user)
+        started = timezone.now() - timedelta(minutes=10)
+        Submission.objects.filter(pk=submission.pk).update(submitted_at=started)
+        finish_attempt(submission)
+        self.assertGreater(Submission.objects.get(pk=submission.pk).submitted_at, started)
+        self.assertEqual(Submission.objects.get(pk=submission.pk).submitted_at, submission.submitted_at)
+
+    def test_database_rejects_a_second_open_attempt(self):
+        start_attempt(self.quiz, self.user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Submission.objects.create(quiz=self.quiz, user=self.user, attempt_number=2)
+
+    def test_single_attempt_quiz_rejects_second_submit(self):
+        self.quiz.allow_multiple_attempts = False
+        self.quiz.save()
+        q = Question.objects.create(quiz=self.quiz, text="?")
+        right = Answer.objects.create(question=q, text="y", is_correct=True)
+        submit_answers(self.quiz, self.user, {q.id: right.id})
+        with self.assertRaises(NoAttemptsLeft):
+            submit_answers(self.quiz, self.user, {q.id: right.id})
+
+        self.client.login(username="u", password="x")
+        with self.assertLogs("django.request", "WARNING"):
+            res = self.client.post(reverse("quizzes:take", args=[self.quiz.id]), {f"answer_{q.id}": right.id})
+        self.assertEqual(res.status_code, 403)
+
+    def test_start_view_opens_attempt(self):
+        self.client.login(username="u", password="x")
+        res = self.client.get(reverse("quiz-start", kwargs={"pk": self.quiz.id}))
+        self.assertContains(res, "Started quiz")
+        self.assertTrue(Submission.objects.get(user=self.user).in_progress)
+
+
+class ConcurrentAllocationTests(TransactionTestCase):
+    def test_parallel_starts_never_duplicate_or_exceed_limit(self):
+        creator = User.objects.create_user(username="creator", password="x")
+        quiz = Quiz.objects.create(
+            title="Q", creator=creator, is_published=True, allow_multiple_attempts=True, max_attempts=5
+        )
+        user = User.objects.create_user(username="u", password="x")
+        barrier = threading.Barrier(8)
+        errors = []
+        # SQLite has no concurrent writers (and its shared in-memory test
+        # database fails instead of waiting on a lock), so there the workers
+        # take turns: still one connection each, interleaved in any order.
+        turn = threading.Lock() if connection.vendor == "sqlite" else nullcontext()
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(3):
+                    try:
+                        with turn:
+                            finish_attempt(start_attempt(quiz, user))
+                    except NoAttemptsLeft:
+                        pass
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        numbers = sorted(Submission.objects.filter(quiz=quiz, user=user).values_list("attempt_number", flat=True))
+        self.assertEqual(numbers, [1, 2, 3, 4, 5])
@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from quizzes.models import Quiz, Question
+from submissions import coalesce
+from submissions.models import Submission, QuestionAttempt, QuizStanding
+
+
+class CoalescedScoringTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="bob", password="x")
+        self.quiz = Quiz.objects.create(title="Q1", creator=self.user, is_published=True)
+        self.questions = [Question.objects.create(quiz=self.quiz, text=f"Q{i}") for i in range(5)]
+        self.sub = Submission.objects.create(quiz=self.quiz, user=self.user)
+        Submission.objects.filter(pk=self.sub.pk).update(in_progress=False)  # completed, no signals
+
+    def _standing_ids(self):
+        return set(QuizStanding.objects.filter(quiz=self.quiz).values_list("pk", flat=True))
+
+    def _patched(self):
+        return (
+            mock.patch.object(coalesce, "refresh_leaderboards"),
+            mock.patch.object(coalesce, "schedule_leaderboard_broadcast"),
+        )
+
+    def test_attempts_in_transaction_flush_once(self):
+        refresh_patch, bc_patch = self._patched()
+        with refresh_patch as refresh, bc_patch as broadcast:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with transaction.atomic():
+                    for q in self.questions:
+                        QuestionAttempt.objects.create(submission=self.sub, question=q, is_correct=True)
+            self.assertEqual(len(callbacks), 1)
+            refresh.assert_called_once_with({self.quiz.id}, self._standing_ids())
+            broadcast.assert_called_once_with(self.quiz.id)
+        self.assertEqual(QuizStanding.objects.get(quiz=self.quiz, user=self.user).score, 5)
+        self.sub.refresh_from_db()
+        self.assertEqual(self.sub.score, 5)
+
+    def test_edited_attempts_recompute_once_per_submission(self):
+        refresh_patch, bc_patch = self._patched()
+        with refresh_patch, bc_patch, self.captureOnCommitCallbacks(execute=True):
+            attempts = [QuestionAttempt.objects.create(submission=self.sub, question=q) for q in self.questions]
+        with refresh_patch, bc_patch, mock.patch("submissions.services.recompute_score") as recompute:
+            with self.captureOnCommitCallbacks(execute=True):
+                for a in attempts:
+                    a.is_correct = True
+                    a.save()
+        self.assertEqual(recompute.call_count, 1)
+
+    def test_rollback_discards_dirty_set(self):
+        refresh_patch, bc_patch = self._patched()
+        with refresh_patch as refresh, bc_patch:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        QuestionAttempt.objects.create(submission=self.sub, question=self.questions[0])
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+            refresh.assert_not_called()
+
+            other = Quiz.objects.create(title="Q2", creator=self.user, is_published=True)
+            with self.captureOnCommitCallbacks(execute=True):
+                coalesce.mark_quiz(other.id)
+            refresh.assert_called_once_with({other.id}, set())
+
+    def test_coalesced_block_defers_flush(self):
+        refresh_patch, bc_patch = self._patched()
+        with refresh_patch as refresh, bc_patch as broadcast:
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                with coalesce.coalesced():
+                    coalesce.mark_quiz(self.quiz.id)
+                    coalesce.mark_dirty(submission_ids=[self.sub.id], quiz_ids=[self.quiz.id])
+                    self.assertEqual(len(callbacks), 0)
+            self.assertEqual(len(callbacks), 1)
+            refresh.assert_called_once_with({self.quiz.id}, self._standing_ids())
+            broadcast.assert_called_once_with(self.quiz.id)
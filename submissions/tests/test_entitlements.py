@@ -0,0 +1,38 @@
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from quizzes.models import Quiz
+from submissions.attempts import start_attempt
+from submissions.entitlements import UNLIMITED, get_entitlement
+from submissions.models import Submission
+from submissions.services import remaining_attempts
+
+
+class EntitlementCacheTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="x")
+        self.user = User.objects.create_user(username="u", password="x")
+        self.quiz = Quiz.objects.create(
+            title="Q", creator=self.creator, is_published=True, allow_multiple_attempts=True, max_attempts=2
+        )
+
+    def test_record_tracks_submissions_and_quiz_edits(self):
+        entitlement = get_entitlement(self.user.id, self.quiz.id)
+        self.assertEqual((entitlement.creator_id, entitlement.limit, entitlement.used), (self.creator.id, 2, 0))
+
+        start_attempt(self.quiz, self.user)  # raw INSERT path
+        self.assertEqual(remaining_attempts(self.user, self.quiz.id), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(remaining_attempts(self.user, self.quiz.id), 1)
+
+        Submission.objects.filter(user=self.user).delete()
+        self.assertEqual(remaining_attempts(self.user, self.quiz.id), 2)
+
+        self.quiz.max_attempts = None
+        self.quiz.save()
+        self.assertEqual(remaining_attempts(self.user, self.quiz.id), UNLIMITED)
+
+    def test_missing_quiz(self):
+        self.assertIsNone(get_entitlement(self.user.id, 0))
+        with self.assertRaises(Quiz.DoesNotExist):
+            remaining_attempts(self.user, 0)
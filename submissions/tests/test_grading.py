@@ -0,0 +1,90 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from quizzes.models import Quiz, Question, Answer
+from submissions.models import Submission, QuestionAttempt
+from submissions.grading import load_answer_key, submit_answers
+
+
+def make_quiz(creator, n_questions):
+    quiz = Quiz.objects.create(title=f"Quiz {n_questions}", creator=creator, is_published=True)
+    key = {}
+    for i in range(n_questions):
+        q = Question.objects.create(quiz=quiz, text=f"Q{i}")
+        right = Answer.objects.create(question=q, text="right", is_correct=True)
+        wrong = Answer.objects.create(question=q, text="wrong", is_correct=False)
+        key[q.id] = (right.id, wrong.id)
+    return quiz, key
+
+
+class GradingTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="x")
+        self.user = User.objects.create_user(username="u", password="x")
+
+    def test_grades_payload_in_memory(self):
+        quiz, key = make_quiz(self.creator, 3)
+        qids = list(key)
+        answers = {
+            str(qids[0]): key[qids[0]][0],  # correct
+            str(qids[1]): key[qids[1]][1],  # wrong
+            str(qids[2]): key[qids[0]][0],  # correct answer of another question
+        }
+        submission = submit_answers(quiz, self.user, answers)
+        self.assertEqual(submission.score, 1)
+        self.assertFalse(submission.in_progress)
+        flags = dict(QuestionAttempt.objects.filter(submission=submission).values_list("question_id", "is_correct"))
+        self.assertEqual(flags, {qids[0]: True, qids[1]: False, qids[2]: False})
+
+    def test_unanswered_questions(self):
+        quiz, key = make_quiz(self.creator, 2)
+        qid = next(iter(key))
+        sub = submit_answers(quiz, self.user, {qid: key[qid][0]})
+        self.assertEqual(sub.question_attempts.count(), 1)
+        other = User.objects.create_user(username="v", password="x")
+        sub = submit_answers(quiz, other, {qid: key[qid][0]}, include_unanswered=True)
+        self.assertEqual(sub.question_attempts.count(), 2)
+        self.assertEqual(sub.score, 1)
+
+    def test_answer_key(self):
+        quiz, key = make_quiz(self.creator, 2)
+        answer_key = load_answer_key(quiz)
+        self.assertEqual(answer_key.question_ids, tuple(sorted(key)))
+        for qid, (right, wrong) in key.items():
+            self.assertTrue(answer_key.is_correct(qid, right))
+            self.assertFalse(answer_key.is_correct(qid, wrong))
+            self.assertFalse(answer_key.is_correct(qid, None))
+
+    def test_query_budget_is_independent_of_quiz_size(self):
+        counts = []
+        for n in (5, 50):
+            quiz, key = make_quiz(self.creator, n)
+            user = User.objects.create_user(username=f"taker{n}", password="x")
+            answers = {qid: right for qid, (right, _) in key.items()}
+            # The on-commit flush (standing, leaderboard, entitlements) is part of a submit
+            with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks(execute=True):
+                sub = submit_answers(quiz, user, answers)
+            self.assertEqual(Submission.objects.get(pk=sub.pk).score, n)
+            counts.append(len(ctx))
+        self.assertEqual(counts[0], counts[1])
+        self.assertLessEqual(counts[1], 24)
+
+    def test_take_view_and_api_share_grading(self):
+        quiz, key = make_quiz(self.creator, 2)
+        (q1, (r1, _)), (q2, (_, w2)) = key.items()
+        self.client.login(username="u", password="x")
+        self.client.post(reverse("quizzes:take", args=[quiz.id]), {f"answer_{q1}": r1, f"answer_{q2}": w2})
+        self.assertEqual(Submission.objects.get(quiz=quiz, user=self.user).score, 1)
+
+        other = User.objects.create_user(username="api", password="x")
+        self.client.force_login(other)
+        resp = self.client.post(
+            reverse("api:quiz-submit", args=[quiz.id]),
+            {"answers": {str(q1): r1, str(q2): None}},
+            content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()["score"], 1)
@@ -0,0 +1,129 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from quizzes.models import Quiz, Question, Answer
+from submissions import ingest
+from submissions.models import Submission, QueuedSubmission
+
+
+@override_settings(SUBMISSION_INGEST_MODE="queue")
+class QueueIngestionTests(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username="creator", password="x")
+        self.user = User.objects.create_user(username="u", password="x")
+        self.quiz = Quiz.objects.create(title="Math", creator=self.creator, is_published=True)
+        self.q1 = Question.objects.create(quiz=self.quiz, text="1+1?")
+        self.right = Answer.objects.create(question=self.q1, text="2", is_correct=True)
+        self.wrong = Answer.objects.create(question=self.q1, text="3", is_correct=False)
+
+    def test_take_view_enqueues_and_worker_grades(self):
+        self.client.login(username="u", password="x")
+        res = self.client.post(reverse("quizzes:take", args=[self.quiz.id]), {f"answer_{self.q1.id}": self.right.id})
+        entry = QueuedSubmission.objects.get(user=self.user)
+        self.assertRedirects(res, reverse("quizzes:receipt", args=[entry.token]), fetch_redirect_response=False)
+        self.assertFalse(Submission.objects.filter(user=self.user).exists())
+        self.assertContains(self.client.get(res.url), "Grading")
+
+        with mock.patch.object(ingest, "notify_receipts") as notify, self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(len(ingest.drain_once()), 1)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, QueuedSubmission.DONE)
+        self.assertEqual(entry.submission.score, 1)
+        self.assertFalse(entry.submission.in_progress)
+        self.assertEqual(notify.call_args.args[0][0]["score"], 1)
+        self.assertRedirects(
+            self.client.get(res.url), reverse("quizzes:results", args=[entry.submission_id]),
+            fetch_redirect_response=False,
+        )
+
+    def test_api_returns_receipt(self):
+        self.client.force_login(self.user)
+        resp = self.client.post(
+            reverse("api:quiz-submit", args=[self.quiz.id]),
+            {"answers": {str(self.q1.id): self.wrong.id}}, content_type="application/json",
+        )
+        self.assertEqual(resp.status_code, 202)
+        token = resp.json()["token"]
+        self.assertEqual(resp.json()["status"], "queued")
+        call_command("drain_submissions", "--once", stdout=StringIO())
+        resp = self.client.get(reverse("api:receipt-detail", args=[token]))
+        self.assertEqual(resp.json()["status"], "done")
+        self.assertEqual(resp.json()["score"], 0)
+
+        other = User.objects.create_user(username="other", password="x")
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse("api:receipt-detail", args=[token])).status_code, 404)
+
+    def test_batch_isolates_failures(self):
+        broken = Quiz.objects.create(title="Broken", creator=self.creator, is_published=True)
+        users = [User.objects.create_user(username=f"t{i}", password="x") for i in range(3)]
+        for user in users:
+            ingest.enqueue(self.quiz, user, {self.q1.id: self.right.id})
+        bad = ingest.enqueue(broken, self.user, {})
+
+        real_load = ingest.load_answer_key
+
+        def load(quiz):
+            if quiz.pk == broken.pk:
+                raise ValueError("no key")
+            return real_load(quiz)
+
+        with mock.patch.object(ingest, "load_answer_key", side_effect=load), \
+                self.assertLogs("submissions.ingest", "ERROR"):
+            processed = ingest.drain_once(batch_size=10)
+        self.assertEqual(len(processed), 4)
+        bad.refresh_from_db()
+        self.assertEqual((bad.status, bad.error), (QueuedSubmission.FAILED, "no key"))
+        self.assertEqual(
+            list(Submission.objects.filter(user__in=users).values_list("score", flat=True)), [1, 1, 1]
+        )
+        self.assertEqual(ingest.drain_once(), [])
+
+    def test_entries_of_one_user_get_separate_attempts(self):
+        self.quiz.allow_multiple_attempts = True
+        self.quiz.save()
+        first = ingest.enqueue(self.quiz, self.user, {self.q1.id: self.wrong.id})
+        second = ingest.enqueue(self.quiz, self.user, {self.q1.id: self.right.id})
+        with self.captureOnCommitCallbacks(execute=True):
+            ingest.drain_once()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertNotEqual(first.submission_id, second.submission_id)
+        self.assertEqual(
+            [(first.submission.attempt_number, first.submission.score), (second.submission.attempt_number, second.submission.score)],
+            [(1, 0), (2, 1)],
+        )
+        self.assertFalse(Submission.objects.filter(user=self.user, in_progress=True).exists())
+
+    def test_failure_after_grading_only_fails_its_entry(self):
+        users = [User.objects.create_user(username=f"t{i}", password="x") for i in range(3)]
+        entries = [ingest.enqueue(self.quiz, user, {self.q1.id: self.right.id}) for user in users]
+        real_apply = ingest.apply_attempts
+
+        def apply(submission, attempts):
+            if submission.user_id == users[1].pk:
+                raise ValueError("boom")
+            return real_apply(submission, attempts)
+
+        with mock.patch.object(ingest, "apply_attempts", side_effect=apply), \
+                self.assertLogs("submissions.ingest", "WARNING"):
+            ingest.drain_once()
+        for entry in entries:
+            entry.refresh_from_db()
+        self.assertEqual(
+            [e.status for e in entries], [QueuedSubmission.DONE, QueuedSubmission.FAILED, QueuedSubmission.DONE]
+        )
+        self.assertEqual(entries[1].error, "boom")
+        self.assertFalse(Submission.objects.filter(user=users[1]).exists())
+        self.assertEqual(ingest.drain_once(), [])
+
+    def test_once_gives_up_on_a_persistent_error(self):
+        ingest.enqueue(self.quiz, self.user, {})
+        with mock.patch.object(ingest, "process_batch", side_effect=RuntimeError("db down")), \
+                self.assertRaisesMessage(RuntimeError, "db down"):
+            call_command("drain_submissions", "--once", stdout=StringIO(), stderr=StringIO())
@@ -0,0 +1,51 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from core import counters
+from quizzes.models import Quiz
+from submissions.models import Submission
+from submissions.participants import unique_participants
+
+
+class UniqueParticipantTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        counters.get_backend().flush()
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.quiz = Quiz.objects.create(title="Q", creator=self.owner, is_published=True, allow_multiple_attempts=True)
+        self.users = [User.objects.create_user(username=f"u{i}", password="x") for i in range(5)]
+
+    def _start(self, user, number=1):
+        Submission.objects.filter(quiz=self.quiz, user=user).update(in_progress=False)  # one open attempt each
+        with self.captureOnCommitCallbacks(execute=True):
+            return Submission.objects.create(quiz=self.quiz, user=user, attempt_number=number)
+
+    def test_counter_is_built_on_read_and_kept_current(self):
+        self._start(self.users[0])
+        self._start(self.users[0], 2)
+        self._start(self.users[1])
+        self.assertEqual(unique_participants(self.quiz.pk), 2)
+        # Existing counter: new participants are added without touching the database
+        self._start(self.users[2])
+        self._start(self.users[1], 2)
+        with self.assertNumQueries(0):
+            self.assertEqual(unique_participants(self.quiz.pk), 3)
+
+    def test_new_quiz_with_a_reused_id_starts_empty(self):
+        self._start(self.users[0])
+        self.assertEqual(unique_participants(self.quiz.pk), 1)
+        quiz_id = self.quiz.pk
+        self.quiz.delete()
+        quiz = Quiz.objects.create(pk=quiz_id, title="Again", creator=self.owner, is_published=True)
+        self.assertEqual(unique_participants(quiz.pk), 0)
+
+    def test_submits_through_the_take_view_are_counted(self):
+        self.assertEqual(unique_participants(self.quiz.pk), 0)
+        for user in self.users[:2]:
+            self.client.force_login(user)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(reverse("quizzes:take", args=[self.quiz.pk]), {})
+        self.assertEqual(Submission.objects.filter(quiz=self.quiz).count(), 2)
+        self.assertEqual(unique_participants(self.quiz.pk), 2)
@@ -0,0 +1,49 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from quizzes.models import Quiz
+from submissions.models import Submission
+from submissions.percentiles import get_score_sketch, percentile_below
+
+
+class ScorePercentileTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.quiz = Quiz.objects.create(title="Q", creator=self.owner, is_published=True)
+        self.users = [User.objects.create_user(username=f"u{i}", password="x") for i in range(10)]
+
+    def _complete(self, user, score, in_progress=False):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Submission.objects.create(quiz=self.quiz, user=user, score=score, in_progress=in_progress)
+
+    def test_percentile_is_built_on_read_and_kept_current(self):
+        self.assertIsNone(percentile_below(self.quiz.pk, 3))
+        for user, score in zip(self.users[:4], [1, 2, 3, 4]):
+            self._complete(user, score)
+        self.assertEqual(percentile_below(self.quiz.pk, 3), 50)
+        # Cached now: new completions are folded in by the flush
+        for user in self.users[4:8]:
+            self._complete(user, 9)
+        with self.assertNumQueries(0):
+            self.assertEqual(percentile_below(self.quiz.pk, 9), 50)
+
+    def test_open_attempts_count_once_completed(self):
+        self._complete(self.users[0], 5)
+        get_score_sketch(self.quiz.pk)
+        open_attempt = self._complete(self.users[1], 0, in_progress=True)
+        self._complete(self.users[2], 1)
+        self.assertEqual(get_score_sketch(self.quiz.pk).n, 2)
+        Submission.objects.filter(pk=open_attempt.pk).update(score=7, in_progress=False)
+        self._complete(self.users[3], 2)
+        sketch = get_score_sketch(self.quiz.pk)
+        self.assertEqual(sketch.n, 4)
+        self.assertEqual(sketch.quantile(1), 7)
+
+    def test_results_page_shows_percentile(self):
+        for user, score in zip(self.users[:4], [1, 2, 3, 4]):
+            self._complete(user, score)
+        mine = Submission.objects.get(user=self.users[3])
+        self.client.login(username="u3", password="x")
+        res = self.client.get(reverse("quizzes:results", args=[mine.pk]))
+        self.assertContains(res, "better than 75% of attempts")
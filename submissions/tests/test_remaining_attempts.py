@@ -20,7 +20,7 @@ class RemainingAttemptsTests(TestCase):
 
     def test_multi_with_max(self):
         self.assertEqual(remaining_attempts(self.user, self.quiz_multi.id), 2)
-        Submission.objects.create(quiz=self.quiz_multi, user=self.user, attempt_number=1)
+        Submission.objects.create(quiz=self.quiz_multi, user=self.user, attempt_number=1, in_progress=False)
         self.assertEqual(remaining_attempts(self.user, self.quiz_multi.id), 1)
         Submission.objects.create(quiz=self.quiz_multi, user=self.user, attempt_number=2)
         self.assertEqual(remaining_attempts(self.user, self.quiz_multi.id), 0)
@@ -0,0 +1,104 @@
+import random
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth.models import User
+
+from quizzes.models import Quiz, Question, Answer
+from submissions.models import PendingRescore, Submission, QuestionAttempt, QuestionScore
+from submissions import rescoring
+from submissions.rescoring import rescore_quiz, run_pending_rescores
+from submissions.services import expected_score
+
+
+class RescoringTests(TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.quiz = Quiz.objects.create(title="Q", creator=self.owner, is_published=True, scoring_policy="best")
+        self.questions = []
+        for i in range(3):
+            q = Question.objects.create(quiz=self.quiz, text=f"Q{i}")
+            right = Answer.objects.create(question=q, text="right", is_correct=True)
+            wrong = Answer.objects.create(question=q, text="wrong", is_correct=False)
+            self.questions.append((q, right, wrong))
+        self.submissions = []
+        with self.captureOnCommitCallbacks(execute=True):
+            for u in range(6):
+                user = User.objects.create_user(username=f"u{u}", password="x")
+                sub = Submission.objects.create(quiz=self.quiz, user=user, in_progress=False)
+                for q, right, wrong in self.questions:
+                    for number in range(1, rng.randint(1, 3) + 1):
+                        chosen = rng.choice([right, wrong])
+                        QuestionAttempt.objects.create(
+                            submission=sub, question=q, selected_answer_id=chosen.id,
+                            is_correct=chosen.is_correct, attempt_number=number,
+                        )
+                self.submissions.append(sub)
+
+    def assertScoresMatchRecompute(self):
+        for sub in Submission.objects.filter(quiz=self.quiz).select_related("quiz"):
+            self.assertEqual(sub.score, expected_score(sub), f"submission {sub.pk} ({sub.quiz.scoring_policy})")
+
+    def test_rescore_matches_strategies_for_every_policy_and_chunking(self):
+        for policy in ("first", "last", "best"):
+            Quiz.objects.filter(pk=self.quiz.pk).update(scoring_policy=policy)
+            self.quiz.refresh_from_db()
+            result = rescore_quiz(self.quiz, chunk_size=4)
+            self.assertEqual(result.submissions, len(self.submissions))
+            self.assertScoresMatchRecompute()
+        self.assertEqual(
+            QuestionScore.objects.filter(submission__quiz=self.quiz).count(),
+            len(self.submissions) * len(self.questions),
+        )
+
+    def test_policy_change_queues_rescore(self):
+        scores = list(Submission.objects.filter(quiz=self.quiz).order_by("pk").values_list("score", flat=True))
+        self.quiz.scoring_policy = "first"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.save()
+        # The request only queues the rescore
+        self.assertEqual(list(Submission.objects.filter(quiz=self.quiz).order_by("pk").values_list("score", flat=True)), scores)
+        self.assertFalse(PendingRescore.objects.get(quiz=self.quiz).regrade)
+        self.assertEqual([quiz.pk for quiz, _ in run_pending_rescores()], [self.quiz.pk])
+        self.assertFalse(PendingRescore.objects.exists())
+        self.assertScoresMatchRecompute()
+
+    def test_rescore_requested_while_running_stays_queued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.quiz.scoring_policy = "first"
+            self.quiz.save()
+        real = rescoring.run_rescore
+
+        def edited_meanwhile(quiz, **kwargs):
+            result = real(quiz, **kwargs)
+            rescoring.queue_rescores({quiz.pk: True})
+            return result
+
+        with mock.patch.object(rescoring, "run_rescore", side_effect=edited_meanwhile):
+            self.assertEqual(len(run_pending_rescores(limit=1)), 1)
+        self.assertTrue(PendingRescore.objects.get(quiz=self.quiz).regrade)
+        self.assertEqual(len(run_pending_rescores()), 1)
+        self.assertFalse(PendingRescore.objects.exists())
+
+    def test_answer_key_change_regrades_attempts(self):
+        q, right, wrong = self.questions[0]
+        with self.captureOnCommitCallbacks(execute=True):
+            right.is_correct = False
+            right.save()
+            wrong.is_correct = True
+            wrong.save()
+        self.assertTrue(PendingRescore.objects.get(quiz=self.quiz).regrade)
+        run_pending_rescores()
+        self.assertFalse(QuestionAttempt.objects.filter(question=q, selected_answer_id=right.id, is_correct=True).exists())
+        self.assertFalse(QuestionAttempt.objects.filter(question=q, selected_answer_id=wrong.id, is_correct=False).exists())
+        self.assertScoresMatchRecompute()
+
+    def test_rescore_command(self):
+        Submission.objects.filter(quiz=self.quiz).update(score=99)
+        out = StringIO()
+        call_command("rescore_quiz", str(self.quiz.pk), "--regrade", stdout=out)
+        self.assertIn(f"quiz {self.quiz.pk} (best): 6 submissions", out.getvalue())
+        self.assertScoresMatchRecompute()
@@ -1,9 +1,12 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 from django.contrib.auth.models import User
 
 from quizzes.models import Quiz, Question
-from submissions.models import Submission, QuestionAttempt
-from submissions.services import recompute_score
+from submissions.models import Submission, QuestionAttempt, QuestionScore
+from submissions.services import apply_attempts, expected_score, recompute_score
 
 
 class ScoringTests(TestCase):
@@ -36,3 +39,66 @@ class ScoringTests(TestCase):
         QuestionAttempt.objects.create(submission=self.sub, question=self.q1, is_correct=True, attempt_number=2)
         total = recompute_score(self.sub)
         self.assertEqual(total, 1)
+
+
+class IncrementalScoringTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="bob", password="x")
+        self.quiz = Quiz.objects.create(title="Q1", creator=self.user, is_published=True)
+        self.q1 = Question.objects.create(quiz=self.quiz, text="1+1?")
+        self.q2 = Question.objects.create(quiz=self.quiz, text="2+2?")
+        self.sub = Submission.objects.create(quiz=self.quiz, user=self.user)
+
+    def _score(self):
+        return Submission.objects.get(pk=self.sub.pk).score
+
+    def test_score_tracks_full_recompute_for_every_policy(self):
+        sequence = [(self.q1, False, 1), (self.q1, True, 2), (self.q2, True, 1), (self.q2, False, 2)]
+        for number, policy in enumerate(("best", "first", "last"), start=2):
+            with self.subTest(policy=policy):
+                self.quiz.scoring_policy = policy
+                self.quiz.save(update_fields=["scoring_policy"])
+                Submission.objects.filter(quiz=self.quiz, user=self.user).update(in_progress=False)
+                sub = Submission.objects.create(quiz=self.quiz, user=self.user, attempt_number=number)
+                for question, correct, number in sequence:
+                    QuestionAttempt.objects.create(
+                        submission=sub, question=question, is_correct=correct, attempt_number=number
+                    )
+                    stored = Submission.objects.get(pk=sub.pk).score
+                    self.assertEqual(stored, expected_score(sub))
+
+    def test_out_of_order_attempt_numbers(self):
+        self.quiz.scoring_policy = "first"
+        self.quiz.save(update_fields=["scoring_policy"])
+        QuestionAttempt.objects.create(submission=self.sub, question=self.q1, is_correct=False, attempt_number=2)
+        self.assertEqual(self._score(), 0)
+        QuestionAttempt.objects.create(submission=self.sub, question=self.q1, is_correct=True, attempt_number=1)
+        self.assertEqual(self._score(), 1)
+        state = QuestionScore.objects.get(submission=self.sub, question=self.q1)
+        self.assertEqual((state.attempts, state.first_attempt_number, state.last_attempt_number), (2, 1, 2))
+
+    def test_apply_attempts_is_constant_query(self):
+        attempts = [
+            QuestionAttempt(submission=self.sub, question=q, is_correct=True) for q in (self.q1, self.q2)
+        ]
+        QuestionAttempt.objects.bulk_create(attempts)
+        with self.assertNumQueries(5):  # savepoint, select states, insert states, update score, release
+            delta = apply_attempts(self.sub, attempts)
+        self.assertEqual(delta, 2)
+        self.assertEqual(self._score(), 2)
+
+    def test_check_scores_reports_and_repairs_drift(self):
+        QuestionAttempt.objects.create(submission=self.sub, question=self.q1, is_correct=True)
+        Submission.objects.filter(pk=self.sub.pk).update(score=7)
+
+        out = StringIO()
+        call_command("check_scores", stdout=out)
+        self.assertIn(f"submission {self.sub.pk}", out.getvalue())
+        self.assertIn("stored=7 expected=1", out.getvalue())
+        self.assertEqual(self._score(), 7)
+
+        call_command("check_scores", "--repair", stdout=StringIO())
+        self.assertEqual(self._score(), 1)
+        out = StringIO()
+        call_command("check_scores", stdout=out)
+        self.assertIn("No score drift found.", out.getvalue())
@@ -0,0 +1,94 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+
+from quizzes.models import Quiz
+from submissions import coalesce
+from submissions.models import QuizStanding, Submission
+from submissions.rescoring import run_pending_rescores
+from submissions.standings import rebuild_standings, standing_values, update_standings
+
+
+class StandingTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", password="x")
+        self.user = User.objects.create_user(username="taker", password="x")
+        self.quiz = Quiz.objects.create(
+            title="Q", creator=self.owner, is_published=True, allow_multiple_attempts=True, scoring_policy="best"
+        )
+
+    def _complete(self, score, number):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Submission.objects.create(
+                quiz=self.quiz, user=self.user, score=score, attempt_number=number, in_progress=False
+            )
+
+    def _standing(self):
+        return QuizStanding.objects.get(quiz=self.quiz, user=self.user)
+
+    def test_policy_picks_the_deciding_attempt(self):
+        now = timezone.now()
+        rows = [
+            {"id": i + 1, "score": score, "attempt_number": i + 1, "submitted_at": now + timedelta(minutes=i)}
+            for i, score in enumerate([2, 5, 5, 3])
+        ]
+        best = standing_values(rows, "best")
+        self.assertEqual((best["score"], best["submission_id"]), (5, 2))  # earliest of the tied best
+        self.assertEqual(standing_values(rows, "first")["score"], 2)
+        self.assertEqual(standing_values(rows, "last")["score"], 3)
+        self.assertEqual(
+            {k: best[k] for k in ("best_score", "first_score", "last_score", "attempts")},
+            {"best_score": 5, "first_score": 2, "last_score": 3, "attempts": 4},
+        )
+        self.assertIsNone(standing_values([], "best"))
+
+    def test_completed_attempts_update_the_standing_incrementally(self):
+        first = self._complete(3, 1)
+        self.assertEqual((self._standing().score, self._standing().submission_id), (3, first.pk))
+        second = self._complete(7, 2)
+        standing = self._standing()
+        self.assertEqual((standing.score, standing.attempts, standing.submission_id), (7, 2, second.pk))
+        with mock.patch.object(coalesce, "refresh_leaderboards") as refresh:
+            self._complete(1, 3)
+        refresh.assert_called_once_with({self.quiz.pk}, {standing.pk})
+        standing.refresh_from_db()
+        self.assertEqual((standing.score, standing.attempts, standing.last_score), (7, 3, 1))
+
+    def test_in_progress_attempts_do_not_count(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Submission.objects.create(quiz=self.quiz, user=self.user, score=9)
+        self.assertFalse(QuizStanding.objects.filter(quiz=self.quiz).exists())
+
+    def test_deleting_the_last_attempt_drops_the_standing(self):
+        sub = self._complete(4, 1)
+        standing_id = self._standing().pk
+        with mock.patch.object(coalesce, "refresh_leaderboards") as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                sub.delete()
+        refresh.assert_called_once_with({self.quiz.pk}, {standing_id})
+        self.assertFalse(QuizStanding.objects.filter(quiz=self.quiz).exists())
+
+    def test_policy_change_rebuilds_standings(self):
+        self._complete(6, 1)
+        self._complete(2, 2)
+        self.assertEqual(self._standing().score, 6)
+        # Submissions here have no attempts to rescore from; keep their scores
+        with mock.patch("submissions.rescoring.rescore_quiz"):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.quiz.scoring_policy = "last"
+                self.quiz.save()
+            self.assertEqual(self._standing().score, 6)  # only queued by the request
+            run_pending_rescores()
+        self.assertEqual(self._standing().score, 2)
+
+    def test_rebuild_matches_incremental_updates(self):
+        for number, score in enumerate([1, 4, 2], start=1):
+            self._complete(score, number)
+        incremental = list(QuizStanding.objects.filter(quiz=self.quiz).values("score", "attempts", "submission_id"))
+        self.assertEqual(rebuild_standings(self.quiz), 1)
+        rebuilt = list(QuizStanding.objects.filter(quiz=self.quiz).values("score", "attempts", "submission_id"))
+        self.assertEqual(incremental, rebuilt)
+        self.assertEqual(update_standings([(self.quiz.pk, self.user.pk)]), set())
@@ -0,0 +1,111 @@
+import random
+from types import SimpleNamespace
+
+import numpy as np
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.contrib.auth.models import User
+
+from quizzes.models import Quiz, Question
+from submissions import strategies
+from submissions.models import Submission, QuestionAttempt
+from submissions.services import expected_score
+from submissions.strategies import (
+    BestAttempt, PenaltyAttempt, ScoringStrategy, WeightedAttempt, get_strategy, register_strategy,
+)
+
+
+class NoStateStrategy(ScoringStrategy):
+    """Counts correct attempts; not expressible from the folded state."""
+
+    def compute(self, attempts):
+        return sum(a.is_correct for a in attempts)
+
+    def score_groups(self, groups):
+        return groups.correct_count
+
+
+class RegistryTests(SimpleTestCase):
+    def tearDown(self):
+        strategies._registry.pop("custom", None)
+
+    def test_builtins_are_shared_singletons(self):
+        for policy in ("best", "first", "last"):
+            self.assertIs(get_strategy(policy), get_strategy(SimpleNamespace(scoring_policy=policy)))
+
+    def test_register_and_unknown(self):
+        strategy = register_strategy("custom", PenaltyAttempt(penalty=2))
+        self.assertIs(get_strategy("custom"), strategy)
+        with self.assertRaises(KeyError):
+            get_strategy("nope")
+
+    @override_settings(SCORING_STRATEGIES={"custom": "submissions.tests.test_strategies.NoStateStrategy"})
+    def test_register_from_settings(self):
+        strategies._settings_loaded = False
+        try:
+            self.assertIsInstance(get_strategy("custom"), NoStateStrategy)
+        finally:
+            strategies._settings_loaded = False
+
+
+class ComputeManyTests(SimpleTestCase):
+    def test_compute_many_matches_compute(self):
+        rng = random.Random(3)
+        rows = []
+        for sub in range(1, 30):
+            for q in range(1, 6):
+                for order in range(1, rng.randint(1, 4) + 1):
+                    rows.append((sub, q, order, rng.random() < 0.5))
+        rng.shuffle(rows)
+        columns = [np.array(c) for c in zip(*rows)]
+        candidates = [
+            get_strategy("best"), get_strategy("first"), get_strategy("last"),
+            PenaltyAttempt(penalty=2), WeightedAttempt(BestAttempt(), {2: 5, 4: 3}), NoStateStrategy(),
+        ]
+        for strategy in candidates:
+            with self.subTest(strategy=type(strategy).__name__):
+                ids, totals = strategy.compute_many(*columns)
+                expected = {}
+                for sub, q, order, correct in sorted(rows):
+                    expected.setdefault(sub, {}).setdefault(q, []).append(
+                        SimpleNamespace(question_id=q, is_correct=correct)
+                    )
+                want = {sub: sum(strategy.compute(a) for a in per_q.values()) for sub, per_q in expected.items()}
+                self.assertEqual(dict(zip(ids.tolist(), totals.tolist())), want)
+
+    def test_compute_many_empty(self):
+        ids, totals = get_strategy("best").compute_many([], [], [], [])
+        self.assertEqual((len(ids), len(totals)), (0, 0))
+
+
+class CustomPolicyScoringTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="bob", password="x")
+        self.quiz = Quiz.objects.create(title="Q", creator=self.user, is_published=True)
+        self.q1 = Question.objects.create(quiz=self.quiz, text="1")
+        self.sub = Submission.objects.create(quiz=self.quiz, user=self.user)
+
+    def tearDown(self):
+        strategies._registry.pop("custom", None)
+
+    def _attempts(self, *flags):
+        with self.captureOnCommitCallbacks(execute=True):
+            for number, flag in enumerate(flags, start=1):
+                QuestionAttempt.objects.create(
+                    submission=self.sub, question=self.q1, is_correct=flag, attempt_number=number
+                )
+        self.sub.refresh_from_db()
+
+    def test_custom_policy_incremental(self):
+        register_strategy("custom", PenaltyAttempt(penalty=3))
+        Quiz.objects.filter(pk=self.quiz.pk).update(scoring_policy="custom")
+        self.sub.quiz.refresh_from_db()
+        self._attempts(True, False)
+        self.assertEqual(self.sub.score, -3)
+        self.assertEqual(self.sub.score, expected_score(self.sub))
+
+    def test_stateless_policy_falls_back_to_recompute(self):
+        register_strategy("custom", NoStateStrategy())
+        Quiz.objects.filter(pk=self.quiz.pk).update(scoring_policy="custom")
+        self.sub.quiz.refresh_from_db()
+        self._attempts(True, False, True)
+        self.assertEqual(self.sub.score, 2)